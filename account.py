@@ -6,6 +6,7 @@ from pydantic import BaseModel
 from rich.console import Console
 
 from db.manager import AsyncDatabaseManager
+from db.records import AccountRecord
 
 from src.account.info import ArkhamInfo
 from src.trade.trading_client import ArkhamTrading
@@ -32,6 +33,7 @@ class Account(BaseModel):
     cookies: Optional[dict] = None
     api_secret: Optional[str] = None
     captcha_key: Optional[str] = None
+    totp_secret: Optional[str] = None
     arkham_info: Optional[ArkhamInfo] = None
     arkham_price: Optional[ArkhamPrices] = None 
     arkham_trader: Optional[ArkhamTrading] = None
@@ -46,6 +48,32 @@ class Account(BaseModel):
         super().__init__(**data)
         self._session_manager = GlobalSessionManager()
 
+    @classmethod
+    def from_record(cls, record: AccountRecord, cookies: Optional[dict] = None) -> "Account":
+        """
+        Активировать запись флота: модель без валидации (типы уже из SQLite),
+        клиенты и сессия создаются позже - initialize_clients/create_session.
+        cookies - уже разобранные куки (например, из кэша репозитория).
+        """
+        account = cls.model_construct(
+            email=record.email,
+            account=record.account,
+            password=record.password,
+            balance=record.balance,
+            volume=record.volume,
+            points=record.points,
+            margin_fee=record.margin_fee,
+            margin_bonus=record.margin_bonus,
+            proxy=record.proxy,
+            api_key=record.api_key,
+            api_secret=record.api_secret,
+            cookies=cookies if cookies is not None else record.parsed_cookies(),
+            captcha_key=record.captcha_key,
+            totp_secret=record.totp_secret,
+        )
+        account._session_manager = GlobalSessionManager()
+        return account
+
     async def create_session(self) -> aiohttp.ClientSession:
         """Создать новую сессию через глобальный менеджер"""
         try:
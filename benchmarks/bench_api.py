@@ -0,0 +1,82 @@
+"""HTTP API управления: накладные расходы поверх той же команды внутри процесса"""
+import time
+
+import aiohttp
+
+from benchmarks.bench_cli import _cli_env, _free_port
+from benchmarks.harness import benchmark
+from src.daemon.commands import CommandRunner
+from src.daemon.http_api import ControlAPI
+
+API_TOKEN = "bench-token"
+
+
+async def _api_env():
+    """Демон-раннер с тёплой сессией, HTTP API перед ним и keep-alive клиент"""
+    async for _, db_path, _, _ in _cli_env():
+        runner = CommandRunner(db_path)
+        await runner.start()
+        api = ControlAPI(runner, port=_free_port(), token=API_TOKEN)
+        await api.start()
+        client = aiohttp.ClientSession(
+            base_url=f"http://{api.host}:{api.port}", headers={"Authorization": f"Bearer {API_TOKEN}"}
+        )
+        # Прогрев: сессия аккаунта и кэши создаются первой командой
+        await runner.execute("positions", {"account": "acc"})
+        yield runner, client
+        await client.close()
+        await api.stop()
+        await runner.stop()
+
+
+def _overhead(samples: list):
+    def extra():
+        ordered = sorted(samples)
+        return {"http_overhead_p50_ms": round(ordered[len(ordered) // 2], 2)}
+    return extra
+
+
+@benchmark("api.positions_in_process", number=20, rounds=5)
+async def positions_in_process():
+    """Базовая линия: та же команда без HTTP - только запрос к бирже"""
+    async for runner, _ in _api_env():
+        async def op():
+            await runner.execute("positions", {"account": "acc"})
+
+        yield op
+
+
+@benchmark("api.positions_http", number=20, rounds=5)
+async def positions_http():
+    """GET /accounts/acc/positions; накладные расходы = время клиента - ms команды"""
+    async for _, client in _api_env():
+        samples = []
+
+        async def op():
+            started = time.perf_counter()
+            async with client.get("/accounts/acc/positions") as response:
+                body = await response.json()
+            assert body["ok"], body
+            samples.append((time.perf_counter() - started) * 1000 - body["ms"])
+
+        op.extra = _overhead(samples)
+        yield op
+
+
+@benchmark("api.order_http", number=10, rounds=5)
+async def order_http():
+    """POST /accounts/acc/orders + закрытие: ордер по тёплой сессии с кэшем плеча"""
+    async for _, client in _api_env():
+        samples = []
+
+        async def op():
+            started = time.perf_counter()
+            async with client.post("/accounts/acc/orders", json={"coin": "BTC", "side": "long", "percent": 1}) as response:
+                body = await response.json()
+            assert body["ok"], body
+            samples.append((time.perf_counter() - started) * 1000 - body["ms"])
+            async with client.post("/accounts/acc/positions/BTC/close", json={}) as response:
+                assert (await response.json())["ok"]
+
+        op.extra = _overhead(samples)
+        yield op
@@ -0,0 +1,101 @@
+"""Запуск cli.py: холодный процесс против команды через демон с тёплой сессией"""
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_flows import MOCK_LATENCY, mock_account_kwargs
+from benchmarks.harness import benchmark
+from data import config
+from db.manager import AsyncDatabaseManager
+from db.tradeDB import TradeSQL
+from src.daemon.commands import CommandRunner
+from src.daemon.server import CommandDaemon
+from src.mock.arkham_server import MockArkhamServer, SESSION_COOKIE
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DAEMON_TOKEN = "bench-daemon-token"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _cli(env: dict, *args: str):
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "cli.py", *args, cwd=ROOT, env=env,
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+    )
+    assert await process.wait() == 0
+
+
+async def _cli_env():
+    """Mock-биржа и временная база с одним залогиненным аккаунтом"""
+    tmp = tempfile.TemporaryDirectory()
+    db_path = os.path.join(tmp.name, "bench.db")
+    async with MockArkhamServer(latency=MOCK_LATENCY) as server:
+        keys = mock_account_kwargs(0)
+        server.add_account("acc@mock.local", "password", **keys)
+        cookies = {SESSION_COOKIE: server.issue_session("acc@mock.local"), "created_at": int(time.time())}
+
+        db = AsyncDatabaseManager(db_path)
+        trade = TradeSQL(db)
+        await trade.create_table(config.TABLE_NAME)
+        await trade.add_info(config.TABLE_NAME, {
+            "account": "acc", "balance": 0, "points": 0, "volume": 0, "margin_fee": 0, "margin_bonus": 0,
+            "email": "acc@mock.local", "password": "password", "proxy": None,
+            "cookies": json.dumps(cookies), **keys,
+        })
+        await db.close()
+
+        port = _free_port()
+        env = {
+            **os.environ, "ARKHAM_BASE_URL": server.url, "ARKHAM_DAEMON_PORT": str(port),
+            "ARKHAM_DAEMON_TOKEN": DAEMON_TOKEN,
+        }
+        with server.patch_config():
+            yield server, db_path, port, env
+    tmp.cleanup()
+
+
+@benchmark("cli.startup_help", number=1, rounds=5)
+async def startup_help():
+    """Стоимость запуска процесса: интерпретатор + argparse + config, без клиентов"""
+    env = dict(os.environ)
+
+    async def op():
+        await _cli(env, "--help")
+
+    yield op
+
+
+@benchmark("cli.positions_local", number=1, rounds=5)
+async def positions_local():
+    """Без демона: импорт клиентов, открытие БД и новая сессия на каждую команду"""
+    async for _, db_path, _, env in _cli_env():
+        async def op():
+            await _cli(env, "--db", db_path, "--local", "positions", "acc")
+
+        yield op
+
+
+@benchmark("cli.positions_daemon", number=1, rounds=5)
+async def positions_daemon():
+    """Через демон: процесс cli.py только отправляет JSON-строку, сессия тёплая"""
+    async for _, db_path, port, env in _cli_env():
+        runner = CommandRunner(db_path)
+        await runner.start()
+        daemon = CommandDaemon(runner, port=port, token=DAEMON_TOKEN)
+        await daemon.start()
+
+        async def op():
+            await _cli(env, "positions", "acc")
+
+        yield op
+        await daemon.stop()
+        await runner.stop()
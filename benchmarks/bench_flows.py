@@ -0,0 +1,446 @@
+"""End-to-end сценарии против локального mock Arkham"""
+import asyncio
+import base64
+import json
+import os
+import tempfile
+import time
+
+import aiohttp
+from yarl import URL
+
+from benchmarks.harness import benchmark
+from data import config
+from db.manager import AsyncDatabaseManager
+from db.tradeDB import TradeSQL
+from src.account.info import ArkhamInfo
+from src.mock.arkham_server import MockArkhamServer, SESSION_COOKIE
+from src.trade.order_pipeline import OrderPipeline
+from src.trade.volume_farmer import VolumeFarmer, STATUS_DONE as FARM_DONE
+from src.trade.hedge_executor import HedgeExecutor, STATUS_HEDGED, STATUS_CLOSED
+from src.trade.basis_engine import BasisEngine
+from src.trade.trading_client import ArkhamTrading
+from utils.get_prices import ArkhamPrices
+from utils.leverage import ArkhamLeverage
+from utils.size_calc import PositionSizer
+from utils.captcha import CaptchaPool, TwoCaptcha, close_captcha_pools
+from db.repository import AccountRepository
+from db.writer import AccountWriteBehind
+from src.account.batch_login import BatchLogin, STATUS_OK
+from src.account.fleet_refresh import FleetRefresh, STATUS_OK as FLEET_OK
+
+# Задержка mock-сервера на запрос, чтобы сценарии были похожи на реальную сеть
+MOCK_LATENCY = float(os.getenv("BENCH_MOCK_LATENCY", "0.005"))
+CLOSE_ALL_COINS = [f"C{i:02d}" for i in range(20)]
+
+
+async def authed_session(server: MockArkhamServer, email: str) -> aiohttp.ClientSession:
+    """Отдельная сессия с уже выданной кукой mock-сервера"""
+    session = aiohttp.ClientSession(cookie_jar=aiohttp.CookieJar(unsafe=True))
+    session.cookie_jar.update_cookies({SESSION_COOKIE: server.issue_session(email)}, response_url=URL(server.url))
+    return session
+
+
+def mock_account_kwargs(i: int) -> dict:
+    return {
+        "api_key": f"bench-key-{i}",
+        "api_secret": base64.b64encode(f"bench-secret-{i}".encode()).decode(),
+    }
+
+
+@benchmark("flow.single_order", number=50, rounds=5)
+async def single_order():
+    async with MockArkhamServer(latency=MOCK_LATENCY) as server:
+        server.add_account("acc@mock.local", "password")
+        with server.patch_config():
+            session = await authed_session(server, "acc@mock.local")
+            trader = ArkhamTrading(session=session, coin="BTC", size=0.001)
+            yield trader.futures_long_market
+            await session.close()
+
+
+@benchmark("flow.close_all_20", number=5, rounds=5)
+async def close_all_20():
+    prices = {coin: 100.0 for coin in CLOSE_ALL_COINS}
+    async with MockArkhamServer(latency=MOCK_LATENCY, prices=prices) as server:
+        keys = mock_account_kwargs(0)
+        mock_account = server.add_account("acc@mock.local", "password", **keys)
+        with server.patch_config():
+            session = await authed_session(server, "acc@mock.local")
+            info = ArkhamInfo(session=session, **keys)
+            trader = ArkhamTrading(session=session, coin="LOLKEK", size=0, info_client=info)
+
+            async def op():
+                mock_account.positions = {
+                    f"{coin}_USDT_PERP": {"base": 1.0, "entry": 100.0, "leverage": 10}
+                    for coin in CLOSE_ALL_COINS
+                }
+                results = await trader.futures_close_position_market()
+                failed = [coin for coin in CLOSE_ALL_COINS if not results.get(coin)]
+                assert not failed, f"не закрыты: {failed}"
+                assert all(p["base"] == 0 for p in mock_account.positions.values())
+
+            yield op
+            await session.close()
+
+
+# Пока пользователь отвечает на вопросы о проценте и плече
+ORDER_THINK_TIME = 0.05
+
+
+async def _order_env():
+    async with MockArkhamServer(latency=MOCK_LATENCY) as server:
+        keys = mock_account_kwargs(0)
+        server.add_account("acc@mock.local", "password", **keys)
+        with server.patch_config():
+            session = await authed_session(server, "acc@mock.local")
+            info = ArkhamInfo(session=session, **keys)
+            prices = ArkhamPrices(session=session)
+            yield session, info, prices
+            await session.close()
+
+
+@benchmark("flow.open_position_sequential", number=10, rounds=5)
+async def open_position_sequential():
+    """Прежний порядок: вопросы, затем цена -> список плеч -> ордер по очереди"""
+    async for session, info, prices in _order_env():
+        async def op():
+            await asyncio.sleep(ORDER_THINK_TIME)
+            price = (await prices.get_futures_price("BTC"))["price"]
+            leverage = await ArkhamLeverage(session).leverage_seen("BTC")
+            size = PositionSizer(10000, int(leverage), float(price), 1).calculate_size()
+            assert await ArkhamTrading(session=session, coin="BTC", size=size).futures_long_market()
+
+        yield op
+
+
+@benchmark("flow.open_position_prefetched", number=10, rounds=5)
+async def open_position_prefetched():
+    """OrderPipeline: цена, плечо и маржа грузятся, пока пользователь отвечает"""
+    async for session, info, prices in _order_env():
+        pipeline = OrderPipeline(session, info, prices)
+        order_path = []
+
+        async def op():
+            pipeline.prefetch("BTC")
+            await asyncio.sleep(ORDER_THINK_TIME)
+            report = await pipeline.execute("BTC", "long", 1)
+            assert report["ok"], report
+            order_path.append(report["stages"]["total"])
+
+        def extra():
+            ordered = sorted(order_path)
+            return {"order_path_p50_ms": ordered[len(ordered) // 2]}
+
+        op.extra = extra
+        yield op
+
+
+@benchmark("flow.stats_refresh_50", number=1, rounds=5)
+async def stats_refresh_50():
+    tmp = tempfile.TemporaryDirectory()
+    db = AsyncDatabaseManager(os.path.join(tmp.name, "bench.db"))
+    trade = TradeSQL(db)
+    await trade.create_table(config.TABLE_NAME)
+
+    async with MockArkhamServer(latency=MOCK_LATENCY) as server:
+        clients = []
+        for i in range(50):
+            email = f"acc{i}@mock.local"
+            server.add_account(email, "password", **mock_account_kwargs(i))
+            await trade.add_info(config.TABLE_NAME, {
+                "account": f"acc{i}", "balance": 0, "points": 0, "volume": 0,
+                "margin_fee": 0, "margin_bonus": 0, "api_key": None, "api_secret": None,
+                "email": email, "password": "password", "cookies": None, "proxy": None,
+            })
+            session = await authed_session(server, email)
+            clients.append((f"acc{i}", session, ArkhamInfo(session=session, api_key=None, api_secret=None)))
+
+        with server.patch_config():
+            async def refresh(info: ArkhamInfo):
+                return await asyncio.gather(
+                    info.get_balance(),
+                    info.get_volume_or_points("volume"),
+                    info.get_volume_or_points("points"),
+                    info.get_fee_margin(),
+                )
+
+            async def op():
+                stats = await asyncio.gather(*(refresh(info) for _, _, info in clients))
+                for (name, _, _), (balance, volume, points, (bonus, fee)) in zip(clients, stats):
+                    await trade.update_account_data(
+                        config.TABLE_NAME, name, balance, volume, points, fee, bonus, cookies=None
+                    )
+
+            yield op
+
+        for _, session, _ in clients:
+            await session.close()
+    await db.close()
+    tmp.cleanup()
+
+
+FLEET_ACCOUNTS = 50
+
+
+async def _fleet_env():
+    """50 аккаунтов с живыми куками mock-сервера в базе и репозитории"""
+    tmp = tempfile.TemporaryDirectory()
+    db = AsyncDatabaseManager(os.path.join(tmp.name, "bench.db"))
+    trade = TradeSQL(db)
+    await trade.create_table(config.TABLE_NAME)
+
+    async with MockArkhamServer(latency=MOCK_LATENCY) as server:
+        rows = []
+        for i in range(FLEET_ACCOUNTS):
+            email = f"acc{i}@mock.local"
+            server.add_account(email, "password", **mock_account_kwargs(i))
+            cookies = json.dumps({SESSION_COOKIE: server.issue_session(email), "created_at": int(time.time())})
+            rows.append({
+                "account": f"acc{i}", "balance": 0, "points": 0, "volume": 0,
+                "margin_fee": 0, "margin_bonus": 0, "api_key": None, "api_secret": None,
+                "email": email, "password": "password", "cookies": cookies, "proxy": None,
+            })
+        await trade.add_info_many(config.TABLE_NAME, rows)
+        writer = AccountWriteBehind(trade, config.TABLE_NAME)
+        repository = AccountRepository(trade, config.TABLE_NAME, writer=writer)
+        await repository.load()
+        with server.patch_config():
+            yield repository
+
+    await db.close()
+    tmp.cleanup()
+
+
+@benchmark("flow.fleet_refresh_50_sequential", number=1, rounds=3)
+async def fleet_refresh_sequential():
+    """Статистика 50 аккаунтов по одному (как выбор каждого аккаунта по очереди)"""
+    async for repository in _fleet_env():
+        async def op():
+            report = await FleetRefresh(repository, concurrency=1).run()
+            assert all(item["status"] == FLEET_OK for item in report.values())
+
+        yield op
+
+
+@benchmark("flow.fleet_refresh_50", number=1, rounds=3)
+async def fleet_refresh_concurrent():
+    """Обзор флота: 50 аккаунтов параллельно, результаты одной транзакцией"""
+    async for repository in _fleet_env():
+        async def op():
+            report = await FleetRefresh(repository, per_proxy=FLEET_ACCOUNTS).run()
+            assert all(item["status"] == FLEET_OK for item in report.values())
+
+        yield op
+
+
+FARM_ACCOUNTS = 5
+FARM_TARGET = 100_000
+
+
+@benchmark("flow.volume_farm_5", number=1, rounds=3)
+async def volume_farm_5():
+    """Фарм 100k объёма на 5 аккаунтах параллельно, без пауз: накладные расходы планировщика"""
+    async with MockArkhamServer(latency=MOCK_LATENCY) as server:
+        with server.patch_config():
+            clients = {}
+            for i in range(FARM_ACCOUNTS):
+                email = f"farm{i}@mock.local"
+                keys = mock_account_kwargs(i)
+                server.add_account(email, "password", **keys)
+                clients[f"farm{i}"] = ArkhamInfo(session=await authed_session(server, email), **keys)
+
+            async def op():
+                targets = {name: server.accounts[f"{name}@mock.local"].perp_volume + FARM_TARGET for name in clients}
+                farmer = VolumeFarmer(clients, targets, volume_poll=0, hold=0, jitter=0)
+                plans = await farmer.plan(spacing=0, max_notional=10_000)
+                report = await farmer.run(plans)
+                assert all(state["status"] == FARM_DONE for state in report.values()), report
+
+            yield op
+            for info in clients.values():
+                await info.session.close()
+
+
+HEDGE_LONGS = ["hedge0", "hedge1"]
+HEDGE_SHORTS = ["hedge2", "hedge3"]
+HEDGE_NOTIONAL = 10_000
+
+
+async def _hedge_env():
+    """4 аккаунта с прогретыми сессиями; разброс задержки mock как у реальной сети"""
+    async with MockArkhamServer(latency=MOCK_LATENCY, jitter=MOCK_LATENCY / 2) as server:
+        with server.patch_config():
+            clients = {}
+            for i, name in enumerate(HEDGE_LONGS + HEDGE_SHORTS):
+                keys = mock_account_kwargs(i)
+                server.add_account(f"{name}@mock.local", "password", **keys)
+                clients[name] = ArkhamInfo(session=await authed_session(server, f"{name}@mock.local"), **keys)
+            yield clients
+            for info in clients.values():
+                await info.session.close()
+
+
+def _skew_extra(skews: list):
+    def extra():
+        ordered = sorted(skews)
+        return {"skew_p50_ms": round(ordered[len(ordered) // 2], 2), "skew_max_ms": round(ordered[-1], 2)}
+    return extra
+
+
+@benchmark("flow.hedge_legs_sequential", number=5, rounds=3)
+async def hedge_legs_sequential():
+    """Хедж руками: ноги по очереди (как открытие позиции в каждом аккаунте), закрытие так же"""
+    async for clients in _hedge_env():
+        skews = []
+
+        async def leg(name: str, coin: str, size: float, buy: bool, reduce_only: bool) -> float:
+            trader = ArkhamTrading(session=clients[name].session, coin=coin, size=size)
+            order = trader.futures_market_order("buy" if buy else "sell", reduce_only=reduce_only, size=size)
+            assert await trader.send_order(order, "hedge leg")
+            return time.perf_counter()
+
+        async def op():
+            price = (await ArkhamPrices(session=clients[HEDGE_LONGS[0]].session).get_futures_price("BTC"))["price"]
+            size = round(HEDGE_NOTIONAL / price / len(HEDGE_LONGS), 4)
+            acks = [await leg(name, "BTC", size, name in HEDGE_LONGS, False) for name in clients]
+            skews.append((acks[-1] - acks[0]) * 1000)
+            for name in clients:
+                await leg(name, "BTC", size, name not in HEDGE_LONGS, True)
+
+        op.extra = _skew_extra(skews)
+        yield op
+
+
+@benchmark("flow.hedge_open_close", number=5, rounds=3)
+async def hedge_open_close():
+    """HedgeExecutor: прогрев, ноги одним gather, одновременное закрытие"""
+    async for clients in _hedge_env():
+        executor = HedgeExecutor(clients)
+        skews = []
+
+        async def op():
+            report = await executor.open("BTC", HEDGE_NOTIONAL, HEDGE_LONGS, HEDGE_SHORTS)
+            assert report["status"] == STATUS_HEDGED, report
+            skews.append(report["skew_ms"])
+            closed = await executor.close("BTC", list(clients))
+            assert closed["status"] == STATUS_CLOSED, closed
+
+        op.extra = _skew_extra(skews)
+        yield op
+
+
+@benchmark("flow.basis_enter_exit", number=5, rounds=3)
+async def basis_enter_exit():
+    """Базис спот/перп: вход и выход двумя одновременными ногами, спот-балансы из /api/account/balances"""
+    async for session, info, prices in _order_env():
+        engine = BasisEngine(info, "acc")
+        skews = []
+
+        async def op():
+            entered = await engine.enter("BTC", HEDGE_NOTIONAL / 2)
+            assert entered["status"] == STATUS_HEDGED, entered
+            skews.append(entered["skew_ms"])
+            exited = await engine.exit("BTC")
+            assert exited["status"] == STATUS_HEDGED, exited
+
+        op.extra = _skew_extra(skews)
+        yield op
+
+
+# Время решения в mock 2captcha и интервал опроса в том же масштабе (реальные ~10-20 с и 2 с)
+CAPTCHA_SOLVE_TIME = 0.3
+
+
+async def _captcha_server():
+    original = (config.CAPTCHA_POLL_INTERVAL, config.CAPTCHA_INITIAL_WAIT)
+    config.CAPTCHA_POLL_INTERVAL = CAPTCHA_SOLVE_TIME / 10
+    config.CAPTCHA_INITIAL_WAIT = CAPTCHA_SOLVE_TIME
+    TwoCaptcha.solve_times.clear()
+    try:
+        async with MockArkhamServer(latency=MOCK_LATENCY, captcha_solve_time=CAPTCHA_SOLVE_TIME) as server:
+            with server.patch_config():
+                yield server
+    finally:
+        config.CAPTCHA_POLL_INTERVAL, config.CAPTCHA_INITIAL_WAIT = original
+
+
+@benchmark("flow.captcha_cold_solve_adaptive", number=3, rounds=3)
+async def captcha_cold_solve():
+    """Логин ждёт решения с нуля: create + адаптивный опрос"""
+    async for _ in _captcha_server():
+        session = aiohttp.ClientSession()
+
+        async def op():
+            assert await TwoCaptcha(session, "bench").solve_turnstile()
+
+        yield op
+        await session.close()
+
+
+@benchmark("flow.captcha_pooled_token", number=3, rounds=3)
+async def captcha_pooled_token():
+    """Токен из пула заранее решённых (пул успевает пополниться между логинами)"""
+    async for _ in _captcha_server():
+        pool = CaptchaPool("bench", size=2)
+        pool.start()
+        await asyncio.sleep(CAPTCHA_SOLVE_TIME * 2)
+
+        waits = []
+
+        async def op():
+            started = time.perf_counter()
+            assert await pool.get()
+            waits.append(time.perf_counter() - started)
+            # Пауза между логинами - пул успевает пополниться, в замер op она тоже входит
+            await asyncio.sleep(CAPTCHA_SOLVE_TIME * 1.5)
+
+        def extra():
+            ordered = sorted(waits)
+            return {**pool.metrics(), "token_wait_p50_ms": round(ordered[len(ordered) // 2] * 1000, 3)}
+
+        op.extra = extra
+        yield op
+        await pool.stop()
+
+
+BATCH_LOGIN_ACCOUNTS = 20
+
+
+@benchmark("flow.batch_login_20", number=1, rounds=3)
+async def batch_login_20():
+    """Перелогин 20 аккаунтов: капча + login + 2FA, куки одной транзакцией"""
+    tmp = tempfile.TemporaryDirectory()
+    db = AsyncDatabaseManager(os.path.join(tmp.name, "bench.db"))
+    trade = TradeSQL(db)
+    await trade.create_table(config.TABLE_NAME)
+
+    async for server in _captcha_server():
+        rows = []
+        for i in range(BATCH_LOGIN_ACCOUNTS):
+            email = f"acc{i}@mock.local"
+            server.add_account(email, "password")
+            rows.append({
+                "account": f"acc{i}", "balance": 0, "points": 0, "volume": 0,
+                "margin_fee": 0, "margin_bonus": 0, "api_key": None, "api_secret": None,
+                "email": email, "password": "password", "cookies": None, "proxy": None,
+                "captcha_key": "bench",
+            })
+        await trade.add_info_many(config.TABLE_NAME, rows)
+        writer = AccountWriteBehind(trade, config.TABLE_NAME)
+        repository = AccountRepository(trade, config.TABLE_NAME, writer=writer)
+        await repository.load()
+
+        async def code(row):
+            return "123456"
+
+        async def op():
+            accounts = [row["account"] for row in rows]
+            report = await BatchLogin(repository, per_proxy=10, code_provider=code).run(accounts)
+            assert all(item["status"] == STATUS_OK for item in report.values())
+
+        yield op
+        await close_captcha_pools()
+
+    await db.close()
+    tmp.cleanup()
@@ -0,0 +1,226 @@
+"""CPU hot paths: сборка ордера, округление, расчёт размера, подписи, тикеры, upsert в SQLite, логи ордеров, риск портфеля"""
+import base64
+import os
+import tempfile
+import time
+
+from loguru import logger
+
+from benchmarks.harness import benchmark
+from data import config
+from db.manager import AsyncDatabaseManager
+from db.tradeDB import TradeSQL
+from src.account.info import ArkhamInfo
+from src.trade.risk_engine import PortfolioRisk
+from src.trade.trading_client import ArkhamTrading
+from utils.get_prices import ArkhamPrices
+from utils.log import flush_logging, setup_logging
+from utils.points import cheapest_points, project_fleet
+from utils.size_calc import PositionSizer
+
+API_KEY = "bench-key"
+API_SECRET = base64.b64encode(b"bench-secret").decode()
+
+FUTURES_TICKER = {
+    "symbol": "BTC_USDT_PERP",
+    "productType": "perpetual",
+    "price": "60000.5",
+    "markPrice": "60001.1",
+    "indexPrice": "59999.9",
+    "high24h": "61000",
+    "low24h": "59000",
+    "volume24h": "123456.7",
+    "price24hAgo": "59500",
+    "fundingRate": "0.0001",
+    "nextFundingRate": "0.00012",
+    "nextFundingTime": 1700000000000000,
+    "openInterest": "1000",
+    "openInterestUSD": "60000000",
+}
+
+
+def _trader() -> ArkhamTrading:
+    return ArkhamTrading(session=None, coin="BTC", size=0.01234567)
+
+
+@benchmark("hot.create_order_data", number=20000)
+def create_order_data():
+    trader = _trader()
+    return lambda: trader._create_order_data(side="buy", order_type="market", is_futures=True)
+
+
+@benchmark("hot.create_order_data_reduce_only", number=20000)
+def create_order_data_reduce_only():
+    trader = _trader()
+    return lambda: trader._create_order_data(
+        side="sell", order_type="market", is_futures=True,
+        reduce_only=True, use_custom_size=True, custom_size=0.123456,
+    )
+
+
+@benchmark("hot.round_size", number=50000)
+def round_size():
+    trader = _trader()
+    return lambda: trader.round_size(0.0123456789)
+
+
+@benchmark("hot.adjust_reduce_size", number=50000)
+def adjust_reduce_size():
+    trader = _trader()
+    return lambda: trader.adjust_reduce_size(0.0123456789)
+
+
+@benchmark("hot.position_sizer", number=50000)
+def position_sizer():
+    return lambda: PositionSizer(1234.56, 10, 60000.5, 25).calculate_size()
+
+
+@benchmark("hot.sign_info_headers", number=20000)
+def sign_info_headers():
+    info = ArkhamInfo(session=None, api_key=API_KEY, api_secret=API_SECRET)
+    return lambda: info.headers(signed=True, path="/api/account/positions", query="subaccountId=0")
+
+
+@benchmark("hot.sign_prices_request", number=20000)
+def sign_prices_request():
+    prices = ArkhamPrices(api_key=API_KEY, api_secret=API_SECRET)
+    return lambda: prices._generate_signature("POST", "/orders/new", '{"symbol":"BTC_USDT_PERP"}')
+
+
+@benchmark("hot.parse_futures_ticker", number=20000)
+def parse_futures_ticker():
+    return lambda: ArkhamPrices.parse_futures_ticker("BTC", FUTURES_TICKER)
+
+
+@benchmark("hot.tradesql_upsert", number=200, rounds=3)
+async def tradesql_upsert():
+    tmp = tempfile.TemporaryDirectory()
+    db = AsyncDatabaseManager(os.path.join(tmp.name, "bench.db"))
+    trade = TradeSQL(db)
+    await trade.create_table(config.TABLE_NAME)
+    counter = {"i": 0}
+
+    async def op():
+        counter["i"] += 1
+        await trade.add_info(config.TABLE_NAME, {
+            "account": f"acc{counter['i'] % 100}",
+            "balance": 100.0, "points": 10, "volume": 1000.0,
+            "margin_fee": 1.0, "margin_bonus": 1.0,
+            "api_key": API_KEY, "api_secret": API_SECRET,
+            "email": "bench@mock.local", "password": "password",
+            "cookies": None, "proxy": None,
+        })
+
+    yield op
+    await db.close()
+    tmp.cleanup()
+
+
+# Медленный терминал: запись одной строки
+SLOW_TERMINAL_DELAY = 0.0005
+
+
+class _SlowTerminal:
+    def write(self, message):
+        time.sleep(SLOW_TERMINAL_DELAY)
+
+    def flush(self):
+        pass
+
+
+def _order_log():
+    logger.bind(account="acc", symbol="BTC_USDT_PERP", client_order_id="0" * 32, latency_ms=12.3).success(
+        "Futures market LONG BTC на 0.01234 успешно выполнено!"
+    )
+
+
+@benchmark("hot.order_log_blocking_sinks", number=200, rounds=3)
+async def order_log_blocking_sinks():
+    """Прежняя схема: терминал и файл пишутся в вызывающем потоке, event loop ждёт их"""
+    tmp = tempfile.TemporaryDirectory()
+    handlers = [
+        logger.add(_SlowTerminal()),
+        logger.add(os.path.join(tmp.name, "log.jsonl"), serialize=True),
+    ]
+    yield _order_log
+    for handler in handlers:
+        logger.remove(handler)
+    tmp.cleanup()
+
+
+@benchmark("hot.order_log_enqueued_sinks", number=200, rounds=3)
+async def order_log_enqueued_sinks():
+    """setup_logging: enqueue-sink'и, лишние строки терминала отбрасываются до очереди"""
+    tmp = tempfile.TemporaryDirectory()
+    setup_logging(terminal=_SlowTerminal(), json_path=os.path.join(tmp.name, "log.jsonl"))
+    yield _order_log
+    await flush_logging()
+    logger.remove()
+    tmp.cleanup()
+
+
+POINTS_FLEET = [
+    {"account": f"acc{i}", "volume": (i * 7919) % 25_000_000, "margin_fee": i % 50, "margin_bonus": i % 20}
+    for i in range(10_000)
+]
+POINTS_SCENARIOS = [None, 100_000, 250_000, 500_000, 1_000_000, 2_000_000, 5_000_000, 10_000_000, 20_000_000, 50_000_000]
+
+
+@benchmark("points.project_fleet_10k_x10", number=1, rounds=5)
+def points_project_fleet():
+    """Тир, расстояние до следующего и цена очков: 10 000 аккаунтов x 10 сценариев"""
+    def op():
+        fleet = project_fleet(POINTS_FLEET, "futures", POINTS_SCENARIOS)
+        cheapest_points(fleet, limit=20)
+
+    return op
+
+
+RISK_COINS = {"BTC": 60000.0, "ETH": 3000.0, "SOL": 150.0, "ARKM": 0.6, "DOGE": 0.12}
+RISK_ACCOUNTS = 1000
+
+
+def _risk_positions(i: int, shift: float = 0.0) -> dict:
+    return {
+        coin: {"base": ((i * 31 + j * 17) % 21 - 10) / 10 / price * 10_000 + shift, "mark": price, "entry": price}
+        for j, (coin, price) in enumerate(RISK_COINS.items())
+    }
+
+
+RISK_FLEET = {f"acc{i}": _risk_positions(i) for i in range(RISK_ACCOUNTS)}
+RISK_MARGIN = {"equity": 20_000.0}
+
+
+def _risk_engine() -> PortfolioRisk:
+    risk = PortfolioRisk()
+    for name, positions in RISK_FLEET.items():
+        risk.update(name, positions, RISK_MARGIN)
+    return risk
+
+
+@benchmark("hot.risk_full_rebuild_1000", number=5, rounds=3)
+def risk_full_rebuild():
+    """Изменился один аккаунт - пересобрать экспозицию и стресс флота 1000 x 5 монет заново"""
+    def op():
+        risk = _risk_engine()
+        risk.exposure()
+        risk.stress()
+
+    return op
+
+
+@benchmark("hot.risk_incremental_update_1000", number=200, rounds=3)
+def risk_incremental_update():
+    """Изменился один аккаунт - update() только его строк, затем экспозиция, стресс и check_order"""
+    risk = _risk_engine()
+    names = list(RISK_FLEET)
+    counter = iter(range(10**9))
+
+    def op():
+        i = next(counter) % RISK_ACCOUNTS
+        risk.update(names[i], _risk_positions(i, shift=0.001), RISK_MARGIN)
+        risk.exposure()
+        risk.stress()
+        risk.check_order(names[i], "BTC", "buy", 0.01, RISK_COINS["BTC"])
+
+    return op
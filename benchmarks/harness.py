@@ -0,0 +1,156 @@
+"""
+Минимальный харнесс бенчмарков.
+
+Бенчмарк - это фабрика, зарегистрированная декоратором @benchmark.
+Фабрика возвращает операцию для замера (sync или async callable).
+Если нужна подготовка/очистка (mock-сервер, временная БД) - фабрика
+пишется как async генератор: код до yield - setup, после - teardown.
+"""
+import asyncio
+import inspect
+import json
+import platform
+import statistics
+import time
+from typing import Callable, Dict, List
+
+_REGISTRY: Dict[str, dict] = {}
+
+
+def benchmark(name: str, number: int = 1000, rounds: int = 5, warmup: int = 1):
+    """
+    Зарегистрировать бенчмарк
+
+    Args:
+        name: уникальное имя (группа задаётся префиксом до точки)
+        number: количество вызовов операции в одном раунде
+        rounds: количество раундов замера
+        warmup: количество прогревочных раундов
+    """
+    def decorator(factory: Callable):
+        if name in _REGISTRY:
+            raise ValueError(f"Бенчмарк '{name}' уже зарегистрирован")
+        _REGISTRY[name] = {
+            "factory": factory,
+            "number": number,
+            "rounds": rounds,
+            "warmup": warmup,
+        }
+        return factory
+    return decorator
+
+
+def registered(pattern: str | None = None) -> List[str]:
+    return [name for name in _REGISTRY if not pattern or pattern in name]
+
+
+async def _time_round(op: Callable, number: int, is_async: bool) -> float:
+    start = time.perf_counter()
+    if is_async:
+        for _ in range(number):
+            await op()
+    else:
+        for _ in range(number):
+            op()
+    return time.perf_counter() - start
+
+
+async def _measure(op: Callable, spec: dict) -> dict:
+    is_async = inspect.iscoroutinefunction(op)
+    for _ in range(spec["warmup"]):
+        await _time_round(op, spec["number"], is_async)
+
+    per_op = []
+    for _ in range(spec["rounds"]):
+        elapsed = await _time_round(op, spec["number"], is_async)
+        per_op.append(elapsed / spec["number"])
+
+    per_op.sort()
+    return {
+        "number": spec["number"],
+        "rounds": spec["rounds"],
+        "min": per_op[0],
+        "median": statistics.median(per_op),
+        "mean": statistics.fmean(per_op),
+        "max": per_op[-1],
+        "unit": "s/op",
+    }
+
+
+async def run_one(name: str) -> dict:
+    spec = _REGISTRY[name]
+    factory = spec["factory"]
+
+    if inspect.isasyncgenfunction(factory):
+        gen = factory()
+        op = await gen.__anext__()
+        try:
+            result = await _measure(op, spec)
+        except BaseException:
+            await gen.aclose()
+            raise
+        # teardown: дойти до конца генератора
+        async for _ in gen:
+            pass
+    else:
+        op = factory()
+        if inspect.isawaitable(op):
+            op = await op
+        result = await _measure(op, spec)
+
+    extra = getattr(op, "extra", None)
+    if extra:
+        result["extra"] = extra() if callable(extra) else extra
+    return result
+
+
+async def run_all(pattern: str | None = None, on_result: Callable | None = None) -> Dict[str, dict]:
+    results = {}
+    for name in registered(pattern):
+        results[name] = await run_one(name)
+        if on_result:
+            on_result(name, results[name])
+        await asyncio.sleep(0)
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> Dict[str, dict]:
+    """
+    Сравнить медианы с базовой линией.
+    Регрессия - если медиана выросла больше чем на threshold (0.2 = +20%).
+    """
+    report = {}
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            report[name] = {"status": "new"}
+            continue
+        ratio = current["median"] / base["median"] if base["median"] else float("inf")
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 - threshold:
+            status = "improvement"
+        else:
+            status = "ok"
+        report[name] = {"status": status, "ratio": round(ratio, 4), "baseline_median": base["median"]}
+    return report
+
+
+def write_results(path: str, results: Dict[str, dict], comparison: Dict[str, dict] | None = None):
+    payload = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": int(time.time()),
+        },
+        "results": results,
+    }
+    if comparison is not None:
+        payload["comparison"] = comparison
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+
+
+def load_results(path: str) -> Dict[str, dict]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
@@ -0,0 +1,81 @@
+"""
+Запуск бенчмарков:
+
+    python -m benchmarks.run                          # все бенчмарки
+    python -m benchmarks.run -k hot.                  # только CPU hot paths
+    python -m benchmarks.run --save-baseline          # записать базовую линию
+    python -m benchmarks.run --threshold 0.15         # сравнить с базовой линией (±15%)
+
+Код возврата 1, если есть регрессии относительно базовой линии.
+"""
+import argparse
+import asyncio
+import importlib
+import os
+import sys
+
+from loguru import logger
+
+from benchmarks import harness
+
+BENCH_MODULES = [
+    "benchmarks.bench_hot_paths",
+    "benchmarks.bench_flows",
+    "benchmarks.bench_db",
+    "benchmarks.bench_cli",
+    "benchmarks.bench_api",
+]
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results", "latest.json")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+
+def _print_result(name: str, result: dict):
+    print(f"{name:<40} median {result['median'] * 1e6:>12.2f} µs/op   min {result['min'] * 1e6:>12.2f} µs/op")
+    for key, value in result.get("extra", {}).items():
+        print(f"    {key}: {value}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ArkhamBot benchmarks")
+    parser.add_argument("-k", "--filter", default=None, help="подстрока имени бенчмарка")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимый рост медианы (0.2 = 20%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="сохранить результаты как базовую линию")
+    args = parser.parse_args()
+
+    # Логи клиентов не должны попадать в замеры и вывод
+    logger.remove()
+    for module in BENCH_MODULES:
+        importlib.import_module(module)
+
+    results = asyncio.run(harness.run_all(args.filter, on_result=_print_result))
+
+    comparison = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        comparison = harness.compare(results, harness.load_results(args.baseline), args.threshold)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    harness.write_results(args.output, results, comparison)
+    print(f"\nРезультаты записаны в {args.output}")
+
+    if args.save_baseline:
+        harness.write_results(args.baseline, results)
+        print(f"Базовая линия записана в {args.baseline}")
+        return 0
+
+    if comparison:
+        regressions = {name: c for name, c in comparison.items() if c["status"] == "regression"}
+        for name, c in comparison.items():
+            if c["status"] != "new":
+                print(f"{name:<40} {c['status']:<12} x{c['ratio']}")
+        if regressions:
+            print(f"\n❌ Регрессии ({len(regressions)}): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
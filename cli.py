@@ -0,0 +1,238 @@
+"""
+Неинтерактивный CLI ArkhamBot.
+
+    python cli.py accounts
+    python cli.py positions <account>
+    python cli.py open <account> BTC long 10 --leverage 5
+    python cli.py close <account> BTC
+    python cli.py close-all <account>
+    python cli.py refresh [account]
+    python cli.py stats <account>
+    python cli.py daemon [start|stop|status] [--http]
+
+Если запущен демон (python cli.py daemon), команды выполняются в нём на
+тёплых сессиях; иначе - в этом процессе. Клиенты биржи, база и loguru
+импортируются только при локальном выполнении, rich/InquirerPy - никогда.
+--timing печатает в stderr, на что ушло время запуска.
+"""
+import time
+
+_STARTED = time.perf_counter()
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+
+from data import config
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description="ArkhamBot без интерактивного меню")
+    parser.add_argument("--db", default=config.DB_NAME, help="путь к базе (только локальное выполнение)")
+    parser.add_argument("--local", action="store_true", help="не обращаться к демону")
+    parser.add_argument("--timing", action="store_true", help="время запуска и команды в stderr")
+    parser.add_argument("-v", "--verbose", action="store_true", help="логи клиентов в stderr")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("accounts", help="список аккаунтов и состояние сессий")
+
+    stats = commands.add_parser("stats", help="сохранённые баланс/объём/очки аккаунта")
+    stats.add_argument("account")
+
+    positions = commands.add_parser("positions", help="открытые фьючерсные позиции")
+    positions.add_argument("account")
+
+    open_cmd = commands.add_parser("open", help="открыть позицию по рынку")
+    open_cmd.add_argument("account")
+    open_cmd.add_argument("coin")
+    open_cmd.add_argument("side", choices=["long", "short"])
+    open_cmd.add_argument("percent", type=float, help="процент депозита")
+    open_cmd.add_argument("--leverage", type=int, default=None)
+
+    close = commands.add_parser("close", help="закрыть позицию по монете по рынку")
+    close.add_argument("account")
+    close.add_argument("coin")
+
+    close_all = commands.add_parser("close-all", help="закрыть все позиции по рынку")
+    close_all.add_argument("account")
+
+    refresh = commands.add_parser("refresh", help="обновить баланс/объём/очки")
+    refresh.add_argument("account", nargs="?", default=None)
+
+    daemon = commands.add_parser("daemon", help="долгоживущий процесс с тёплыми сессиями")
+    daemon.add_argument("action", nargs="?", choices=["start", "stop", "status"], default="start")
+    daemon.add_argument(
+        "--http", action="store_true", default=config.CONTROL_API_ENABLED,
+        help=f"также поднять HTTP API на {config.CONTROL_API_HOST}:{config.CONTROL_API_PORT}",
+    )
+    return parser
+
+
+def command_args(args: argparse.Namespace) -> dict:
+    """Аргументы CommandRunner.execute из разобранной командной строки"""
+    if args.command == "accounts":
+        return {}
+    if args.command == "open":
+        return {
+            "account": args.account, "coin": args.coin, "side": args.side,
+            "percent": args.percent, "leverage": args.leverage,
+        }
+    if args.command == "close":
+        return {"account": args.account, "coin": args.coin}
+    return {"account": args.account}
+
+
+def configure_logging(level: str):
+    from utils.log import setup_logging
+
+    setup_logging(level)
+
+
+async def run_local(command: str, args: dict, db_name: str, timings: dict) -> dict:
+    started = time.perf_counter()
+    from src.daemon.commands import CommandError, CommandRunner
+    timings["imports"] = time.perf_counter() - started
+
+    runner = CommandRunner(db_name)
+    started = time.perf_counter()
+    await runner.start()
+    timings["db"] = time.perf_counter() - started
+    try:
+        started = time.perf_counter()
+        try:
+            # Клиенты печатают через print - stdout остаётся только под JSON результата
+            with contextlib.redirect_stdout(sys.stderr):
+                result = await runner.execute(command, args)
+            return {"ok": True, "result": result}
+        except CommandError as e:
+            return {"ok": False, "error": str(e)}
+        finally:
+            timings["command"] = time.perf_counter() - started
+    finally:
+        await runner.stop()
+        from utils.log import flush_logging
+        await flush_logging()
+
+
+async def run_daemon(db_name: str, http: bool = False):
+    from loguru import logger
+    from src.daemon.commands import CommandRunner
+    from src.daemon.server import CommandDaemon
+
+    runner = CommandRunner(db_name, live_risk=True)
+    await runner.start()
+    daemon = CommandDaemon(runner)
+    api = None
+    refresher = None
+    try:
+        await daemon.start()
+    except OSError as e:
+        await runner.stop()
+        logger.error(f"Не удалось открыть порт {config.DAEMON_PORT}: {e}")
+        return 1
+
+    if http:
+        from src.daemon.http_api import ControlAPI
+        api = ControlAPI(runner)
+        try:
+            await api.start()
+        except OSError as e:
+            await daemon.stop()
+            await runner.stop()
+            logger.error(f"Не удалось открыть порт {config.CONTROL_API_PORT}: {e}")
+            return 1
+
+    if config.SESSION_REFRESH_ENABLED:
+        from src.account.session_refresher import SessionRefresher
+        refresher = SessionRefresher(runner.repository)
+        refresher.start()
+
+    loop = asyncio.get_running_loop()
+    try:
+        import signal
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, lambda: asyncio.create_task(daemon.stop()))
+    except (NotImplementedError, RuntimeError):
+        pass  # Windows: остановка через Ctrl+C (KeyboardInterrupt) или "daemon stop"
+
+    print(f"Демон запущен на {config.DAEMON_HOST}:{config.DAEMON_PORT} (остановка: python cli.py daemon stop)", file=sys.stderr)
+    try:
+        await daemon.serve_forever()
+    finally:
+        await daemon.stop()
+        if api:
+            await api.stop()
+        if refresher:
+            await refresher.stop()
+        from utils.captcha import close_captcha_pools
+        await close_captcha_pools()
+        await runner.stop()
+        from utils.log import flush_logging
+        await flush_logging()
+    return 0
+
+
+async def run(args: argparse.Namespace, timings: dict) -> int:
+    from src.daemon.auth import resolve_token
+    from src.daemon.client import send_command
+
+    token = resolve_token(config.DAEMON_TOKEN, config.DAEMON_TOKEN_FILE)
+
+    if args.command == "daemon":
+        if args.action == "start":
+            if await send_command("ping", host=config.DAEMON_HOST, port=config.DAEMON_PORT, token=token):
+                print("Демон уже запущен", file=sys.stderr)
+                return 1
+            configure_logging("DEBUG" if args.verbose else "INFO")
+            return await run_daemon(args.db, http=args.http)
+        command = "shutdown" if args.action == "stop" else "ping"
+        response = await send_command(command, host=config.DAEMON_HOST, port=config.DAEMON_PORT, token=token)
+        if response is None:
+            print("Демон не запущен", file=sys.stderr)
+            return 1
+    else:
+        response = None
+        if not args.local:
+            started = time.perf_counter()
+            response = await send_command(
+                args.command, command_args(args), host=config.DAEMON_HOST,
+                port=config.DAEMON_PORT, token=token,
+            )
+            if response is not None:
+                timings["daemon"] = time.perf_counter() - started
+        if response is None:
+            configure_logging("DEBUG" if args.verbose else "WARNING")
+            response = await run_local(args.command, command_args(args), args.db, timings)
+
+    if response.get("ok"):
+        print(json.dumps(response.get("result"), ensure_ascii=False, indent=2, default=str))
+        return 0
+    print(f"Ошибка: {response.get('error')}", file=sys.stderr)
+    return 1
+
+
+def report_timings(timings: dict):
+    parts = [f"{name} {seconds * 1000:.1f} мс" for name, seconds in timings.items()]
+    print(f"⏱ {' | '.join(parts)} | всего {(time.perf_counter() - _STARTED) * 1000:.1f} мс", file=sys.stderr)
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    timings = {"startup": time.perf_counter() - _STARTED}
+
+    if hasattr(asyncio, "WindowsProactorEventLoopPolicy") and os.name == "nt":
+        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+    try:
+        code = asyncio.run(run(args, timings))
+    except KeyboardInterrupt:
+        code = 130
+    if args.timing:
+        report_timings(timings)
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
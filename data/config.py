@@ -1,8 +1,11 @@
+import os
+
 # =========================
 #  Системные константы
 # =========================
+BASE_URL = os.getenv("ARKHAM_BASE_URL", "https://arkm.com")
 SITE_KEY = "0x4AAAAAABCVqfQCJfxkyXT8"
-PAGE_URL = "https://arkm.com/uk/login?redirectPath=%2Fuk"
+PAGE_URL = f"{BASE_URL}/uk/login?redirectPath=%2Fuk"
 RES_URL = "http://2captcha.com/res.php"
 CREATE_URL = "http://2captcha.com/in.php"
 COOKIE_FILE = "cookies.json"
@@ -11,7 +14,103 @@ COOKIE_FILE = "cookies.json"
 # =========================
 DB_NAME = 'trade.db' 
 TABLE_NAME = "accounts"
+SNAPSHOTS_TABLE_NAME = "account_snapshots"
+# Логи: терминал (не чаще N строк/с, ошибки всегда) и JSON-файл с ротацией и сжатием в фоновом потоке
+LOG_LEVEL = "INFO"
+LOG_TERMINAL_RATE = 20
+LOG_TERMINAL_BURST = 50
+LOG_JSON_PATH = os.getenv("ARKHAM_LOG_JSON", "logs/arkham.jsonl")
+LOG_JSON_LEVEL = "DEBUG"
+LOG_ROTATION = "20 MB"
+LOG_RETENTION = "14 days"
+# Хранение истории: сырые снимки -> почасовые -> дневные -> удаление
+SNAPSHOT_RAW_DAYS = 7
+SNAPSHOT_HOURLY_DAYS = 90
+SNAPSHOT_MAX_DAYS = 365
+# Импорт аккаунтов из CSV/JSONL: размер пачки (одна транзакция) и параллельные логины
+IMPORT_BATCH_SIZE = 500
+IMPORT_LOGIN_CONCURRENCY = 3
+# 2captcha: общий таймаут решения и интервал опроса после ожидаемого времени решения
+CAPTCHA_TIMEOUT = 180
+CAPTCHA_POLL_INTERVAL = 2
+CAPTCHA_INITIAL_WAIT = 10  # ожидаемое время решения, пока нет статистики
+# Пул заранее решённых токенов: каждый токен оплачивается, протухшие - потерянные деньги (0 - выключить)
+CAPTCHA_POOL_SIZE = 2
+CAPTCHA_TOKEN_TTL = 280  # Turnstile-токен живёт ~300 с
+CAPTCHA_MAX_FAILURES = 3
+# TOTP 2FA: не отправлять код, если до конца 30-секундного окна осталось меньше N секунд
+TOTP_MIN_REMAINING = 5
+# Пакетный перелогин: всего параллельных логинов и не больше N через один прокси
+BATCH_LOGIN_CONCURRENCY = 10
+BATCH_LOGIN_PER_PROXY = 2
+# Единая политика жизни куков сессии Arkham (секунды с момента логина)
+COOKIES_TTL = 1800
+# Фоновое обновление сессий (только аккаунты с totp_secret)
+SESSION_REFRESH_ENABLED = True
+SESSION_REFRESH_TICK = 60
+SESSION_REFRESH_LEAD = 300  # перелогин за N секунд до истечения куков
+SESSION_REFRESH_JITTER = 120  # разброс, чтобы капчи не решались одной волной
+SESSION_PROBE_INTERVAL = 600  # проверка, что сервер не отозвал сессию раньше срока
+SESSION_REFRESH_RETRY = 120
+SESSION_PROBE_CONCURRENCY = 10  # проверки живости: всего параллельно и не больше N через один прокси
+SESSION_PROBE_PER_PROXY = 2
+# Обзор флота: обновление статистики всех аккаунтов, всего параллельно и не больше N через один прокси
+FLEET_REFRESH_CONCURRENCY = 20
+FLEET_REFRESH_PER_PROXY = 2
+FLEET_RENDER_INTERVAL = 0.1
+# CLI-демон (python cli.py daemon): команды cli.py идут в него и переиспользуют тёплые сессии
+DAEMON_HOST = "127.0.0.1"
+DAEMON_PORT = int(os.getenv("ARKHAM_DAEMON_PORT", "8765"))
+DAEMON_TOKEN = os.getenv("ARKHAM_DAEMON_TOKEN")  # общий секрет команд; None - взять из DAEMON_TOKEN_FILE
+DAEMON_TOKEN_FILE = os.getenv("ARKHAM_DAEMON_TOKEN_FILE", "daemon.token")  # создаётся демоном с правами 0600
+CLI_REFRESH_CONCURRENCY = 10
+# HTTP API управления внутри демона (python cli.py daemon --http) для внешних сигналов
+CONTROL_API_ENABLED = os.getenv("ARKHAM_CONTROL_API") == "1"
+CONTROL_API_HOST = "127.0.0.1"
+CONTROL_API_PORT = int(os.getenv("ARKHAM_CONTROL_API_PORT", "8766"))
+CONTROL_API_TOKEN = os.getenv("ARKHAM_CONTROL_API_TOKEN") or DAEMON_TOKEN  # None - токен из DAEMON_TOKEN_FILE
+# Живой дашборд позиций: опрос биржи, частота перерисовки и возраст данных, после которого строка устарела
+POSITIONS_POLL_INTERVAL = 2
+DASHBOARD_FPS = 4
+POSITIONS_STALE_AFTER = 6
 DEFAULT_LEVERAGE = 10
+# Открытие позиции: цена и маржа из префетча старше N секунд перезапрашиваются; список плеч кэшируется
+ORDER_PREFETCH_MAX_AGE = 15
+LEVERAGE_CACHE_TTL = 300
+# Кэш балансов активов (/api/account/balances), с
+BALANCES_CACHE_TTL = 5
+# Фарм объёма круговыми сделками: символы-кандидаты, риск-лимиты и темп
+FARM_SYMBOLS = ["BTC", "ETH", "SOL"]
+FARM_CONCURRENCY = 5
+FARM_LEVERAGE = 5
+FARM_MARGIN_PCT = 50  # notional сделки не больше N% доступной маржи x плечо
+FARM_MAX_NOTIONAL = 20000
+FARM_MAX_SLIPPAGE_BPS = 2
+FARM_IMPACT_COEF = 0.1  # проскальзывание ~ coef * sqrt(notional / суточный оборот)
+FARM_HOLD_SECONDS = 3
+FARM_SPACING = 20
+FARM_SPACING_JITTER = 10
+FARM_VOLUME_POLL = 300  # реальный объём с affiliate-dashboard не чаще раза в N секунд
+FARM_MAX_LOSS_PCT = 2
+FARM_EXTRA_TRIPS = 5  # сделок сверх плана, если биржа учла объём меньше ожидаемого
+FARM_SIZE_STEP = 0.0001  # шаг reduceOnly: сделка открывается размером, который закрывается целиком
+# Хедж между аккаунтами: шаг размера ноги (совпадает с шагом reduceOnly), повторы неудавшейся ноги до отката
+HEDGE_SIZE_STEP = 0.0001
+HEDGE_RETRIES = 1
+HEDGE_RETRY_DELAY = 0.2
+HEDGE_MAX_SKEW_MS = 250  # разброс подтверждений ног, выше которого пишется предупреждение
+# Базисная сделка спот/перп в одном аккаунте: общий шаг размера обеих ног и частота фандинга
+BASIS_SIZE_STEP = 0.0001
+FUNDING_PERIODS_PER_DAY = 24  # фандинг начисляется каждый час
+# Риск-лимиты портфеля (0/None - без лимита): проверяются перед фьючерсными ордерами на открытие
+RISK_MAX_NET_NOTIONAL = 100000  # |нетто $| по одной монете во всём флоте
+RISK_MAX_GROSS_NOTIONAL = 1000000
+RISK_MAX_ACCOUNT_LEVERAGE = 15  # брутто $ / equity аккаунта
+RISK_MIN_LIQ_DISTANCE_PCT = 3  # движение против аккаунта до ликвидации, %
+RISK_MAINTENANCE_RATE = 0.005  # поддерживающая маржа, доля брутто
+RISK_STRESS_SHOCKS = [-0.3, -0.2, -0.1, -0.05, 0.05, 0.1, 0.2, 0.3]
+RISK_TABLE_ROWS = 15  # аккаунтов в таблице ближайших к ликвидации
+RISK_LIMITS_COMMANDS = os.getenv("ARKHAM_RISK_LIMITS", "1") != "0"  # лимиты для ордеров cli.py, демона и HTTP API
 # =========================
 #  Points
 # =========================
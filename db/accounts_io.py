@@ -0,0 +1,220 @@
+import asyncio
+import csv
+import json
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from db.tradeDB import TradeSQL
+from utils.cookies import cookies_expires_at
+from utils.proxy import normalize_proxy
+from utils.totp import valid_secret
+
+IMPORT_FIELDS = (
+    "account", "email", "password", "proxy", "api_key", "api_secret", "captcha_key", "totp_secret", "cookies",
+)
+REQUIRED_FIELDS = ("email", "password")
+
+
+def _file_format(path: str) -> str:
+    suffix = Path(path).suffix.lower()
+    if suffix == ".csv":
+        return "csv"
+    if suffix in (".jsonl", ".ndjson"):
+        return "jsonl"
+    raise ValueError(f"Неподдерживаемый формат файла '{suffix}' (нужен .csv или .jsonl)")
+
+
+def _normalize_row(raw: Dict) -> Dict:
+    """Привести строку файла к параметрам get_import_accounts_sql"""
+    row = {}
+    for field in IMPORT_FIELDS:
+        value = raw.get(field)
+        if isinstance(value, str):
+            value = value.strip() or None
+        row[field] = value
+
+    missing = [field for field in REQUIRED_FIELDS if not row[field]]
+    if missing:
+        raise ValueError(f"нет обязательных полей: {', '.join(missing)}")
+
+    if row["totp_secret"] and not valid_secret(row["totp_secret"]):
+        raise ValueError("totp_secret не является base32-секретом")
+
+    row["account"] = row["account"] or row["email"]
+    row["proxy"] = normalize_proxy(str(row["proxy"])) if row["proxy"] else None
+    row["cookies_expires_at"] = cookies_expires_at(row["cookies"])
+    if isinstance(row["cookies"], (dict, list)):
+        row["cookies"] = json.dumps(row["cookies"], ensure_ascii=False)
+    return row
+
+
+def iter_account_rows(path: str) -> Iterator[Tuple[int, Dict | None, str | None]]:
+    """
+    Построчно читать CSV (с заголовком) или JSONL.
+    Отдаёт (номер строки, нормализованная строка, None) или (номер строки, None, ошибка).
+    """
+    fmt = _file_format(path)
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if fmt == "csv":
+            sample = f.readline()
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+            except csv.Error:
+                dialect = csv.excel
+            header = [name.strip().lower() for name in next(csv.reader([sample], dialect))]
+            for line_no, values in enumerate(csv.reader(f, dialect), start=2):
+                if not any(values):
+                    continue
+                try:
+                    yield line_no, _normalize_row(dict(zip(header, values))), None
+                except ValueError as e:
+                    yield line_no, None, str(e)
+        else:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    data = json.loads(line)
+                    if not isinstance(data, dict):
+                        raise ValueError("строка не является JSON-объектом")
+                    yield line_no, _normalize_row({k.lower(): v for k, v in data.items()}), None
+                except (ValueError, json.JSONDecodeError) as e:
+                    yield line_no, None, str(e)
+
+
+def _next_batch(rows: Iterator, batch_size: int) -> List:
+    batch = []
+    for item in rows:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            break
+    return batch
+
+
+async def import_accounts(
+    trade_sql: TradeSQL,
+    table_name: str,
+    path: str,
+    batch_size: int = 500,
+    login: Optional[Callable[[Dict], Awaitable[bool]]] = None,
+    login_concurrency: int = 3,
+) -> Dict:
+    """
+    Потоковый импорт аккаунтов из CSV/JSONL.
+
+    Файл читается пачками по batch_size строк в отдельном потоке, каждая пачка
+    пишется одной транзакцией (get_import_accounts_sql). Если передан login,
+    импортированные аккаунты логинятся параллельно с импортом, но не более
+    login_concurrency одновременно; очередь ограничена, поэтому чтение файла
+    не убегает далеко вперёд логинов.
+
+    Returns:
+        dict: imported, skipped [(строка, причина)], failed_batches, logged_in, login_failed [account]
+    """
+    report = {"imported": 0, "skipped": [], "failed_batches": 0, "logged_in": 0, "login_failed": []}
+    queue: asyncio.Queue = asyncio.Queue(maxsize=login_concurrency * 2)
+
+    async def login_worker():
+        while True:
+            row = await queue.get()
+            try:
+                if row is None:
+                    return
+                ok = False
+                try:
+                    ok = await login(row)
+                except Exception as e:
+                    logger.error(f"Ошибка логина импортированного аккаунта '{row['account']}': {e}")
+                if ok:
+                    report["logged_in"] += 1
+                else:
+                    report["login_failed"].append(row["account"])
+            finally:
+                queue.task_done()
+
+    workers = [asyncio.create_task(login_worker()) for _ in range(login_concurrency)] if login else []
+    rows = iter_account_rows(path)
+    try:
+        while True:
+            batch = await asyncio.to_thread(_next_batch, rows, batch_size)
+            if not batch:
+                break
+
+            valid = []
+            skipped = 0
+            for line_no, row, error in batch:
+                if error:
+                    skipped += 1
+                    report["skipped"].append((line_no, error))
+                    logger.debug(f"Импорт: строка {line_no} пропущена - {error}")
+                else:
+                    valid.append(row)
+            if skipped:
+                logger.warning(f"Импорт: пропущено строк в пачке: {skipped}")
+
+            try:
+                await trade_sql.import_accounts_many(table_name, valid)
+            except Exception:
+                report["failed_batches"] += 1
+                continue
+            report["imported"] += len(valid)
+            logger.info(f"Импортировано аккаунтов: {report['imported']}")
+
+            for row in valid:
+                if workers:
+                    await queue.put(row)
+    finally:
+        rows.close()
+        for _ in workers:
+            await queue.put(None)
+        if workers:
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    logger.success(
+        f"Импорт завершён: {report['imported']} аккаунтов, пропущено строк {len(report['skipped'])}"
+    )
+    return report
+
+
+def _write_rows(f, fmt: str, writer: Optional[csv.DictWriter], rows: List[Dict]):
+    if fmt == "csv":
+        writer.writerows(rows)
+    else:
+        f.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+
+async def export_accounts(
+    trade_sql: TradeSQL,
+    table_name: str,
+    path: str,
+    columns: Optional[List[str]] = None,
+    batch_size: int = 500,
+) -> int:
+    """
+    Потоковый экспорт таблицы аккаунтов в CSV/JSONL (формат по расширению).
+    columns - выбранные колонки (по умолчанию все), в памяти не больше batch_size строк.
+
+    Returns:
+        int: число выгруженных строк
+    """
+    fmt = _file_format(path)
+    available = await trade_sql.get_columns(table_name)
+    columns = list(columns or available)
+    unknown = [column for column in columns if column not in available]
+    if unknown:
+        raise ValueError(f"Неизвестные колонки: {', '.join(unknown)}")
+
+    exported = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = None
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+        async for rows in trade_sql.iterate_columns(table_name, columns, batch_size=batch_size):
+            await asyncio.to_thread(_write_rows, f, fmt, writer, rows)
+            exported += len(rows)
+
+    logger.success(f"Экспортировано аккаунтов: {exported} -> {path}")
+    return exported
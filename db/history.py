@@ -0,0 +1,166 @@
+import time
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from db.manager import AsyncDatabaseManager
+from db.schemas import (
+    get_snapshots_table_sql,
+    get_snapshots_index_sql,
+    get_insert_snapshot_sql,
+)
+
+DAY = 86400
+HOUR = 3600
+
+
+class AccountHistory:
+    """
+    Append-only история снимков статистики аккаунтов (balance, points, volume, маржа).
+
+    Ключ (account, ts) - кластерный (WITHOUT ROWID), поэтому выборка по
+    аккаунту и диапазону времени - это range scan без обращения к индексу.
+    Индекс по ts обслуживает запросы по всему флоту и retention.
+    """
+    def __init__(self, db: AsyncDatabaseManager, table_name: str):
+        self.db = db
+        self.table_name = table_name
+
+    async def create_table(self):
+        try:
+            await self.db.execute(get_snapshots_table_sql(self.table_name))
+            await self.db.execute(get_snapshots_index_sql(self.table_name))
+            logger.success(f"Таблица истории '{self.table_name}' создана или уже существует")
+        except Exception as e:
+            logger.error(f"Ошибка создания таблицы истории '{self.table_name}': {e}")
+            raise
+
+    @staticmethod
+    def snapshot(
+        account: str,
+        balance: float | None,
+        volume: float | None,
+        points: float | None,
+        fee: float | None,
+        bonus: float | None,
+        ts: int | None = None,
+    ) -> Dict:
+        return {
+            "account": account,
+            "ts": int(ts if ts is not None else time.time()),
+            "balance": balance,
+            "points": points,
+            "volume": volume,
+            "margin_fee": fee,
+            "margin_bonus": bonus,
+        }
+
+    async def record_many(self, snapshots: List[Dict]):
+        """Записать снимки (внутри транзакции вызывающего, если она открыта)"""
+        if snapshots:
+            await self.db.executemany(get_insert_snapshot_sql(self.table_name), snapshots)
+
+    # --- Запросы ---
+    async def get_range(self, account: str, start: int, end: int | None = None) -> List[Dict]:
+        """Снимки аккаунта за период [start, end]"""
+        return await self.db.fetchall(
+            f"""
+            SELECT ts, balance, points, volume, margin_fee, margin_bonus
+            FROM {self.table_name}
+            WHERE account = :account AND ts BETWEEN :start AND :end
+            ORDER BY ts
+            """,
+            {"account": account, "start": int(start), "end": int(end if end is not None else time.time())},
+        )
+
+    async def daily_deltas(self, account: Optional[str] = None, days: int = 30) -> List[Dict]:
+        """
+        Прирост points / volume / balance по дням.
+        Берётся последний снимок каждого дня и разница с предыдущим днём.
+        """
+        account_filter = "AND account = :account" if account else ""
+        return await self.db.fetchall(
+            f"""
+            WITH daily AS (
+                SELECT account, ts / {DAY} AS day, MAX(ts) AS ts
+                FROM {self.table_name}
+                WHERE ts >= :start {account_filter}
+                GROUP BY account, day
+            )
+            SELECT d.account,
+                   d.day * {DAY} AS day_ts,
+                   s.balance, s.points, s.volume,
+                   s.points - LAG(s.points) OVER w AS points_delta,
+                   s.volume - LAG(s.volume) OVER w AS volume_delta,
+                   s.balance - LAG(s.balance) OVER w AS balance_delta
+            FROM daily d
+            JOIN {self.table_name} s ON s.account = d.account AND s.ts = d.ts
+            WINDOW w AS (PARTITION BY d.account ORDER BY d.day)
+            ORDER BY d.account, d.day
+            """,
+            {"account": account, "start": int(time.time()) - (days + 1) * DAY},
+        )
+
+    async def points_per_volume(self, start: int, end: int | None = None, account: Optional[str] = None) -> List[Dict]:
+        """Очки на $ объёма за период (points и volume в снимках накопительные)"""
+        account_filter = "AND account = :account" if account else ""
+        return await self.db.fetchall(
+            f"""
+            SELECT account,
+                   MAX(points) - MIN(points) AS points_gained,
+                   MAX(volume) - MIN(volume) AS volume_traded,
+                   CASE WHEN MAX(volume) > MIN(volume)
+                        THEN (MAX(points) - MIN(points)) / (MAX(volume) - MIN(volume))
+                   END AS points_per_usd
+            FROM {self.table_name}
+            WHERE ts BETWEEN :start AND :end {account_filter}
+            GROUP BY account
+            ORDER BY points_per_usd DESC
+            """,
+            {"account": account, "start": int(start), "end": int(end if end is not None else time.time())},
+        )
+
+    # --- Retention ---
+    async def _downsample(self, cutoff: int, bucket: int):
+        """Оставить последний снимок в каждом bucket для строк старше cutoff"""
+        await self.db.execute(
+            f"""
+            DELETE FROM {self.table_name}
+            WHERE ts < :cutoff
+              AND (account, ts) NOT IN (
+                  SELECT account, MAX(ts) FROM {self.table_name}
+                  WHERE ts < :cutoff
+                  GROUP BY account, ts / {bucket}
+              )
+            """,
+            {"cutoff": cutoff},
+        )
+
+    async def apply_retention(
+        self,
+        raw_days: int,
+        hourly_days: int,
+        max_days: int,
+        vacuum: bool = False,
+    ):
+        """
+        Политика хранения:
+            - моложе raw_days - все снимки
+            - до hourly_days - последний снимок в час
+            - до max_days - последний снимок в день
+            - старше max_days - удаляются
+        """
+        now = int(time.time())
+        try:
+            async with self.db.transaction():
+                await self.db.execute(
+                    f"DELETE FROM {self.table_name} WHERE ts < :cutoff",
+                    {"cutoff": now - max_days * DAY},
+                )
+                await self._downsample(now - hourly_days * DAY, DAY)
+                await self._downsample(now - raw_days * DAY, HOUR)
+            if vacuum:
+                await self.db.execute("VACUUM")
+            logger.info(f"Retention истории '{self.table_name}' применён")
+        except Exception as e:
+            logger.error(f"Ошибка retention истории '{self.table_name}': {e}")
@@ -1,47 +1,179 @@
+import asyncio
+import contextvars
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Iterable, List, Dict, Optional
+
 import aiosqlite
-from typing import List, Dict, Optional
+
+# Режим производительности: WAL + отложенный fsync + увеличенный кэш страниц
+PERFORMANCE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+READER_PRAGMAS = (
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA busy_timeout=5000",
+)
+
 
 class AsyncDatabaseManager:
-    def __init__(self, db_path: str):
+    """
+    Пул соединений SQLite: одно соединение-писатель и readers соединений
+    только для чтения (WAL позволяет читать параллельно с записью).
+    execute/executemany/transaction идут в писателя, fetchall/fetchone -
+    в свободного читателя. Чтения внутри transaction() идут в писателя,
+    чтобы видеть ещё не закоммиченные изменения.
+    """
+    def __init__(self, db_path: str, performance_mode: bool = True, readers: int = 4):
         self.db_path = db_path
+        self.performance_mode = performance_mode
+        # Без WAL или для :memory: читатели не видят данных писателя
+        in_memory = db_path == ":memory:" or db_path.startswith("file::memory:")
+        self.readers = readers if performance_mode and not in_memory else 0
         self._conn: Optional[aiosqlite.Connection] = None
+        self._readers: List[aiosqlite.Connection] = []
+        self._idle_readers: Optional[asyncio.Queue] = None
+        self._connect_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+        self._in_transaction = contextvars.ContextVar(f"in_transaction_{id(self)}", default=False)
 
     async def connect(self):
-        """Создать подключение и держать его открытым"""
-        if self._conn is None:
-            self._conn = await aiosqlite.connect(self.db_path)
-            self._conn.row_factory = aiosqlite.Row  
+        """Создать подключения и держать их открытыми"""
+        if self._conn is not None:
+            return
+        async with self._connect_lock:
+            if self._conn is not None:
+                return
+            conn = await aiosqlite.connect(self.db_path)
+            conn.row_factory = aiosqlite.Row
+            if self.performance_mode:
+                for pragma in PERFORMANCE_PRAGMAS:
+                    await conn.execute(pragma)
+            await self._open_readers()
+            self._conn = conn
+
+    async def _open_readers(self):
+        self._idle_readers = asyncio.Queue()
+        uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+        for _ in range(self.readers):
+            reader = await aiosqlite.connect(uri, uri=True)
+            reader.row_factory = aiosqlite.Row
+            for pragma in READER_PRAGMAS:
+                await reader.execute(pragma)
+            self._readers.append(reader)
+            self._idle_readers.put_nowait(reader)
 
     async def close(self):
-        """Закрыть соединение с базой данных"""
+        """Закрыть соединения с базой данных"""
         try:
-            if hasattr(self, 'connection') and self.connection:
-                await self.connection.close()
-                print("[green]✅ Соединение с БД закрыто[/green]")
-            elif hasattr(self, 'pool') and self.pool:
-                # Если используете connection pool
-                await self.pool.close()
-                print("[green]✅ Connection pool закрыт[/green]")
+            for reader in self._readers:
+                await reader.close()
+            if self._conn is not None:
+                await self._conn.close()
         except Exception as e:
-            print(f"[yellow]⚠️ Ошибка при закрытии БД: {e}[/yellow]")
+            print(f"⚠️ Ошибка при закрытии БД: {e}")
+        finally:
+            self._readers = []
+            self._idle_readers = None
+            self._conn = None
+
+    @asynccontextmanager
+    async def _read_connection(self):
+        """Свободный читатель из пула или писатель (транзакция / пул выключен)"""
+        await self.connect()
+        if not self._readers or self._in_transaction.get():
+            yield self._conn
+            return
+
+        reader = await self._idle_readers.get()
+        try:
+            yield reader
+        finally:
+            self._idle_readers.put_nowait(reader)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Явная транзакция: все execute/executemany внутри блока
+        коммитятся одним COMMIT (один fsync) или откатываются при ошибке.
+        Вложенные вызовы присоединяются к внешней транзакции.
+        """
+        if self._in_transaction.get():
+            yield self
+            return
+
+        await self.connect()
+        async with self._write_lock:
+            token = self._in_transaction.set(True)
+            try:
+                await self._conn.execute("BEGIN")
+                yield self
+            except BaseException:
+                await self._conn.rollback()
+                raise
+            else:
+                await self._conn.commit()
+            finally:
+                self._in_transaction.reset(token)
 
     async def execute(self, query: str, params: Dict = None):
         await self.connect()
-        if params:
-            await self._conn.execute(query, params)
-        else:
-            await self._conn.execute(query)
-        await self._conn.commit()
+        if self._in_transaction.get():
+            await self._conn.execute(query, params or {})
+            return
 
-    async def fetchall(self, query: str, params: Dict = None) -> List[Dict]:
+        async with self._write_lock:
+            if params:
+                await self._conn.execute(query, params)
+            else:
+                await self._conn.execute(query)
+            await self._conn.commit()
+
+    async def executemany(self, query: str, params_seq: Iterable[Dict]):
+        """Выполнить запрос для набора параметров (bulk upsert)"""
         await self.connect()
-        cursor = await self._conn.execute(query, params or {})
-        rows = await cursor.fetchall()
+        if self._in_transaction.get():
+            await self._conn.executemany(query, params_seq)
+            return
+
+        async with self._write_lock:
+            await self._conn.executemany(query, params_seq)
+            await self._conn.commit()
+
+    async def fetchall(self, query: str, params: Dict = None) -> List[Dict]:
+        async with self._read_connection() as conn:
+            cursor = await conn.execute(query, params or {})
+            rows = await cursor.fetchall()
+            await cursor.close()
         return [dict(row) for row in rows]
 
     async def fetchone(self, query: str, params: Dict = None) -> Optional[Dict]:
         """Получить одну строку как dict"""
-        await self.connect()
-        cursor = await self._conn.execute(query, params or {})
-        row = await cursor.fetchone()
+        async with self._read_connection() as conn:
+            cursor = await conn.execute(query, params or {})
+            row = await cursor.fetchone()
+            await cursor.close()
         return dict(row) if row else None
+
+    async def iterate(self, query: str, params: Dict = None, batch_size: int = 500) -> AsyncIterator[List[Dict]]:
+        """
+        Потоковое чтение через fetchmany: в памяти не больше batch_size строк.
+        Читатель занят, пока генератор не исчерпан или не закрыт.
+        """
+        async with self._read_connection() as conn:
+            cursor = await conn.execute(query, params or {})
+            try:
+                while True:
+                    rows = await cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield [dict(row) for row in rows]
+            finally:
+                await cursor.close()
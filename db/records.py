@@ -0,0 +1,73 @@
+import json
+import time
+from typing import Dict, Iterable, Optional
+
+
+class AccountRecord:
+    """
+    Компактная строка таблицы аккаунтов для массовых операций.
+
+    __slots__ вместо dict на экземпляр, без валидации и без клиентов:
+    куки хранятся сырой JSON-строкой и разбираются только по запросу.
+    Клиенты и сессия появляются, когда аккаунт активируют
+    (Account.from_record) - у тысяч записей флота их нет.
+
+    get()/update()/to_dict() повторяют интерфейс строки-словаря, поэтому
+    запись можно передавать туда, где раньше был dict из fetchall.
+    """
+    FIELDS = (
+        "id", "account", "balance", "points", "volume", "margin_fee", "margin_bonus",
+        "api_key", "api_secret", "email", "password", "cookies", "proxy",
+        "captcha_key", "cookies_expires_at", "totp_secret",
+    )
+    __slots__ = FIELDS
+
+    def __init__(self, **fields):
+        for name in self.FIELDS:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_row(cls, row: Dict) -> "AccountRecord":
+        """Запись из строки БД; колонки вне FIELDS игнорируются"""
+        record = cls.__new__(cls)
+        for name in cls.FIELDS:
+            value = row.get(name)
+            if name == "cookies" and isinstance(value, dict):
+                value = json.dumps(value, ensure_ascii=False)
+            object.__setattr__(record, name, value)
+        return record
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict]) -> list["AccountRecord"]:
+        return [cls.from_row(row) for row in rows]
+
+    # --- Интерфейс строки-словаря ---
+    def get(self, name: str, default=None):
+        value = getattr(self, name, None) if name in self.FIELDS else None
+        return default if value is None else value
+
+    def update(self, fields: Dict):
+        for name, value in fields.items():
+            if name in self.FIELDS:
+                if name == "cookies" and isinstance(value, dict):
+                    value = json.dumps(value, ensure_ascii=False)
+                setattr(self, name, value)
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    # --- Производные значения ---
+    def parsed_cookies(self) -> Optional[dict]:
+        """Куки как dict (None - нет или не разбираются)"""
+        if not self.cookies:
+            return None
+        try:
+            return json.loads(self.cookies)
+        except (json.JSONDecodeError, TypeError):
+            return None
+
+    def session_valid(self, now: Optional[float] = None) -> bool:
+        return (self.cookies_expires_at or 0) > (now or time.time())
+
+    def __repr__(self) -> str:
+        return f"AccountRecord(account={self.account!r})"
@@ -0,0 +1,306 @@
+import json
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional
+
+from loguru import logger
+
+from db.records import AccountRecord
+from db.schemas import get_select_fields_by_account_sql
+from db.tradeDB import TradeSQL
+from db.writer import AccountWriteBehind
+from utils.cookies import cookies_expires_at
+
+
+class AccountRepository:
+    """
+    In-memory индекс таблицы аккаунтов с write-through в SQLite.
+
+    load() читает таблицу один раз, дальше чтение полей (cookies, proxy,
+    email/password, вся строка) идёт из словаря по имени аккаунта.
+    Строки хранятся компактными AccountRecord (__slots__), наружу
+    отдаются копии-словари; records() отдаёт сами записи без копирования.
+    Если при max_size вся таблица в память не помещается, листинги
+    (list_accounts/get_all/records) читаются из SQLite потоково, мимо LRU.
+    Записи сразу применяются к памяти и уходят в SQLite - через
+    AccountWriteBehind, если он передан, иначе напрямую через TradeSQL.
+
+    Args:
+        trade_sql: экземпляр TradeSQL
+        table_name: таблица аккаунтов
+        writer: фоновая запись (опционально)
+        max_size: LRU-ограничение числа строк в памяти (None - без ограничения)
+    """
+    def __init__(
+        self,
+        trade_sql: TradeSQL,
+        table_name: str,
+        writer: AccountWriteBehind | None = None,
+        max_size: int | None = None,
+    ):
+        self.trade_sql = trade_sql
+        self.db = trade_sql.db
+        self.table_name = table_name
+        self.writer = writer
+        self.max_size = max_size
+
+        self._rows: "OrderedDict[str, AccountRecord]" = OrderedDict()
+        self._cookies: Dict[str, Optional[dict]] = {}
+        # True - в памяти вся таблица, промах означает "аккаунта нет"
+        self._complete = False
+        self._loaded = False
+
+    # --- Кэш ---
+    async def load(self):
+        """Загрузить таблицу в память (пачками - без промежуточного списка всех строк)"""
+        self._rows.clear()
+        self._cookies.clear()
+        total = 0
+        async for rows in self.trade_sql.iterate_columns(self.table_name, list(AccountRecord.FIELDS)):
+            for row in rows:
+                self._put(row)
+            total += len(rows)
+        self._complete = self.max_size is None or total <= self.max_size
+        self._loaded = True
+        logger.info(f"Загружено аккаунтов в память: {len(self._rows)} из {total}")
+
+    def _put(self, row: Dict) -> AccountRecord:
+        account = row["account"]
+        record = self._rows[account] = AccountRecord.from_row(row)
+        self._rows.move_to_end(account)
+        self._cookies.pop(account, None)
+        if self.max_size is not None and len(self._rows) > self.max_size:
+            evicted, _ = self._rows.popitem(last=False)
+            self._cookies.pop(evicted, None)
+            self._complete = False
+        return record
+
+    def _get(self, account: str) -> Optional[AccountRecord]:
+        row = self._rows.get(account)
+        if row is not None:
+            self._rows.move_to_end(account)
+        return row
+
+    def _patch(self, account: str, fields: Dict):
+        row = self._rows.get(account)
+        if row is not None:
+            row.update(fields)
+            if "cookies" in fields:
+                self._cookies.pop(account, None)
+
+    async def _fetch_fields(self, account: str, fields: List[str]) -> Optional[Dict]:
+        """Проекционный запрос, когда строки нет в памяти (после сброса отложенных записей)"""
+        if self._complete:
+            return None
+        await self._flush_writer()
+        return await self.db.fetchone(
+            get_select_fields_by_account_sql(self.table_name, fields), {"account": account}
+        )
+
+    async def _cached(self) -> bool:
+        """Можно ли отдать листинг из памяти (первый вызов загружает таблицу)"""
+        if not self._complete and not self._loaded:
+            await self.load()
+        return self._complete
+
+    async def _stream(self, columns: List[str]) -> AsyncIterator[Dict]:
+        """Строки таблицы из SQLite пачками, без вытеснения LRU"""
+        await self._flush_writer()
+        async for rows in self.trade_sql.iterate_columns(self.table_name, columns):
+            for row in rows:
+                yield row
+
+    # --- Чтение ---
+    async def list_accounts(self) -> List[str]:
+        if await self._cached():
+            return list(self._rows)
+        return [row["account"] async for row in self._stream(["account"])]
+
+    async def get_all(self) -> List[Dict]:
+        if await self._cached():
+            return [row.to_dict() for row in self._rows.values()]
+        return [
+            AccountRecord.from_row(row).to_dict()
+            async for row in self._stream(list(AccountRecord.FIELDS))
+        ]
+
+    async def records(self) -> List[AccountRecord]:
+        """Записи всех аккаунтов без копирования - только для чтения"""
+        if await self._cached():
+            return list(self._rows.values())
+        return [AccountRecord.from_row(row) async for row in self._stream(list(AccountRecord.FIELDS))]
+
+    async def get_account(self, account: str) -> Optional[Dict]:
+        row = self._get(account)
+        if row is None and not self._complete:
+            await self._flush_writer()
+            fetched = await self.trade_sql.get_account(self.table_name, account)
+            if fetched:
+                row = self._put(fetched)
+        return row.to_dict() if row else None
+
+    async def get_cookies(self, account: str) -> Optional[dict]:
+        """Cookies аккаунта как dict (JSON разбирается один раз на запись)"""
+        if account in self._cookies:
+            return self._cookies[account]
+
+        row = self._get(account) or await self._fetch_fields(account, ["cookies"])
+        raw = row.get("cookies") if row else None
+        try:
+            cookies = json.loads(raw) if raw else None
+        except (json.JSONDecodeError, TypeError) as e:
+            logger.error(f"Ошибка разбора cookies для аккаунта '{account}': {e}")
+            cookies = None
+        if account in self._rows:
+            self._cookies[account] = cookies
+        return cookies
+
+    async def session_valid(self, account: str) -> bool:
+        """Куки не истекли - по cookies_expires_at, без разбора JSON"""
+        row = self._get(account) or await self._fetch_fields(account, ["cookies_expires_at"])
+        return bool(row) and (row.get("cookies_expires_at") or 0) > time.time()
+
+    async def accounts_to_relogin(self, within: int = 0) -> List[str]:
+        """Аккаунты без куков или с куками, истекающими в ближайшие within секунд"""
+        if not self._complete:
+            await self._flush_writer()
+            return await self.trade_sql.get_accounts_to_relogin(self.table_name, within)
+        deadline = time.time() + within
+        expiring = [
+            (row.get("cookies_expires_at") or 0, account)
+            for account, row in self._rows.items()
+            if (row.get("cookies_expires_at") or 0) <= deadline
+        ]
+        return [account for _, account in sorted(expiring)]
+
+    async def get_proxy(self, account: str) -> Optional[str]:
+        row = self._get(account) or await self._fetch_fields(account, ["proxy"])
+        return row.get("proxy") if row else None
+
+    async def get_email_password(self, account: str) -> tuple[str | None, str | None]:
+        row = self._get(account) or await self._fetch_fields(account, ["email", "password"])
+        if row:
+            return row.get("email"), row.get("password")
+        return None, None
+
+    # --- Запись (write-through) ---
+    async def add_info(self, info: Dict):
+        info = TradeSQL._info_params(info)
+        row = self._rows.get(info["account"])
+        if row is None:
+            self._put(info)
+        else:
+            row.update(info)
+            self._rows.move_to_end(info["account"])
+            self._cookies.pop(info["account"], None)
+        if self.writer:
+            self.writer.add_info(info)
+        else:
+            await self.trade_sql.add_info(self.table_name, info)
+
+    async def update_account_data(
+        self,
+        account: str,
+        balance: str | None,
+        volume: str | None,
+        points: str | None,
+        fee: str | None,
+        bonus: str | None,
+        cookies: dict | None = None,
+    ):
+        params = TradeSQL._account_data_params(account, balance, volume, points, fee, bonus, cookies)
+        if params["cookies"] is None:
+            params.pop("cookies")
+            params.pop("cookies_expires_at")
+        self._patch(account, params)
+        if cookies and account in self._rows:
+            self._cookies[account] = cookies
+
+        if self.writer:
+            self.writer.update_account_data(account, balance, volume, points, fee, bonus, cookies)
+        else:
+            await self.trade_sql.update_account_data(
+                self.table_name, account, balance, volume, points, fee, bonus, cookies
+            )
+
+    async def update_account_data_many(self, rows: List[Dict]):
+        """
+        Статистика многих аккаунтов одной транзакцией (через сброс writer или напрямую).
+        rows: dict с ключами account, balance, volume, points, fee, bonus
+        """
+        for row in rows:
+            params = TradeSQL._account_data_params(
+                row["account"], row.get("balance"), row.get("volume"), row.get("points"),
+                row.get("fee"), row.get("bonus"), None,
+            )
+            params.pop("cookies")
+            params.pop("cookies_expires_at")
+            self._patch(row["account"], params)
+        if self.writer:
+            for row in rows:
+                self.writer.update_account_data(
+                    row["account"], row.get("balance"), row.get("volume"), row.get("points"),
+                    row.get("fee"), row.get("bonus"),
+                )
+            await self.writer.flush()
+        else:
+            await self.trade_sql.update_account_data_many(self.table_name, rows)
+
+    async def update_cookies(self, account: str, cookies: dict):
+        self._patch(account, {
+            "cookies": json.dumps(cookies, ensure_ascii=False),
+            "cookies_expires_at": cookies_expires_at(cookies),
+        })
+        if account in self._rows:
+            self._cookies[account] = cookies
+        if self.writer:
+            self.writer.update_cookies(account, cookies)
+        else:
+            await self.trade_sql.update_cookies(self.table_name, account, cookies)
+
+    async def update_cookies_many(self, cookies_by_account: Dict[str, dict]):
+        """Cookies многих аккаунтов одной транзакцией (через сброс writer или напрямую)"""
+        for account, cookies in cookies_by_account.items():
+            self._patch(account, {
+                "cookies": json.dumps(cookies, ensure_ascii=False),
+                "cookies_expires_at": cookies_expires_at(cookies),
+            })
+            if account in self._rows:
+                self._cookies[account] = cookies
+        if self.writer:
+            for account, cookies in cookies_by_account.items():
+                self.writer.update_cookies(account, cookies)
+            await self.writer.flush()
+        else:
+            await self.trade_sql.update_cookies_many(self.table_name, cookies_by_account)
+
+    async def update_proxy(self, account: str, proxy: str):
+        await self._flush_writer()
+        await self.trade_sql.update_proxy(self.table_name, account, proxy)
+        self._patch(account, {"proxy": proxy})
+
+    async def update_email_password(self, account: str, email: str, password: str):
+        await self._flush_writer()
+        await self.trade_sql.update_email_password(self.table_name, account, email, password)
+        self._patch(account, {"email": email, "password": password})
+
+    async def delete_account(self, account: str) -> bool:
+        await self._flush_writer()
+        deleted = await self.trade_sql.delete_account(self.table_name, account)
+        if deleted:
+            self._rows.pop(account, None)
+            self._cookies.pop(account, None)
+        return deleted
+
+    async def clear(self):
+        await self._flush_writer()
+        await self.trade_sql.clear_table(self.table_name)
+        self._rows.clear()
+        self._cookies.clear()
+        self._complete = True
+        self._loaded = True
+
+    async def _flush_writer(self):
+        """Отложенные записи должны попасть в БД раньше прямых изменений"""
+        if self.writer:
+            await self.writer.flush()
@@ -13,16 +13,52 @@ def get_info_table_sql(table_name: str) -> str:
         email TEXT NOT NULL,
         password TEXT NOT NULL,
         cookies TEXT,
-        proxy TEXT
+        proxy TEXT,
+        captcha_key TEXT,
+        cookies_expires_at INTEGER NOT NULL DEFAULT 0,
+        totp_secret TEXT
     )
     """
 
+# Колонки, добавленные после первой версии таблицы: старые базы догоняются ALTER TABLE
+ACCOUNT_MIGRATION_COLUMNS = {
+    "captcha_key": "TEXT",
+    "cookies_expires_at": "INTEGER NOT NULL DEFAULT 0",
+    "totp_secret": "TEXT",
+}
+
+def get_cookies_expiry_index_sql(table_name: str) -> str:
+    return f"CREATE INDEX IF NOT EXISTS idx_{table_name}_cookies_expires_at ON {table_name} (cookies_expires_at)"
+
+def get_backfill_cookies_expiry_sql(table_name: str) -> str:
+    # Одноразовое заполнение из created_at внутри JSON для баз, созданных до появления колонки
+    return f"""
+    UPDATE {table_name}
+    SET cookies_expires_at = CAST(json_extract(cookies, '$.created_at') AS INTEGER) + :ttl
+    WHERE cookies_expires_at = 0
+      AND json_valid(cookies)
+      AND json_extract(cookies, '$.created_at') IS NOT NULL
+    """
+
+def get_select_expiring_sql(table_name: str) -> str:
+    return f"""
+    SELECT account FROM {table_name}
+    WHERE cookies_expires_at <= :deadline
+    ORDER BY cookies_expires_at
+    """
+
+def get_table_columns_sql(table_name: str) -> str:
+    return f"PRAGMA table_info({table_name})"
+
+def get_add_column_sql(table_name: str, column: str, column_type: str) -> str:
+    return f"ALTER TABLE {table_name} ADD COLUMN {column} {column_type}"
+
 def get_insert_or_update_sql(table_name: str) -> str:
     return f"""
     INSERT INTO {table_name} 
-        (account, balance, points, volume, margin_fee,margin_bonus, api_key, api_secret, email, password, cookies, proxy)
+        (account, balance, points, volume, margin_fee,margin_bonus, api_key, api_secret, email, password, cookies, proxy, captcha_key, cookies_expires_at, totp_secret)
     VALUES 
-        (:account, :balance, :points, :volume, :margin_fee, :margin_bonus, :api_key, :api_secret, :email, :password, :cookies, :proxy)
+        (:account, :balance, :points, :volume, :margin_fee, :margin_bonus, :api_key, :api_secret, :email, :password, :cookies, :proxy, :captcha_key, :cookies_expires_at, :totp_secret)
     ON CONFLICT(account) DO UPDATE SET
         balance = excluded.balance,
         points = excluded.points,
@@ -34,14 +70,86 @@ def get_insert_or_update_sql(table_name: str) -> str:
         email = excluded.email,
         password = excluded.password,
         cookies = excluded.cookies,
-        proxy = excluded.proxy
+        proxy = excluded.proxy,
+        captcha_key = excluded.captcha_key,
+        cookies_expires_at = excluded.cookies_expires_at,
+        totp_secret = excluded.totp_secret
+    """
+
+def get_import_accounts_sql(table_name: str) -> str:
+    # Импорт не трогает статистику, а пустые поля файла не затирают значения в базе
+    return f"""
+    INSERT INTO {table_name}
+        (account, balance, points, volume, margin_fee, margin_bonus, api_key, api_secret, email, password, cookies, proxy, captcha_key, cookies_expires_at, totp_secret)
+    VALUES
+        (:account, 0, 0, 0, 0, 0, :api_key, :api_secret, :email, :password, :cookies, :proxy, :captcha_key, :cookies_expires_at, :totp_secret)
+    ON CONFLICT(account) DO UPDATE SET
+        email = excluded.email,
+        password = excluded.password,
+        api_key = COALESCE(excluded.api_key, api_key),
+        api_secret = COALESCE(excluded.api_secret, api_secret),
+        cookies = COALESCE(excluded.cookies, cookies),
+        proxy = COALESCE(excluded.proxy, proxy),
+        captcha_key = COALESCE(excluded.captcha_key, captcha_key),
+        totp_secret = COALESCE(excluded.totp_secret, totp_secret),
+        cookies_expires_at = CASE WHEN excluded.cookies IS NOT NULL
+                                  THEN excluded.cookies_expires_at ELSE cookies_expires_at END
+    """
+
+def get_update_account_data_sql(table_name: str) -> str:
+    return f"""
+    UPDATE {table_name}
+    SET balance = :balance,
+        volume = :volume,
+        points = :points,
+        margin_fee = :margin_fee,
+        margin_bonus = :margin_bonus,
+        cookies = COALESCE(:cookies, cookies),
+        cookies_expires_at = COALESCE(:cookies_expires_at, cookies_expires_at)
+    WHERE account = :account
     """
 
+def get_update_fields_sql(table_name: str, fields: list[str]) -> str:
+    assignments = ", ".join(f"{field} = :{field}" for field in fields)
+    return f"UPDATE {table_name} SET {assignments} WHERE account = :account"
+
 def get_select_all_sql(table_name: str) -> str:
     return f"SELECT * FROM {table_name}"
 
 def get_clear_table_sql(table_name: str) -> str:
     return f"DELETE FROM {table_name}"
 
+def get_select_fields_by_account_sql(table_name: str, fields: list[str]) -> str:
+    return f"SELECT {', '.join(fields)} FROM {table_name} WHERE account = :account"
+
+def get_select_columns_sql(table_name: str, fields: list[str]) -> str:
+    return f"SELECT {', '.join(fields)} FROM {table_name} ORDER BY id"
+
 def get_select_by_account_sql(table_name: str) -> str:
-    return f"SELECT * FROM {table_name} WHERE account = :account"
\ No newline at end of file
+    return f"SELECT * FROM {table_name} WHERE account = :account"
+
+def get_snapshots_table_sql(table_name: str) -> str:
+    return f"""
+    CREATE TABLE IF NOT EXISTS {table_name} (
+        account TEXT NOT NULL,
+        ts INTEGER NOT NULL,
+        balance REAL,
+        points REAL,
+        volume REAL,
+        margin_fee REAL,
+        margin_bonus REAL,
+        PRIMARY KEY (account, ts)
+    ) WITHOUT ROWID
+    """
+
+def get_snapshots_index_sql(table_name: str) -> str:
+    # Покрывающий индекс: агрегаты по флоту за период читаются без обращения к таблице
+    return f"CREATE INDEX IF NOT EXISTS idx_{table_name}_ts ON {table_name} (ts, account, points, volume)"
+
+def get_insert_snapshot_sql(table_name: str) -> str:
+    return f"""
+    INSERT OR REPLACE INTO {table_name}
+        (account, ts, balance, points, volume, margin_fee, margin_bonus)
+    VALUES
+        (:account, :ts, :balance, :points, :volume, :margin_fee, :margin_bonus)
+    """
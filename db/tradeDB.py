@@ -1,16 +1,29 @@
 from loguru import logger
 from typing import Dict, List
 import json
+import time
 
 from db.manager import AsyncDatabaseManager
 from db.schemas import (
     get_info_table_sql,
     get_insert_or_update_sql,
+    get_update_account_data_sql,
+    get_update_fields_sql,
     get_select_all_sql,
     get_clear_table_sql,
     get_select_by_account_sql,
+    get_select_fields_by_account_sql,
+    get_select_columns_sql,
+    get_import_accounts_sql,
+    get_table_columns_sql,
+    get_add_column_sql,
+    get_cookies_expiry_index_sql,
+    get_backfill_cookies_expiry_sql,
+    get_select_expiring_sql,
+    ACCOUNT_MIGRATION_COLUMNS,
 )
-from utils.cookies import check_cookies_from_db
+from utils.cookies import check_cookies_from_db, cookies_expires_at
+from data import config
 
 class TradeSQL:
     def __init__(self, db: AsyncDatabaseManager): 
@@ -19,19 +32,77 @@ class TradeSQL:
     async def create_table(self, table_name: str):
         try:
             await self.db.execute(get_info_table_sql(table_name))
+            await self.migrate(table_name)
             logger.success(f"Таблица '{table_name}' создана или уже существует")
         except Exception as e:
             logger.error(f"Ошибка создания таблицы '{table_name}': {e}")
             raise
 
+    async def get_columns(self, table_name: str) -> List[str]:
+        """Список колонок таблицы в порядке объявления"""
+        rows = await self.db.fetchall(get_table_columns_sql(table_name))
+        return [row["name"] for row in rows]
+
+    async def migrate(self, table_name: str):
+        """Добавить в существующую таблицу колонки, появившиеся в новых версиях"""
+        existing = set(await self.get_columns(table_name))
+        for column, column_type in ACCOUNT_MIGRATION_COLUMNS.items():
+            if column not in existing:
+                await self.db.execute(get_add_column_sql(table_name, column, column_type))
+                logger.info(f"В таблицу '{table_name}' добавлена колонка '{column}'")
+        if "cookies_expires_at" not in existing:
+            await self.db.execute(get_backfill_cookies_expiry_sql(table_name), {"ttl": config.COOKIES_TTL})
+        await self.db.execute(get_cookies_expiry_index_sql(table_name))
+
+    @staticmethod
+    def _info_params(info: Dict) -> Dict:
+        """Параметры upsert: колонки из миграций необязательны во входном dict"""
+        params = {**dict.fromkeys(ACCOUNT_MIGRATION_COLUMNS), **info}
+        if info.get("cookies_expires_at") is None:
+            params["cookies_expires_at"] = cookies_expires_at(info.get("cookies"))
+        return params
+
     async def add_info(self, table_name: str, info: Dict):
         try:
-            await self.db.execute(get_insert_or_update_sql(table_name), info)
+            await self.db.execute(get_insert_or_update_sql(table_name), self._info_params(info))
             logger.success(f"Информация для аккаунта '{info['account']}' сохранена")
         except Exception as e:
             logger.error(f"Ошибка сохранения информации для аккаунта '{info.get('account', 'unknown')}': {e}")
             raise
 
+    async def add_info_many(self, table_name: str, infos: List[Dict]):
+        """Bulk upsert аккаунтов одной транзакцией"""
+        if not infos:
+            return
+        try:
+            async with self.db.transaction():
+                await self.db.executemany(
+                    get_insert_or_update_sql(table_name), [self._info_params(info) for info in infos]
+                )
+            logger.success(f"Информация для {len(infos)} аккаунтов сохранена")
+        except Exception as e:
+            logger.error(f"Ошибка bulk сохранения аккаунтов: {e}")
+            raise
+
+    async def import_accounts_many(self, table_name: str, rows: List[Dict]):
+        """
+        Upsert учётных данных одной транзакцией (импорт из файла).
+        Статистика существующих аккаунтов не трогается, пустые поля не затирают данные.
+        """
+        if not rows:
+            return
+        try:
+            async with self.db.transaction():
+                await self.db.executemany(get_import_accounts_sql(table_name), rows)
+        except Exception as e:
+            logger.error(f"Ошибка импорта пачки из {len(rows)} аккаунтов: {e}")
+            raise
+
+    async def iterate_columns(self, table_name: str, columns: List[str], batch_size: int = 500):
+        """Потоково читать выбранные колонки таблицы пачками по batch_size строк"""
+        async for rows in self.db.iterate(get_select_columns_sql(table_name, columns), batch_size=batch_size):
+            yield rows
+
     async def get_all(self, table_name: str) -> List[Dict]:
         try:
             return await self.db.fetchall(get_select_all_sql(table_name))
@@ -50,8 +121,7 @@ class TradeSQL:
     async def get_account(self, table_name: str, account: str) -> Dict | None:
         """Получить конкретный аккаунт"""
         try:
-            rows = await self.db.fetchall(get_select_by_account_sql(table_name), {"account": account})
-            return rows[0] if rows else None
+            return await self.db.fetchone(get_select_by_account_sql(table_name), {"account": account})
         except Exception as e:
             logger.error(f"Ошибка получения аккаунта '{account}': {e}")
             return None
@@ -59,7 +129,7 @@ class TradeSQL:
     async def get_cookies(self, table_name: str, account: str) -> dict | None:
         """Вернуть cookies для аккаунта в виде dict"""
         try:
-            row = await self.db.fetchone(get_select_by_account_sql(table_name), {"account": account})
+            row = await self.db.fetchone(get_select_fields_by_account_sql(table_name, ["cookies"]), {"account": account})
             if row and row.get("cookies"):
                 return json.loads(row["cookies"])
             return None
@@ -72,18 +142,41 @@ class TradeSQL:
         try:
             cookies_json = json.dumps(cookies, ensure_ascii=False)
             await self.db.execute(
-                f"UPDATE {table_name} SET cookies = :cookies WHERE account = :account",
-                {"account": account, "cookies": cookies_json}
+                f"UPDATE {table_name} SET cookies = :cookies, cookies_expires_at = :cookies_expires_at "
+                f"WHERE account = :account",
+                {"account": account, "cookies": cookies_json, "cookies_expires_at": cookies_expires_at(cookies)}
             )
             logger.success(f"Cookies для аккаунта '{account}' обновлены")
         except Exception as e:
             logger.error(f"Ошибка обновления cookies для аккаунта '{account}': {e}")
             raise
 
+    async def update_cookies_many(self, table_name: str, cookies_by_account: Dict[str, dict]):
+        """Обновить cookies многих аккаунтов одной транзакцией"""
+        if not cookies_by_account:
+            return
+        try:
+            params = [
+                {
+                    "account": account,
+                    "cookies": json.dumps(cookies, ensure_ascii=False),
+                    "cookies_expires_at": cookies_expires_at(cookies),
+                }
+                for account, cookies in cookies_by_account.items()
+            ]
+            async with self.db.transaction():
+                await self.db.executemany(
+                    get_update_fields_sql(table_name, ["cookies", "cookies_expires_at"]), params
+                )
+            logger.success(f"Cookies для {len(params)} аккаунтов обновлены")
+        except Exception as e:
+            logger.error(f"Ошибка bulk обновления cookies: {e}")
+            raise
+
     async def get_proxy(self, table_name: str, account: str) -> str | None:
         """Получить прокси для конкретного аккаунта"""
         try:
-            row = await self.db.fetchone(get_select_by_account_sql(table_name), {"account": account})
+            row = await self.db.fetchone(get_select_fields_by_account_sql(table_name, ["proxy"]), {"account": account})
             return row.get("proxy") if row else None
         except Exception as e:
             logger.error(f"Ошибка получения прокси для аккаунта '{account}': {e}")
@@ -104,7 +197,9 @@ class TradeSQL:
     async def get_email_password(self, table_name: str, account: str) -> tuple[str | None, str | None]:
         """Получить email и password для аккаунта"""
         try:
-            row = await self.db.fetchone(get_select_by_account_sql(table_name), {"account": account})
+            row = await self.db.fetchone(
+                get_select_fields_by_account_sql(table_name, ["email", "password"]), {"account": account}
+            )
             if row:
                 return row.get("email"), row.get("password")
             return None, None
@@ -124,6 +219,27 @@ class TradeSQL:
             logger.error(f"Ошибка обновления email/password для аккаунта '{account}': {e}")
             raise
     
+    @staticmethod
+    def _account_data_params(
+            account: str,
+            balance: str | None,
+            volume: str | None,
+            points: str | None,
+            fee: str | None,
+            bonus: str | None,
+            cookies: dict | None,
+        ) -> Dict:
+        return {
+            "account": account,
+            "balance": balance or "0",
+            "volume": volume or "0",
+            "points": points or "0",
+            "margin_fee": fee or "0",
+            "margin_bonus": bonus or "0",
+            "cookies": json.dumps(cookies, ensure_ascii=False) if cookies else None,
+            "cookies_expires_at": cookies_expires_at(cookies) if cookies else None,
+        }
+
     async def update_account_data(
             self,
             table_name: str,
@@ -136,33 +252,37 @@ class TradeSQL:
             cookies: dict | None,
         ):
             try:
-                cookies_json = json.dumps(cookies, ensure_ascii=False) if cookies else None
-
                 await self.db.execute(
-                    f"""
-                    UPDATE {table_name}
-                    SET balance = :balance,
-                        volume = :volume,
-                        points = :points,
-                        margin_fee = :margin_fee,
-                        margin_bonus = :margin_bonus,
-                        cookies = COALESCE(:cookies, cookies)
-                    WHERE account = :account
-                    """,
-                    {
-                        "account": account,
-                        "balance": balance or "0",
-                        "volume": volume or "0",
-                        "points": points or "0",
-                        "margin_fee": fee or "0",
-                        "margin_bonus": bonus or "0",
-                        "cookies": cookies_json,
-                    }
+                    get_update_account_data_sql(table_name),
+                    self._account_data_params(account, balance, volume, points, fee, bonus, cookies)
                 )
                 logger.success(f"✅ Данные аккаунта '{account}' обновлены")
             except Exception as e:
                 logger.error(f"Ошибка обновления данных аккаунта '{account}': {e}")
                 raise
+
+    async def update_account_data_many(self, table_name: str, rows: List[Dict]):
+        """
+        Обновить статистику многих аккаунтов одной транзакцией.
+        rows: dict с ключами account, balance, volume, points, fee, bonus, cookies
+        """
+        if not rows:
+            return
+        try:
+            params = [
+                self._account_data_params(
+                    row["account"], row.get("balance"), row.get("volume"), row.get("points"),
+                    row.get("fee"), row.get("bonus"), row.get("cookies"),
+                )
+                for row in rows
+            ]
+            async with self.db.transaction():
+                await self.db.executemany(get_update_account_data_sql(table_name), params)
+            logger.success(f"✅ Данные {len(rows)} аккаунтов обновлены")
+        except Exception as e:
+            logger.error(f"Ошибка bulk обновления данных аккаунтов: {e}")
+            raise
+
     async def delete_account(self, table_name: str, account: str) -> bool:
         """Удалить конкретный аккаунт из таблицы"""
         try:
@@ -187,4 +307,18 @@ class TradeSQL:
         
     async def check_cookies_valid(self, table_name: str, account: str) -> bool:
         """Проверить валидность куков для аккаунта"""
-        return await check_cookies_from_db(self.db, table_name, account)
\ No newline at end of file
+        return await check_cookies_from_db(self.db, table_name, account)
+
+    async def get_accounts_to_relogin(self, table_name: str, within: int = 0) -> List[str]:
+        """
+        Аккаунты без куков или с куками, истекающими в ближайшие within секунд
+        (range scan по индексу cookies_expires_at, самые старые первыми).
+        """
+        try:
+            rows = await self.db.fetchall(
+                get_select_expiring_sql(table_name), {"deadline": int(time.time()) + within}
+            )
+            return [row["account"] for row in rows]
+        except Exception as e:
+            logger.error(f"Ошибка получения аккаунтов для перелогина: {e}")
+            return []
\ No newline at end of file
@@ -0,0 +1,205 @@
+import asyncio
+import json
+import time
+from typing import Dict, Optional
+
+from loguru import logger
+
+from db.history import AccountHistory
+from db.schemas import get_insert_or_update_sql, get_update_fields_sql
+from db.tradeDB import TradeSQL
+from utils.cookies import cookies_expires_at
+
+
+class AccountWriteBehind:
+    """
+    Фоновая запись обновлений аккаунтов (write-behind).
+
+    Вызовы update_account_data / update_cookies / add_info не ждут SQLite:
+    намерение кладётся в очередь и склеивается с уже ожидающим намерением
+    того же аккаунта (последнее значение поля побеждает). Фоновая задача
+    сбрасывает очередь одной транзакцией раз в flush_interval секунд или
+    сразу, когда в очереди набирается max_batch аккаунтов. Если передан
+    history, каждое обновление статистики дополнительно пишется снимком
+    в таблицу истории той же транзакцией.
+
+    Args:
+        trade_sql: экземпляр TradeSQL
+        table_name: таблица аккаунтов
+        flush_interval: период сброса в секундах
+        max_batch: размер очереди, при котором сброс происходит немедленно
+        history: таблица истории снимков (опционально)
+    """
+    def __init__(
+        self,
+        trade_sql: TradeSQL,
+        table_name: str,
+        flush_interval: float = 1.0,
+        max_batch: int = 200,
+        history: AccountHistory | None = None,
+    ):
+        self.trade_sql = trade_sql
+        self.db = trade_sql.db
+        self.table_name = table_name
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.history = history
+
+        self._pending: Dict[str, dict] = {}
+        self._snapshots: Dict[tuple, dict] = {}
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        self.enqueued = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.errors = 0
+        self.max_queue_depth = 0
+        self.last_flush_seconds = 0.0
+
+    # --- Метрики ---
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    def metrics(self) -> Dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "flushes": self.flushes,
+            "rows_flushed": self.rows_flushed,
+            "errors": self.errors,
+            "last_flush_seconds": self.last_flush_seconds,
+        }
+
+    # --- Постановка в очередь ---
+    def _enqueue(self, account: str, fields: Dict, insert: Dict | None = None):
+        entry = self._pending.get(account)
+        if entry is None:
+            entry = self._pending[account] = {"insert": None, "fields": {}}
+        else:
+            self.coalesced += 1
+
+        if insert is not None:
+            entry["insert"] = insert
+            entry["fields"].clear()
+        entry["fields"].update(fields)
+
+        self.enqueued += 1
+        self.max_queue_depth = max(self.max_queue_depth, len(self._pending))
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+
+    def add_info(self, info: Dict):
+        """Полный upsert строки аккаунта"""
+        self._enqueue(info["account"], {}, insert=TradeSQL._info_params(info))
+
+    def update_account_data(
+        self,
+        account: str,
+        balance: str | None,
+        volume: str | None,
+        points: str | None,
+        fee: str | None,
+        bonus: str | None,
+        cookies: dict | None = None,
+    ):
+        """Обновить статистику аккаунта (cookies=None - куки не трогаем)"""
+        params = TradeSQL._account_data_params(account, balance, volume, points, fee, bonus, cookies)
+        params.pop("account")
+        if params["cookies"] is None:
+            params.pop("cookies")
+            params.pop("cookies_expires_at")
+        if self.history:
+            snapshot = AccountHistory.snapshot(account, balance, volume, points, fee, bonus)
+            self._snapshots[(account, snapshot["ts"])] = snapshot
+        self._enqueue(account, params)
+
+    def update_cookies(self, account: str, cookies: dict):
+        """Обновить cookies аккаунта"""
+        self._enqueue(account, {
+            "cookies": json.dumps(cookies, ensure_ascii=False),
+            "cookies_expires_at": cookies_expires_at(cookies),
+        })
+
+    # --- Сброс ---
+    async def flush(self) -> int:
+        """Записать все накопленные намерения одной транзакцией"""
+        async with self._flush_lock:
+            if not self._pending and not self._snapshots:
+                return 0
+
+            batch, self._pending = self._pending, {}
+            snapshots, self._snapshots = self._snapshots, {}
+            started = time.perf_counter()
+
+            inserts = []
+            updates: Dict[tuple, list] = {}
+            for account, entry in batch.items():
+                if entry["insert"] is not None:
+                    inserts.append({**entry["insert"], **entry["fields"]})
+                elif entry["fields"]:
+                    columns = tuple(sorted(entry["fields"]))
+                    updates.setdefault(columns, []).append({"account": account, **entry["fields"]})
+
+            try:
+                async with self.db.transaction():
+                    if inserts:
+                        await self.db.executemany(get_insert_or_update_sql(self.table_name), inserts)
+                    for columns, rows in updates.items():
+                        await self.db.executemany(get_update_fields_sql(self.table_name, list(columns)), rows)
+                    if snapshots:
+                        await self.history.record_many(list(snapshots.values()))
+            except BaseException as e:
+                # Возвращаем батч в очередь (в т.ч. при отмене), не затирая более свежие намерения
+                for account, entry in batch.items():
+                    newer = self._pending.get(account)
+                    if newer is None:
+                        self._pending[account] = entry
+                    elif newer["insert"] is None:
+                        entry["fields"].update(newer["fields"])
+                        self._pending[account] = entry
+                self._snapshots = {**snapshots, **self._snapshots}
+                if isinstance(e, Exception):
+                    self.errors += 1
+                    logger.error(f"Ошибка фоновой записи {len(batch)} аккаунтов: {e}")
+                raise
+
+            self.flushes += 1
+            self.rows_flushed += len(batch)
+            self.last_flush_seconds = time.perf_counter() - started
+            return len(batch)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                await asyncio.sleep(self.flush_interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="account-write-behind")
+
+    async def stop(self):
+        """Остановить фоновую задачу и гарантированно сбросить остаток очереди"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        pending = self.queue_depth
+        await self.flush()
+        if pending:
+            logger.success(f"Фоновая запись: финальный сброс {pending} аккаунтов")
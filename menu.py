@@ -1,6 +1,7 @@
 import os
 import sys
 import json
+import time
 import signal
 import asyncio
 from typing import Optional
@@ -9,22 +10,40 @@ from colorama import init
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
+from rich.live import Live
 from InquirerPy import inquirer
 
 from db.tradeDB import TradeSQL
 from db.manager import AsyncDatabaseManager
+from db.writer import AccountWriteBehind
+from db.repository import AccountRepository
+from db.history import AccountHistory
+from db.accounts_io import import_accounts, export_accounts
+from db.records import AccountRecord
 
 from utils.session import session_manager
 from utils.cookies import (
     save_cookies_to_account,
-    check_cookies_from_account,
-    apply_cookies_from_db
+    apply_cookies
 )
-from utils.captcha import TwoCaptcha
+from utils.captcha import get_captcha_pool, close_captcha_pools
+from utils.proxy import normalize_proxy
+from utils.totp import valid_secret
+from utils.log import setup_logging, flush_logging
+from utils.points import project
 from src.account.login import ArkhamLogin
+from src.account.batch_login import BatchLogin, STATUS_OK
+from src.account.session_refresher import SessionRefresher
+from src.account.fleet_refresh import FleetRefresh, STATUS_OK as FLEET_OK, STATUS_NO_SESSION
+from src.account.info import ArkhamInfo
 from src.trade.trading_client import ArkhamTrading
-from utils.leverage import ArkhamLeverage
-from utils.size_calc import PositionSizer
+from src.trade.positions_store import PositionsStore, PositionsPoller
+from src.trade.order_pipeline import OrderPipeline
+from src.trade.volume_farmer import VolumeFarmer, next_tier_targets, STATUS_DONE as FARM_DONE
+from src.trade.hedge_executor import HedgeExecutor, STATUS_HEDGED, STATUS_CLOSED
+from src.trade.basis_engine import BasisEngine, CARRY, REVERSE
+from src.trade.risk_engine import PortfolioRisk, activate as activate_risk, active_risk
+from src.ui.dashboard import PositionsDashboard
 
 from account import Account
 from data import config
@@ -37,53 +56,30 @@ console = Console()
 # --- Глобальные переменные ---
 current_account: Optional[Account] = None
 shutdown_event = asyncio.Event()
+# Ввод 2FA с клавиатуры - по одному аккаунту за раз (импорт логинит параллельно)
+prompt_lock = asyncio.Lock()
 db: Optional[AsyncDatabaseManager] = None
+writer: Optional[AccountWriteBehind] = None
+repository: Optional[AccountRepository] = None
+history: Optional[AccountHistory] = None
+refresher: Optional[SessionRefresher] = None
+order_pipelines: dict[str, OrderPipeline] = {}
+basis_engines: dict[str, BasisEngine] = {}
+# Фоновый опрос позиций, питающий включённые риск-лимиты, и его сессии
+risk_feed: Optional[tuple[PositionsPoller, dict]] = None
 _shutdown_in_progress = False
 
 
 # --- Вспомогательные функции ---
-def _normalize_proxy(raw: str) -> Optional[str]:
-    raw = (raw or '').strip()
-    if not raw:
-        return None
-
-    if '@' in raw:
-        return raw
-
-    parts = raw.split()
-    if len(parts) == 2 and parts[0].startswith('http'):
-        return f"{parts[0]}@{parts[1]}"
-
-    if len(parts) == 2:
-        return f"http://{parts[0]}@{parts[1]}"
-
-    return raw
-
-
 def db_row_to_account(row: dict) -> Account:
-    """Преобразовать строку из БД в объект Account"""
+    """Преобразовать строку из БД в объект Account (без повторной валидации)"""
     cookies = row.get("cookies")
-    if cookies and isinstance(cookies, str):
-        try:
-            cookies = json.loads(cookies)
-        except (json.JSONDecodeError, TypeError):
-            pass
-
-    return Account(
-        account=row.get("account"),
-        email=row.get("email"),
-        password=row.get("password"),
-        api_key=row.get("api_key"),
-        api_secret=row.get("api_secret"),
-        proxy=row.get("proxy"),
-        cookies=cookies,
-        captcha_key=row.get("captcha_key")
-    )
+    return Account.from_record(AccountRecord.from_row(row), cookies if isinstance(cookies, dict) else None)
 
 
 # --- Завершение работы и обработчики ---
 async def graceful_shutdown():
-    global _shutdown_in_progress, db, current_account
+    global _shutdown_in_progress, db, writer, current_account
 
     if _shutdown_in_progress:
         return
@@ -100,11 +96,34 @@ async def graceful_shutdown():
             except Exception as e:
                 console.print(f"[yellow]⚠️ Ошибка закрытия сессии: {e}[/yellow]")
 
+        try:
+            await close_captcha_pools()
+        except Exception as e:
+            console.print(f"[yellow]⚠️ Ошибка остановки пула капчи: {e}[/yellow]")
+
+        try:
+            await stop_risk_feed()
+        except Exception as e:
+            console.print(f"[yellow]⚠️ Ошибка остановки опроса позиций: {e}[/yellow]")
+
         try:
             await session_manager.close_all()
         except Exception as e:
             console.print(f"[yellow]⚠️ Ошибка закрытия сессий: {e}[/yellow]")
 
+        if refresher:
+            try:
+                await refresher.stop()
+            except Exception as e:
+                console.print(f"[yellow]⚠️ Ошибка остановки обновления сессий: {e}[/yellow]")
+
+        if writer:
+            try:
+                await writer.stop()
+                console.print("[green]✅ Отложенные записи сохранены в БД[/green]")
+            except Exception as e:
+                console.print(f"[yellow]⚠️ Ошибка сохранения отложенных записей: {e}[/yellow]")
+
         if db:
             try:
                 await db.close()
@@ -131,6 +150,7 @@ async def graceful_shutdown():
             except asyncio.TimeoutError:
                 console.print("[yellow]⚠️ Некоторые задачи не завершились по таймауту[/yellow]")
 
+        await flush_logging()
         console.print("[green]✅ Программа корректно завершена[/green]")
 
     except Exception as e:
@@ -182,6 +202,7 @@ async def start_menu() -> Optional[Account]:
                 message='Выберите действие',
                 choices=[
                     "✏️ Добавить аккаунт в ручную",
+                    "📥 Импорт аккаунтов из файла",
                     "👆 Выбрать аккаунт из БД",
                     "❌ Выход"
                 ],
@@ -193,6 +214,8 @@ async def start_menu() -> Optional[Account]:
                     acc = await add_account()
                     if acc:
                         return acc
+                case "📥 Импорт аккаунтов из файла":
+                    await import_accounts_action()
                 case "👆 Выбрать аккаунт из БД":
                     acc = await select_account()
                     if acc:
@@ -274,6 +297,11 @@ async def database_menu(account: Account):
                     "🗑️ Очистить таблицу",
                     "❌ Удалить конкретный аккаунт", 
                     "📋 Показать все аккаунты",
+                    "🌐 Обзор флота (обновить все аккаунты)",
+                    "📈 История аккаунта по дням",
+                    "📥 Импорт аккаунтов из файла",
+                    "📤 Экспорт аккаунтов в файл",
+                    "🔐 Перелогинить аккаунты с истёкшими куками",
                     "⬅️ Назад"
                 ],
                 default="📋 Показать все аккаунты"
@@ -302,6 +330,21 @@ async def database_menu(account: Account):
                         
                 case "📋 Показать все аккаунты":
                     await show_all_accounts()
+
+                case "🌐 Обзор флота (обновить все аккаунты)":
+                    await fleet_overview()
+
+                case "📈 История аккаунта по дням":
+                    await show_account_history(account)
+
+                case "📥 Импорт аккаунтов из файла":
+                    await import_accounts_action()
+
+                case "📤 Экспорт аккаунтов в файл":
+                    await export_accounts_action()
+
+                case "🔐 Перелогинить аккаунты с истёкшими куками":
+                    await batch_login_action()
                     
                 case "⬅️ Назад":
                     return account  
@@ -359,6 +402,11 @@ async def trading_menu(account: Account):
             message="Выберите действие:",
             choices=[
                 "📋 Мои позиции",
+                "📊 Позиции всех аккаунтов",
+                "🚜 Фарм объёма до цели",
+                "⚖️ Хедж между аккаунтами",
+                "🔁 Базис спот/перп",
+                "🛡 Риск портфеля",
                 "📈 Открыть LONG",
                 "📉 Открыть SHORT",
                 "❌ Закрыть все позиции",
@@ -371,6 +419,21 @@ async def trading_menu(account: Account):
             case "📋 Мои позиции":
                 await positions_and_balances_menu(account)
 
+            case "📊 Позиции всех аккаунтов":
+                await all_positions_dashboard()
+
+            case "🚜 Фарм объёма до цели":
+                await volume_farm_action()
+
+            case "⚖️ Хедж между аккаунтами":
+                await hedge_action()
+
+            case "🔁 Базис спот/перп":
+                await basis_action(account)
+
+            case "🛡 Риск портфеля":
+                await portfolio_risk_action()
+
             case "📈 Открыть LONG":
                 await open_position(account, side="long")
 
@@ -384,129 +447,483 @@ async def trading_menu(account: Account):
                 break
 
 
+async def close_position(session, info: ArkhamInfo, coin: str, position: dict, account: Optional[str] = None) -> bool:
+    """Закрыть одну фьючерсную позицию по рынку"""
+    size = abs(position["base"])
+    trader = ArkhamTrading(session=session, coin=coin, size=size, info_client=info, account=account)
+    if position["base"] > 0:
+        return await trader.futures_close_long_market(position_size=size)
+    return await trader.futures_close_short_market(position_size=size)
+
+
 async def positions_and_balances_menu(account: Account):
-    """Меню: просмотр и закрытие позиций"""
+    """Живой дашборд позиций текущего аккаунта"""
     try:
         await account.initialize_clients()
-        positions = await account.arkham_info.get_all_positions()
+        store = PositionsStore()
+        if active_risk():
+            store.listeners.append(active_risk().update)
+        poller = PositionsPoller(store, {account.account: account.arkham_info})
+
+        async def on_close(_: str, coin: str, position: dict) -> bool:
+            return await close_position(account.session, account.arkham_info, coin, position, account.account)
+
+        await PositionsDashboard(store, poller, on_close, console=console).run(shutdown_event)
+    except Exception as e:
+        console.print(f"[red]❌ Ошибка в меню позиций: {e}[/red]")
+        await asyncio.sleep(2)
 
-        if not positions:
-            console.print("[yellow]⚠️ У вас нет открытых позиций[/yellow]")
+
+async def open_account_clients() -> tuple[dict, dict]:
+    """Отдельные сессии и ArkhamInfo всех аккаунтов с действующими куками (закрывает вызывающий)"""
+    sessions = {}
+    clients = {}
+    for row in await repository.get_all():
+        name = row["account"]
+        if not await repository.session_valid(name):
+            continue
+        session = await session_manager.new_session(row.get("proxy"))
+        apply_cookies(session, await repository.get_cookies(name))
+        sessions[name] = session
+        clients[name] = ArkhamInfo(session=session, api_key=row.get("api_key"), api_secret=row.get("api_secret"))
+    return sessions, clients
+
+
+async def all_positions_dashboard():
+    """Живой дашборд позиций всех аккаунтов с действующими куками"""
+    sessions = {}
+    try:
+        sessions, clients = await open_account_clients()
+        if not clients:
+            console.print("[yellow]⚠️ Нет аккаунтов с действующими куками[/yellow]")
             await asyncio.sleep(2)
             return
 
-        # Показываем таблицу
-        table = Table(title="📋 Мои позиции")
-        table.add_column("Монета", style="cyan")
-        table.add_column("Размер", style="green")
-        table.add_column("Направление", style="blue")
-        table.add_column("Маржа", style="yellow")
-        table.add_column("PnL", style="magenta")
-        table.add_column("Entry", style="gray")
+        store = PositionsStore()
+        if active_risk():
+            store.listeners.append(active_risk().update)
+        poller = PositionsPoller(store, clients)
 
+        async def on_close(name: str, coin: str, position: dict) -> bool:
+            return await close_position(sessions[name], clients[name], coin, position, name)
 
-        for coin, pos in positions.items():
-            size = pos.get("base", 0)
-            direction = "LONG" if float(size) > 0 else "SHORT"
-            table.add_row(
-                coin,
-                str(size),
-                direction,
-                str(pos.get("value", "N/A")),
-                str(pos.get("pnl", "N/A")),
-                str(pos.get('entry', "N/A"))
+        await PositionsDashboard(store, poller, on_close, console=console).run(shutdown_event)
+    except Exception as e:
+        console.print(f"[red]❌ Ошибка дашборда позиций: {e}[/red]")
+        await asyncio.sleep(2)
+    finally:
+        for session in sessions.values():
+            await session.close()
+
+
+async def volume_farm_action():
+    """Фарм объёма круговыми сделками до следующего тира или заданного объёма"""
+    sessions = {}
+    farmer = None
+    try:
+        sessions, clients = await open_account_clients()
+        if not clients:
+            console.print("[yellow]⚠️ Нет аккаунтов с действующими куками[/yellow]")
+            await asyncio.sleep(2)
+            return
+
+        mode = await inquirer.select(
+            message="Цель по объёму:",
+            choices=[
+                {"name": "Следующий тир фьючерсов", "value": "tier"},
+                {"name": "Свой объём для всех аккаунтов", "value": "fixed"},
+            ],
+        ).execute_async()
+        if mode == "tier":
+            names = list(clients)
+            volumes = await asyncio.gather(*(clients[name].get_volume_or_points("volume") for name in names))
+            targets = next_tier_targets([
+                {"account": name, "volume": volume} for name, volume in zip(names, volumes) if volume is not None
+            ])
+        else:
+            target = await inquirer.number(message="Целевой объём, $:", min_allowed=1).execute_async()
+            targets = {name: float(target) for name in clients}
+
+        def on_progress(name: str, state: dict):
+            console.print(
+                f"[cyan]{name}[/cyan]: сделок {state['trips']}, объём ≈ {state['estimated']:.0f} / "
+                f"{targets[name]:.0f}, equity {state['equity_change']:+.2f}"
             )
 
+        farmer = VolumeFarmer(clients, targets, on_progress=on_progress)
+        plans = await farmer.plan()
+
+        table = Table(title="🚜 План фарма объёма")
+        table.add_column("Аккаунт", style="cyan")
+        table.add_column("Объём → цель", justify="right")
+        table.add_column("Символ")
+        table.add_column("Сделка, $", justify="right")
+        table.add_column("Сделок", justify="right")
+        table.add_column("Комиссия + проскальз., $", justify="right", style="yellow")
+        table.add_column("$ на 100k", justify="right")
+        table.add_column("≈ Время, мин", justify="right")
+        for name, plan in plans.items():
+            if plan.get("error"):
+                table.add_row(name, "", "", "", "", f"[red]{plan['error']}[/red]", "", "")
+                continue
+            table.add_row(
+                name, f"{plan['volume']:.0f} → {plan['target']:.0f}", plan["coin"] or "—",
+                f"{plan['notional']:.0f}", str(plan["trips"]), f"{plan['cost']:.2f}",
+                f"{plan['cost_per_100k']:.2f}", f"{plan['duration'] / 60:.1f}",
+            )
         console.print(table)
 
-        # Выбор действия
-        choice = await inquirer.select(
-            message="Выберите позицию для закрытия или вернитесь назад:",
-            choices=list(positions.keys()) + ["⬅️ Назад"]
+        if not any(plan.get("trips") for plan in plans.values()):
+            console.print("[green]✅ Все аккаунты уже на цели[/green]")
+            return
+        confirm = await inquirer.confirm(message="Запустить фарм?", default=False).execute_async()
+        if not confirm or shutdown_event.is_set():
+            return
+
+        report = await farmer.run(plans)
+        for name, state in report.items():
+            color = "green" if state["status"] == FARM_DONE else "yellow"
+            console.print(
+                f"[{color}]{name}: {state['status']}, объём {state['volume_start']:.0f} → {state['volume']:.0f}, "
+                f"сделок {state['trips']}, equity {state['equity_change']:+.2f}[/{color}]"
+                + (f" [red]{state['error']}[/red]" if state["error"] else "")
+            )
+    except Exception as e:
+        if farmer:
+            farmer.stop()
+        if not shutdown_event.is_set():
+            console.print(f"[red]❌ Ошибка фарма объёма: {e}[/red]")
+            await asyncio.sleep(2)
+    finally:
+        for session in sessions.values():
+            await session.close()
+
+def print_hedge_report(report: dict):
+    """Ноги хеджа: размер, попытки и момент подтверждения"""
+    ok = report["status"] in (STATUS_HEDGED, STATUS_CLOSED)
+    color = "green" if ok else "red"
+    skew = f", разброс ног {report['skew_ms']:.1f} мс" if report["skew_ms"] is not None else ""
+    console.print(
+        f"[{color}]{'✅' if ok else '❌'} Хедж {report['coin']}: {report['status']}{skew}[/{color}]"
+        + (f" [red]{report['error']}[/red]" if report["error"] else "")
+    )
+    legs = list(report["legs"].values()) + list(report.get("unwind", {}).values())
+    if not legs:
+        return
+
+    table = Table(title="⚖️ Ноги хеджа")
+    table.add_column("Аккаунт", style="cyan")
+    table.add_column("Ордер")
+    table.add_column("Размер", justify="right")
+    table.add_column("Попыток", justify="right")
+    table.add_column("Подтверждение, мс", justify="right", style="yellow")
+    table.add_column("Итог")
+    for leg in legs:
+        order = f"{'закрытие ' if leg['reduce_only'] else ''}{leg['order_side'].upper()}"
+        status = "[green]исполнен[/green]" if leg["filled"] else f"[red]{leg['error'] or 'не исполнен'}[/red]"
+        ack = f"{leg['ack_ms']:.1f}" if leg["ack_ms"] is not None else "—"
+        table.add_row(leg["account"], order, f"{leg['size']:g}", str(leg["attempts"]), ack, status)
+    console.print(table)
+
+
+async def hedge_action():
+    """Дельта-нейтральный хедж: лонг на одних аккаунтах, шорт на других"""
+    sessions = {}
+    try:
+        sessions, clients = await open_account_clients()
+        if len(clients) < 2:
+            console.print("[yellow]⚠️ Для хеджа нужно минимум 2 аккаунта с действующими куками[/yellow]")
+            await asyncio.sleep(2)
+            return
+
+        action = await inquirer.select(
+            message="Хедж:",
+            choices=[
+                {"name": "Открыть хедж", "value": "open"},
+                {"name": "Закрыть хедж одновременно на всех аккаунтах", "value": "close"},
+            ],
         ).execute_async()
+        coin = str(await inquirer.text(message="Монета (например BTC):").execute_async()).strip().upper()
+        if not coin:
+            return
+        executor = HedgeExecutor(clients)
 
-        if choice == "⬅️ Назад":
+        if action == "close":
+            accounts = await inquirer.checkbox(
+                message="Аккаунты для закрытия:", choices=list(clients), validate=lambda result: len(result) > 0,
+            ).execute_async()
+            print_hedge_report(await executor.close(coin, accounts))
             return
 
-        # Закрываем выбранную позицию
-        position = positions[choice]
-        size = abs(position["base"])
-        direction = "LONG" if float(position["base"]) > 0 else "SHORT"
+        longs = await inquirer.checkbox(
+            message="Аккаунты LONG:", choices=list(clients), validate=lambda result: len(result) > 0,
+        ).execute_async()
+        shorts = await inquirer.checkbox(
+            message="Аккаунты SHORT:", choices=[name for name in clients if name not in longs],
+            validate=lambda result: len(result) > 0,
+        ).execute_async()
+        notional = await inquirer.number(
+            message="Размер каждой стороны, $:", min_allowed=1, float_allowed=True,
+        ).execute_async()
+        leverage_raw = await inquirer.text(message="Плечо (Enter - текущее):").execute_async()
+        leverage = int(leverage_raw) if str(leverage_raw).strip().isdigit() else None
 
-        trader = ArkhamTrading(
-            session=account.session,
-            coin=choice,
-            size=size,
-            info_client=account.arkham_info
+        confirm = await inquirer.confirm(
+            message=f"Открыть LONG {coin} на {', '.join(longs)} и SHORT на {', '.join(shorts)} по {float(notional):.2f}$?",
+            default=False,
+        ).execute_async()
+        if not confirm or shutdown_event.is_set():
+            return
+        print_hedge_report(await executor.open(coin, float(notional), longs, shorts, leverage))
+    except Exception as e:
+        if not shutdown_event.is_set():
+            console.print(f"[red]❌ Ошибка хеджа: {e}[/red]")
+            await asyncio.sleep(2)
+    finally:
+        for session in sessions.values():
+            await session.close()
+
+def print_portfolio_risk(risk: PortfolioRisk):
+    """Экспозиция по монетам, риск аккаунтов и стресс-сценарии"""
+    exposure = risk.exposure()
+    table = Table(title=f"🛡 Экспозиция флота: нетто {exposure['net_value']:+,.0f}$, брутто {exposure['gross_value']:,.0f}$")
+    table.add_column("Монета", style="cyan")
+    table.add_column("Нетто", justify="right")
+    table.add_column("Нетто, $", justify="right", style="yellow")
+    table.add_column("Лонг, $", justify="right", style="green")
+    table.add_column("Шорт, $", justify="right", style="red")
+    table.add_column("Позиций", justify="right")
+    for item in exposure["coins"]:
+        table.add_row(
+            item["coin"], f"{item['net_base']:+g}", f"{item['net_value']:+,.0f}",
+            f"{item['long_value']:,.0f}", f"{item['short_value']:,.0f}", str(item["rows"]),
+        )
+    console.print(table)
+
+    table = Table(title="⚠️ Аккаунты ближе всего к ликвидации")
+    table.add_column("Аккаунт", style="cyan")
+    table.add_column("Equity, $", justify="right")
+    table.add_column("Брутто, $", justify="right")
+    table.add_column("Плечо", justify="right")
+    table.add_column("До ликвидации", justify="right", style="yellow")
+    for row in risk.account_risk()[:config.RISK_TABLE_ROWS]:
+        if not row["gross_value"]:
+            continue
+        distance = row["liq_move_pct"]
+        color = "red" if distance < config.RISK_MIN_LIQ_DISTANCE_PCT * 2 else "green"
+        table.add_row(
+            row["account"], f"{row['equity']:,.2f}", f"{row['gross_value']:,.0f}",
+            f"{row['leverage']:.1f}x", f"[{color}]{distance:.1f}%[/{color}]",
         )
+    console.print(table)
+
+    stress = risk.stress()
+    table = Table(title="📉 Стресс: все монеты двигаются одновременно")
+    table.add_column("Шок", justify="right", style="cyan")
+    table.add_column("PnL флота, $", justify="right", style="yellow")
+    table.add_column("Худший аккаунт")
+    table.add_column("Ликвидаций", justify="right", style="red")
+    for shock, pnl, worst, liquidated in zip(stress["shocks"], stress["pnl"], stress["worst"], stress["liquidated"]):
+        worst_text = f"{worst['account']} {worst['pnl']:+,.0f}$" if worst else "—"
+        table.add_row(f"{shock * 100:+.0f}%", f"{pnl:+,.0f}", worst_text, str(liquidated))
+    console.print(table)
+
+
+async def stop_risk_feed():
+    """Остановить фоновый опрос позиций риск-лимитов и закрыть его сессии"""
+    global risk_feed
+    if risk_feed is None:
+        return
+    poller, sessions = risk_feed
+    risk_feed = None
+    await poller.stop()
+    for session in sessions.values():
+        await session.close()
 
-        console.print(f"[blue]📊 Закрываем {direction} по {choice} на {size}[/blue]")
 
-        if direction == "LONG":
-            success = await trader.futures_close_long_market(position_size=size)
+async def portfolio_risk_action():
+    """
+    Сводный риск по всем аккаунтам и включение риск-лимитов для ордеров.
+    Пока лимиты включены, позиции движка обновляет фоновый PositionsPoller.
+    """
+    global risk_feed
+    sessions = {}
+    try:
+        risk = active_risk()
+        if risk and risk_feed:
+            poller = risk_feed[0]
         else:
-            success = await trader.futures_close_short_market(position_size=size)
+            sessions, clients = await open_account_clients()
+            if not clients:
+                console.print("[yellow]⚠️ Нет аккаунтов с действующими куками[/yellow]")
+                await asyncio.sleep(2)
+                return
+            risk = risk or PortfolioRisk()
+            poller = PositionsPoller(PositionsStore(), clients)
+            poller.store.listeners.append(risk.update)
+        with console.status("Загружаем позиции всех аккаунтов..."):
+            await poller.poll_once()
+        store = poller.store
+        failed = [state.account for state in store.accounts() if state.error]
+        if failed:
+            console.print(f"[yellow]⚠️ Не удалось получить позиции: {', '.join(failed)}[/yellow]")
+        print_portfolio_risk(risk)
+
+        enabled = active_risk() is risk
+        choice = await inquirer.select(
+            message="Риск-лимиты для новых ордеров:",
+            choices=[
+                {"name": "Выключить" if enabled else "Включить", "value": "toggle"},
+                {"name": "⬅️ Назад", "value": None},
+            ],
+        ).execute_async()
+        if choice == "toggle":
+            activate_risk(None if enabled else risk)
+            await stop_risk_feed()
+            if not enabled:
+                poller.start()
+                # Сессии живут вместе с опросом, пока лимиты не выключены
+                risk_feed, sessions = (poller, sessions), {}
+            console.print(
+                "[yellow]Риск-лимиты выключены[/yellow]" if enabled else
+                f"[green]✅ Риск-лимиты включены: нетто по монете {config.RISK_MAX_NET_NOTIONAL}$, "
+                f"плечо аккаунта {config.RISK_MAX_ACCOUNT_LEVERAGE}x, до ликвидации ≥ {config.RISK_MIN_LIQ_DISTANCE_PCT}%[/green]"
+            )
+    except Exception as e:
+        console.print(f"[red]❌ Ошибка расчёта риска: {e}[/red]")
+        await asyncio.sleep(2)
+    finally:
+        for session in sessions.values():
+            await session.close()
 
-        if success:
-            console.print(f"[green]✅ Позиция {choice} закрыта![/green]")
-        else:
-            console.print(f"[red]❌ Ошибка закрытия позиции {choice}[/red]")
 
-        await asyncio.sleep(2)
+def get_basis_engine(account: Account) -> BasisEngine:
+    """Базисный движок аккаунта (отслеживание сделок живёт, пока жива сессия)"""
+    engine = basis_engines.get(account.account)
+    if engine is None or engine.info is not account.arkham_info:
+        engine = basis_engines[account.account] = BasisEngine(account.arkham_info, account.account)
+    return engine
 
+
+async def basis_action(account: Account):
+    """Базисная сделка спот/перп: котировка, вход и выход одной операцией"""
+    try:
+        engine = get_basis_engine(account)
+        coin = str(await inquirer.text(message="Монета (например BTC):").execute_async()).strip().upper()
+        if not coin:
+            return
+
+        quote, tracked = await asyncio.gather(engine.quote(coin), engine.track(coin))
+        table = Table(title=f"🔁 Базис {coin}")
+        table.add_column("Показатель", style="cyan")
+        table.add_column("Значение", justify="right", style="yellow")
+        table.add_row("Спот", f"{quote['spot']:.4f}")
+        table.add_row("Перп", f"{quote['perp']:.4f}")
+        table.add_row("Базис", f"{quote['basis']:+.4f} ({quote['basis_bps']:+.1f} bps)")
+        table.add_row("Фандинг", f"{quote['funding_rate'] * 100:.4f}% (≈ {quote['funding_apr']:.1f}% годовых)")
+        if tracked:
+            table.add_row("Сделка", f"{tracked['direction']} {tracked['size']:g}")
+            table.add_row("Базис входа", f"{tracked['entry_basis']:+.4f}")
+            table.add_row("PnL базиса, $", f"{tracked['basis_pnl']:+.2f}")
+            table.add_row("Фандинг (оценка), $", f"{tracked['funding']:+.4f}")
+        console.print(table)
+
+        action = await inquirer.select(
+            message="Действие:",
+            choices=[
+                {"name": "Вход: спот LONG + перп SHORT", "value": CARRY},
+                {"name": "Вход: спот SELL + перп LONG", "value": REVERSE},
+                {"name": "Выход из базиса", "value": "exit"},
+                {"name": "⬅️ Назад", "value": None},
+            ],
+        ).execute_async()
+        if action is None:
+            return
+
+        if action == "exit":
+            report = await engine.exit(coin)
+        else:
+            notional = await inquirer.number(
+                message="Размер, $:", min_allowed=1, float_allowed=True,
+            ).execute_async()
+            report = await engine.enter(coin, float(notional), action)
+
+        if report["status"] == STATUS_HEDGED:
+            pnl = f", PnL базиса {report['basis_pnl']:+.2f}$" if report["basis_pnl"] is not None else ""
+            skew = f", разброс ног {report['skew_ms']:.1f} мс" if report["skew_ms"] is not None else ""
+            console.print(f"[green]✅ {report['direction']} {coin}: {report['size']:g}{skew}{pnl}[/green]")
+        else:
+            console.print(f"[red]❌ Базис {coin}: {report['status']} - {report['error']}[/red]")
     except Exception as e:
-        console.print(f"[red]❌ Ошибка в меню позиций: {e}[/red]")
+        console.print(f"[red]❌ Ошибка базисной сделки: {e}[/red]")
         await asyncio.sleep(2)
 
-async def open_position(account: Account, side: str):
-    coin = str(await inquirer.text(message="Введите монету (например BTC):").execute_async())
 
-    # получаем цену
-    price = dict(await account.arkham_price.get_futures_price(coin))['price']
-    if not price:
-        console.print(f"[red]❌ Не удалось получить цену {coin}[/red]")
+def get_order_pipeline(account: Account) -> OrderPipeline:
+    """Пайплайн ордеров аккаунта (кэш плеч живёт, пока жива сессия)"""
+    pipeline = order_pipelines.get(account.account)
+    if pipeline is None or pipeline.session is not account.session:
+        pipeline = order_pipelines[account.account] = OrderPipeline(
+            account.session, account.arkham_info, account.arkham_price, account=account.account
+        )
+    return pipeline
+
+
+def print_order_report(report: dict):
+    """Результат ордера и задержки этапов"""
+    if report["ok"]:
+        console.print(
+            f"[green]✅ {report['side'].upper()} по {report['coin']} открыт: {report['size']} "
+            f"@ {report['price']} ({report['leverage']}x, доступно {report['available']:.2f})[/green]"
+        )
+    else:
+        console.print(f"[red]❌ Ошибка открытия позиции: {report['error'] or 'биржа отклонила ордер'}[/red]")
+
+    table = Table(title="⏱ Задержки по этапам")
+    table.add_column("Этап", style="cyan")
+    table.add_column("мс", justify="right", style="yellow")
+    for stage, ms in report["stages"].items():
+        table.add_row(stage, f"{ms:.1f}")
+    console.print(table)
+
+
+async def open_position(account: Account, side: str):
+    coin = str(await inquirer.text(message="Введите монету (например BTC):").execute_async()).strip().upper()
+    if not coin:
         return
 
-    # спрашиваем % от депо
+    # Цена, плечо и маржа грузятся, пока пользователь отвечает на вопросы ниже
+    pipeline = get_order_pipeline(account)
+    pipeline.prefetch(coin)
+
     percent = await inquirer.number(
-        message="Какой процент от депозита использовать?",
+        message="Какой процент от доступной маржи использовать?",
+        float_allowed=True,
     ).execute_async()
 
-    leverage_raw = (await inquirer.text(message="Введите плечо для вашей сделки (1 - 20):").execute_async())
+    leverage_raw = await inquirer.text(
+        message="Введите плечо для вашей сделки (1 - 20, Enter - текущее):"
+    ).execute_async()
     try:
-        console.print('ПРОШЕЛ')
-        leverage = await ArkhamLeverage(account.session).check_leverage(coin.upper(), int(leverage_raw))
-    except (TypeError, ValueError):
-        console.print(f'Не удалось поставить плечо... Используем дефолтное - {config.DEFAULT_LEVERAGE}')
-        leverage = config.DEFAULT_LEVERAGE
-
-    # рассчитываем размер позиции
-    size = PositionSizer(account.balance, int(leverage), float(price), float(percent)).calculate_size()
-    console.print('CER')
-    trader = ArkhamTrading(
-        session=account.session,
-        coin=coin,
-        size=size,
-        info_client=account.arkham_info
-    )
-    console.print('CExxx')
+        leverage = int(leverage_raw) if str(leverage_raw).strip() else None
+    except ValueError:
+        console.print(f"[yellow]⚠️ Неверное плечо, используем текущее или {config.DEFAULT_LEVERAGE}x[/yellow]")
+        leverage = None
 
-    if side == "long":
-        success = await trader.futures_long_market()
-    else:
-        success = await trader.futures_short_market()
-
-    if success:
-        console.print(f"[green]✅ {side.upper()} по {coin} открыт[/green]")
-    else:
-        console.print(f"[red]❌ Ошибка открытия позиции[/red]")
+    try:
+        report = await pipeline.execute(coin, side, float(percent or 0), leverage)
+    except Exception as e:
+        console.print(f"[red]❌ Ошибка открытия позиции: {e}[/red]")
+        return
+    print_order_report(report)
 
 async def close_all_positions(account: Account):
     trader = ArkhamTrading(
         session=account.session,
         coin='LOLKEK',       # Все нормально, так нужно!!!
         size='2 бутерброда', # Все нормально, так нужно!!!
-        info_client=account.arkham_info)
+        info_client=account.arkham_info,
+        account=account.account)
     results = await trader.futures_close_position_market()
     if results:
         console.print(f"[green]✅ Закрыты все позиции: {list(results.keys())}[/green]")
@@ -526,8 +943,7 @@ async def clear_table_action():
         ).execute_async()
         
         if confirmation == "✅ ДА, очистить":
-            trade_table = TradeSQL(db)
-            await trade_table.clear_table(config.TABLE_NAME)
+            await repository.clear()
             console.print("[green]✅ Таблица очищена[/green]")
         else:
             console.print("[yellow]⚠️ Очистка отменена[/yellow]")
@@ -545,8 +961,7 @@ async def delete_account_action(current_account: Account) -> str:
         "cancelled" - если операция отменена
     """
     try:
-        trade_table = TradeSQL(db)
-        accounts = await trade_table.get_all(config.TABLE_NAME)
+        accounts = await repository.get_all()
         
         if not accounts:
             console.print("[red]❌ Нет аккаунтов в базе данных[/red]")
@@ -570,7 +985,7 @@ async def delete_account_action(current_account: Account) -> str:
         ).execute_async()
         
         if confirmation == "✅ ДА, удалить":
-            success = await trade_table.delete_account(config.TABLE_NAME, selected_name)
+            success = await repository.delete_account(selected_name)
             
             if success:
                 console.print(f"[green]✅ Аккаунт '{selected_name}' успешно удален[/green]")
@@ -595,8 +1010,7 @@ async def delete_account_action(current_account: Account) -> str:
 async def show_all_accounts():
     """Показать все аккаунты в виде таблицы"""
     try:
-        trade_table = TradeSQL(db)
-        accounts = await trade_table.get_all(config.TABLE_NAME)
+        accounts = await repository.get_all()
         
         if not accounts:
             console.print("[red]❌ Нет аккаунтов в базе данных[/red]")
@@ -626,11 +1040,267 @@ async def show_all_accounts():
     except Exception as e:
         console.print(f"[red]❌ Ошибка получения списка аккаунтов: {e}[/red]")
 
+def _to_float(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def render_fleet_table(records: list, results: dict, sort_by: str, total: int) -> Table:
+    """Таблица флота: свежие значения из results, для остальных - последние из базы"""
+    rows = []
+    for record in records:
+        result = results.get(record.account)
+        fresh = result is not None and result["status"] == FLEET_OK
+        source = result if fresh else {
+            "balance": record.balance, "volume": record.volume, "points": record.points,
+            "fee": record.margin_fee, "bonus": record.margin_bonus,
+        }
+        values = {key: _to_float(source[key]) for key in ("balance", "volume", "points", "fee", "bonus")}
+        projection = project(values["volume"], "futures", values["fee"], values["bonus"])
+        rows.append((record.account, result, values, projection))
+    rows.sort(key=lambda row: row[2][sort_by], reverse=True)
+
+    table = Table(title=f"🌐 Обзор флота — обновлено {len(results)} из {total}", show_footer=True)
+    table.add_column("Аккаунт", style="cyan", footer="Итого")
+    table.add_column("Баланс", style="yellow", justify="right",
+                     footer=f"{sum(row[2]['balance'] for row in rows):.2f}")
+    table.add_column("Объем", style="blue", justify="right",
+                     footer=f"{sum(row[2]['volume'] for row in rows):.2f}")
+    table.add_column("Очки", style="magenta", justify="right",
+                     footer=f"{sum(row[2]['points'] for row in rows):.0f}")
+    table.add_column("Тир", justify="right")
+    table.add_column("До след. тира", justify="right")
+    table.add_column("Комиссия до тира", justify="right",
+                     footer=f"{sum(row[3]['fee_net'] for row in rows):.2f}")
+    table.add_column("Статус")
+
+    for name, result, values, projection in rows:
+        if result is None:
+            status = "[dim]…[/dim]"
+        elif result["status"] == FLEET_OK:
+            status = f"[green]✅ {result['seconds']:.1f} с[/green]"
+        elif result["status"] == STATUS_NO_SESSION:
+            status = "[yellow]куки истекли[/yellow]"
+        else:
+            status = f"[red]❌ {result['error']}[/red]"
+        style = None if result is not None and result["status"] == FLEET_OK else "dim"
+        table.add_row(
+            name, f"{values['balance']:.2f}", f"{values['volume']:.2f}", f"{values['points']:.0f}",
+            str(projection["tier"]), f"{projection['distance']:.0f}", f"{projection['fee_net']:.2f}", status,
+            style=style,
+        )
+    return table
+
+
+async def fleet_overview():
+    """Обновить баланс/объём/очки всех аккаунтов параллельно и показать сводку"""
+    try:
+        records = await repository.records()
+        if not records:
+            console.print("[red]❌ Нет аккаунтов в базе данных[/red]")
+            return
+
+        sort_by = await inquirer.select(
+            message="Сортировать по:",
+            choices=[{"name": "Очкам", "value": "points"}, {"name": "Объему", "value": "volume"}],
+            default="points",
+        ).execute_async()
+
+        results: dict = {}
+        with Live(
+            render_fleet_table(records, results, sort_by, len(records)),
+            console=console, auto_refresh=False, vertical_overflow="visible",
+        ) as live:
+            last_render = 0.0
+
+            def on_result(name: str, result: dict):
+                # На больших флотах перерисовка не чаще FLEET_RENDER_INTERVAL - сортировка всей таблицы не бесплатна
+                nonlocal last_render
+                results[name] = result
+                if time.monotonic() - last_render >= config.FLEET_RENDER_INTERVAL:
+                    live.update(render_fleet_table(records, results, sort_by, len(records)), refresh=True)
+                    last_render = time.monotonic()
+
+            await FleetRefresh(repository, on_result=on_result).run()
+            live.update(render_fleet_table(records, results, sort_by, len(records)), refresh=True)
+
+        stale = sum(1 for item in results.values() if item["status"] == STATUS_NO_SESSION)
+        if stale:
+            console.print(f"[yellow]⚠️ У {stale} аккаунтов истекли куки - «🔐 Перелогинить аккаунты с истёкшими куками»[/yellow]")
+
+        if not shutdown_event.is_set():
+            await inquirer.text(message="Нажмите Enter для продолжения...").execute_async()
+
+    except Exception as e:
+        if not shutdown_event.is_set():
+            console.print(f"[red]❌ Ошибка обзора флота: {e}[/red]")
+
+async def show_account_history(account: Account, days: int = 30):
+    """Показать прирост очков и объёма по дням"""
+    try:
+        await writer.flush()
+        rows = await history.daily_deltas(account.account, days=days)
+        pace = await history.points_per_volume(int(time.time()) - days * 86400, account=account.account)
+
+        if not rows:
+            console.print("[yellow]⚠️ История пока пуста - она пишется при каждом обновлении данных[/yellow]")
+            return
+
+        table = Table(title=f"📈 История {account.account} за {days} дн.")
+        table.add_column("День", style="cyan")
+        table.add_column("Баланс", style="yellow")
+        table.add_column("Очки", style="magenta")
+        table.add_column("Δ Очки", style="magenta")
+        table.add_column("Объем", style="blue")
+        table.add_column("Δ Объем", style="blue")
+
+        for row in rows:
+            table.add_row(
+                time.strftime("%Y-%m-%d", time.gmtime(row["day_ts"])),
+                f"{row['balance'] or 0:.2f}",
+                f"{row['points'] or 0:.0f}",
+                f"{row['points_delta']:+.0f}" if row["points_delta"] is not None else "—",
+                f"{row['volume'] or 0:.2f}",
+                f"{row['volume_delta']:+.2f}" if row["volume_delta"] is not None else "—",
+            )
+        console.print(table)
+
+        if pace and pace[0]["points_per_usd"]:
+            console.print(f"[green]🏆 Очков на $1000 объема: {pace[0]['points_per_usd'] * 1000:.2f}[/green]")
+
+        if not shutdown_event.is_set():
+            await inquirer.text(message="Нажмите Enter для продолжения...").execute_async()
+
+    except Exception as e:
+        console.print(f"[red]❌ Ошибка получения истории: {e}[/red]")
+
+async def _login_imported_account(row: dict) -> bool:
+    """Логин импортированного аккаунта в отдельной сессии (свой cookie jar)"""
+    account = db_row_to_account(row)
+    account.session = await session_manager.new_session(account.proxy)
+    try:
+        logged = await login_arkham(account)
+        if not logged or not logged.cookies:
+            return False
+        await repository.update_cookies(logged.account, logged.cookies)
+        return True
+    finally:
+        await account.close_session()
+
+
+async def import_accounts_action():
+    """Массовый импорт аккаунтов из CSV/JSONL"""
+    try:
+        path = await inquirer.filepath(
+            message="Путь к файлу (.csv или .jsonl, поля: account,email,password,proxy,api_key,api_secret,captcha_key):",
+            validate=lambda p: os.path.isfile(p),
+            invalid_message="Файл не найден",
+        ).execute_async()
+        do_login = await inquirer.confirm(
+            message="Залогинить импортированные аккаунты?", default=False
+        ).execute_async()
+
+        # Отложенные записи должны лечь в базу раньше импорта
+        await writer.flush()
+        started = time.perf_counter()
+        report = await import_accounts(
+            TradeSQL(db), config.TABLE_NAME, path,
+            batch_size=config.IMPORT_BATCH_SIZE,
+            login=_login_imported_account if do_login else None,
+            login_concurrency=config.IMPORT_LOGIN_CONCURRENCY,
+        )
+        await writer.flush()
+        await repository.load()
+
+        console.print(
+            f"[green]✅ Импортировано: {report['imported']} за {time.perf_counter() - started:.1f} с[/green]"
+        )
+        if report["skipped"]:
+            console.print(f"[yellow]⚠️ Пропущено строк: {len(report['skipped'])}[/yellow]")
+            for line_no, reason in report["skipped"][:10]:
+                console.print(f"  строка {line_no}: {reason}")
+        if report["failed_batches"]:
+            console.print(f"[red]❌ Пачек с ошибкой записи: {report['failed_batches']}[/red]")
+        if do_login:
+            console.print(
+                f"[blue]🔑 Залогинено: {report['logged_in']}, ошибок: {len(report['login_failed'])}[/blue]"
+            )
+
+    except Exception as e:
+        if not shutdown_event.is_set():
+            console.print(f"[red]❌ Ошибка импорта аккаунтов: {e}[/red]")
+
+
+async def export_accounts_action():
+    """Потоковый экспорт таблицы аккаунтов в CSV/JSONL"""
+    try:
+        trade_sql = TradeSQL(db)
+        available = await trade_sql.get_columns(config.TABLE_NAME)
+        columns = await inquirer.checkbox(
+            message="Колонки для экспорта (пробел - выбрать):",
+            choices=[{"name": c, "value": c, "enabled": c not in ("id", "cookies")} for c in available],
+            validate=lambda result: len(result) > 0,
+            invalid_message="Выберите хотя бы одну колонку",
+        ).execute_async()
+        path = await inquirer.text(
+            message="Файл для экспорта (.csv или .jsonl):", default="accounts_export.csv"
+        ).execute_async()
+
+        await writer.flush()
+        exported = await export_accounts(trade_sql, config.TABLE_NAME, path, columns)
+        console.print(f"[green]✅ Выгружено аккаунтов: {exported} -> {path}[/green]")
+
+    except Exception as e:
+        if not shutdown_event.is_set():
+            console.print(f"[red]❌ Ошибка экспорта аккаунтов: {e}[/red]")
+
+
+async def apply_refreshed_cookies(account: str, cookies: dict):
+    """Новые куки из фонового перелогина - сразу в рабочую сессию текущего аккаунта"""
+    if current_account and current_account.account == account and cookies:
+        session = await current_account.ensure_session()
+        apply_cookies(session, cookies)
+        current_account.cookies = cookies
+
+
+async def batch_login_action():
+    """Перелогин всех аккаунтов с истёкшими куками и отчёт по каждому"""
+    try:
+        accounts = await repository.accounts_to_relogin()
+        if not accounts:
+            console.print("[green]✅ У всех аккаунтов живые куки[/green]")
+            return
+
+        confirm = await inquirer.confirm(
+            message=f"Куки истекли у {len(accounts)} аккаунтов. Залогинить их?", default=True
+        ).execute_async()
+        if not confirm or shutdown_event.is_set():
+            return
+
+        report = await BatchLogin(repository).run(accounts)
+
+        table = Table(title="🔐 Пакетный логин")
+        table.add_column("Аккаунт", style="cyan")
+        table.add_column("Статус")
+        table.add_column("Время, с", justify="right")
+        table.add_column("Ошибка", style="red")
+        for name, item in report.items():
+            status = item["status"]
+            color = "green" if status == STATUS_OK else "red"
+            table.add_row(name, f"[{color}]{status}[/{color}]", f"{item['seconds']:.1f}", item["error"] or "")
+        console.print(table)
+
+    except Exception as e:
+        if not shutdown_event.is_set():
+            console.print(f"[red]❌ Ошибка пакетного логина: {e}[/red]")
+
+
 async def select_account() -> Optional[Account]:
     """Выбор аккаунта из базы данных"""
     try:
-        trade_table = TradeSQL(db)
-        accounts = await trade_table.get_all(config.TABLE_NAME)
+        accounts = await repository.get_all()
 
         if not accounts:
             console.print("[red]❌ Нет аккаунтов в базе данных[/red]")
@@ -645,28 +1315,21 @@ async def select_account() -> Optional[Account]:
         if selected_name == "❌ Отмена" or shutdown_event.is_set():
             return None
 
-        acc_data = await trade_table.get_account(config.TABLE_NAME, selected_name)
+        acc_data = await repository.get_account(selected_name)
+        # Разобранные куки берём из кэша репозитория - JSON разбирается один раз
+        acc_data["cookies"] = await repository.get_cookies(selected_name)
         account = db_row_to_account(acc_data)
 
         await account.create_session()
 
-        cookies_loaded = await apply_cookies_from_db(account.session, db, config.TABLE_NAME, account.account)
-        
-        if cookies_loaded:
-            console.print("[green]✅ Куки загружены из БД в сессию[/green]")
-            
-            cookies_from_db = await trade_table.get_cookies(config.TABLE_NAME, account.account)
-            if cookies_from_db:
-                account.cookies = cookies_from_db
-            
-            cookies_valid = await check_cookies_from_account(account)
-            
-            if cookies_valid:
+        # Срок жизни проверяется по cookies_expires_at (config.COOKIES_TTL)
+        if await repository.session_valid(account.account):
+            if apply_cookies(account.session, account.cookies):
+                console.print("[green]✅ Куки загружены из БД в сессию[/green]")
                 console.print("[green]✅ Куки валидны, обновляем данные аккаунта[/green]")
                 await account.update_data()
                 
-                await trade_table.update_account_data(
-                    config.TABLE_NAME,
+                await repository.update_account_data(
                     account.account,
                     account.balance,
                     account.volume,
@@ -676,10 +1339,11 @@ async def select_account() -> Optional[Account]:
                     cookies=None  
                 )
                 return account
-            else:
-                console.print("[yellow]⚠️ Куки не валидны (старше 30 минут), требуется повторный логин[/yellow]")
         else:
-            console.print("[yellow]⚠️ Куки в БД не найдены[/yellow]")
+            console.print(
+                f"[yellow]⚠️ Куки не найдены или истекли (срок {config.COOKIES_TTL // 60} мин), "
+                f"требуется повторный логин[/yellow]"
+            )
 
         console.print("[blue]🔐 Выполняется повторная авторизация...[/blue]")
         account = await login_arkham(account)
@@ -691,8 +1355,7 @@ async def select_account() -> Optional[Account]:
         await account.update_data()
         
         await save_cookies_to_account(account.session, account)
-        await trade_table.update_account_data(
-            config.TABLE_NAME,
+        await repository.update_account_data(
             account.account,
             account.balance,
             account.volume,
@@ -719,10 +1382,15 @@ async def add_account() -> Optional[Account]:
         raw_proxy = await inquirer.text(
             message="Введите прокси (например: http://user:pass ip:port или http://user:pass@ip:port):"
         ).execute_async()
-        proxy = _normalize_proxy(str(raw_proxy))
+        proxy = normalize_proxy(str(raw_proxy))
         api_key = await inquirer.text(message="Введите Arkham api_key:").execute_async()
         api_secret = await inquirer.text(message="Введите Arkham api_secret:").execute_async()
         captcha_key = await inquirer.text(message="Введите TwoCaptcha captcha_key:").execute_async()
+        totp_secret = await inquirer.text(
+            message="TOTP-секрет 2FA (Enter - вводить код вручную при логине):",
+            validate=lambda secret: not secret.strip() or valid_secret(secret),
+            invalid_message="Секрет должен быть в base32 (как в Google Authenticator)",
+        ).execute_async()
         
         account = Account(
             account=account_name,
@@ -731,7 +1399,8 @@ async def add_account() -> Optional[Account]:
             proxy=proxy or None,
             api_key=api_key,
             api_secret=api_secret,
-            captcha_key=captcha_key
+            captcha_key=captcha_key,
+            totp_secret=totp_secret.strip() or None,
         )
 
         await account.create_session()
@@ -805,7 +1474,6 @@ async def save_account_to_db(
         return
         
     try:
-        trade_table = TradeSQL(db)
         account_data = account.model_dump(
             exclude={"arkham_info", "arkham_login", "arkam_price", "arkham_trader", "session", "_session_manager"}
         )
@@ -834,7 +1502,7 @@ async def save_account_to_db(
             elif not isinstance(value, (str, int, float, bytes)):
                 account_data[key] = str(value)
         
-        await trade_table.add_info(config.TABLE_NAME, account_data)
+        await repository.add_info(account_data)
         console.print(f"[green]✅ Аккаунт '{account.account}' успешно добавлен в базу[/green]")
         
     except Exception as e:
@@ -847,14 +1515,17 @@ async def login_arkham(account: Account) -> Optional[Account]:
     try:
         session = await account.ensure_session()
 
-        captcha = TwoCaptcha(session, account.captcha_key)
-        token = await captcha.solve_turnstile()
+        token = await get_captcha_pool(account.captcha_key).get()
+        if not token or shutdown_event.is_set():
+            console.print("[red]❌ Ошибка: не удалось получить токен капчи[/red]")
+            return None
 
         arkham_login = ArkhamLogin(
             session=session,
             password=account.password,
             email=account.email,
             turnstile_token=token,
+            totp_secret=account.totp_secret,
         )
 
         status = await arkham_login.login_arkham()
@@ -862,7 +1533,11 @@ async def login_arkham(account: Account) -> Optional[Account]:
             console.print("[red]❌ Ошибка: не удалось войти в Arkham[/red]")
             return None
 
-        code_2fa = await arkham_login.input_2fa()
+        if arkham_login.totp_secret:
+            code_2fa = await arkham_login.get_2fa_code()
+        else:
+            async with prompt_lock:
+                code_2fa = await arkham_login.get_2fa_code(account.account)
         if shutdown_event.is_set():
             return None
             
@@ -890,6 +1565,10 @@ async def create_table():
     try:
         trade_table = TradeSQL(db)
         await trade_table.create_table(config.TABLE_NAME)
+        await history.create_table()
+        await history.apply_retention(
+            config.SNAPSHOT_RAW_DAYS, config.SNAPSHOT_HOURLY_DAYS, config.SNAPSHOT_MAX_DAYS
+        )
         console.print("[green]✅ Таблица успешно создана/проверена[/green]")
     except Exception as e:
         if not shutdown_event.is_set():
@@ -898,8 +1577,9 @@ async def create_table():
 # --- Main ---
 async def main():
     """Главная функция программы с улучшенной обработкой завершения"""
-    global db 
+    global db, writer, repository, history, refresher
     try:
+        setup_logging()
         setup_interrupt_handler()
         
         console.print(Panel.fit(
@@ -909,8 +1589,19 @@ async def main():
         ))
 
         db = AsyncDatabaseManager(config.DB_NAME)
+        history = AccountHistory(db, config.SNAPSHOTS_TABLE_NAME)
 
         await create_table()
+
+        writer = AccountWriteBehind(TradeSQL(db), config.TABLE_NAME, history=history)
+        writer.start()
+
+        repository = AccountRepository(TradeSQL(db), config.TABLE_NAME, writer=writer)
+        await repository.load()
+
+        if config.SESSION_REFRESH_ENABLED:
+            refresher = SessionRefresher(repository, on_refreshed=apply_refreshed_cookies)
+            refresher.start()
         
         if shutdown_event.is_set():
             return
@@ -0,0 +1,141 @@
+import asyncio
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from db.repository import AccountRepository
+from src.account.login import ArkhamLogin
+from utils.captcha import get_captcha_pool
+from utils.cookies import session_cookies
+from utils.proxy import interleave_by_proxy
+from utils.session import GlobalSessionManager
+
+from data import config
+
+# Статусы отчёта по аккаунту
+STATUS_OK = "ok"
+STATUS_NOT_FOUND = "not_found"
+STATUS_CAPTCHA_FAILED = "captcha_failed"
+STATUS_LOGIN_FAILED = "login_failed"
+STATUS_2FA_FAILED = "2fa_failed"
+STATUS_ERROR = "error"
+
+
+class BatchLogin:
+    """
+    Пакетный перелогин аккаунтов с истёкшими куками.
+
+    Каждый логин идёт в отдельной сессии (свой cookie jar) и ограничен
+    общим семафором concurrency и семафором per_proxy на прокси, чтобы
+    не светить один IP десятком параллельных логинов. Как и в FleetRefresh,
+    очередь чередует прокси по кругу, а слот прокси занимается раньше
+    общего - логины одного занятого прокси не держат общие слоты, пока
+    ждут свой. Токены капчи берутся из общего CaptchaPool ключа -
+    ожидающие логины решают капчи параллельно.
+    Куки всех успешных логинов пишутся в базу одной транзакцией в конце.
+
+    Args:
+        repository: репозиторий аккаунтов
+        concurrency: максимум одновременных логинов
+        per_proxy: максимум одновременных логинов через один прокси
+        code_provider: async (row) -> код 2FA; по умолчанию TOTP из totp_secret
+            аккаунта, для аккаунтов без секрета - ввод с клавиатуры
+    """
+    def __init__(
+        self,
+        repository: AccountRepository,
+        concurrency: int = config.BATCH_LOGIN_CONCURRENCY,
+        per_proxy: int = config.BATCH_LOGIN_PER_PROXY,
+        code_provider: Optional[Callable[[Dict], Awaitable[str]]] = None,
+    ):
+        self.repository = repository
+        self.concurrency = concurrency
+        self.per_proxy = per_proxy
+        self.code_provider = code_provider
+        self._session_manager = GlobalSessionManager()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._proxy_semaphores: Dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(self.per_proxy)
+        )
+        # Ввод с клавиатуры - по одному аккаунту за раз
+        self._prompt_lock = asyncio.Lock()
+
+    async def _get_code(self, login: ArkhamLogin, row: Dict) -> str:
+        if self.code_provider:
+            return await self.code_provider(row)
+        if login.totp_secret:
+            return await login.get_2fa_code()
+        async with self._prompt_lock:
+            return await login.get_2fa_code(row["account"])
+
+    async def run(self, accounts: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """
+        Залогинить accounts (по умолчанию - все с истёкшими куками).
+
+        Returns:
+            dict: account -> {"status", "seconds", "error"}
+        """
+        if accounts is None:
+            accounts = await self.repository.accounts_to_relogin()
+        if not accounts:
+            logger.info("Нет аккаунтов для перелогина")
+            return {}
+
+        logger.info(f"Пакетный логин {len(accounts)} аккаунтов (параллельно {self.concurrency}, на прокси {self.per_proxy})")
+        started = time.perf_counter()
+        cookies_by_account: Dict[str, dict] = {}
+        rows = dict(zip(accounts, await asyncio.gather(*(self.repository.get_account(name) for name in accounts))))
+        ordered = interleave_by_proxy(accounts, lambda name: (rows[name] or {}).get("proxy"))
+        results = await asyncio.gather(*(self._login_one(name, rows[name], cookies_by_account) for name in ordered))
+        by_name = dict(zip(ordered, results))
+        report = {name: by_name[name] for name in accounts}
+
+        if cookies_by_account:
+            await self.repository.update_cookies_many(cookies_by_account)
+
+        ok = sum(1 for item in report.values() if item["status"] == STATUS_OK)
+        logger.success(
+            f"Пакетный логин завершён за {time.perf_counter() - started:.1f} с: успешно {ok} из {len(accounts)}"
+        )
+        return report
+
+    async def _login_one(self, name: str, row: Optional[Dict], cookies_by_account: Dict[str, dict]) -> Dict:
+        started = time.perf_counter()
+
+        def result(status: str, error: str | None = None) -> Dict:
+            return {"status": status, "seconds": round(time.perf_counter() - started, 2), "error": error}
+
+        if not row:
+            return result(STATUS_NOT_FOUND)
+
+        proxy = row.get("proxy")
+        async with self._proxy_semaphores[proxy or "no_proxy"], self._semaphore:
+            session = await self._session_manager.new_session(proxy)
+            try:
+                token = await get_captcha_pool(row.get("captcha_key")).get()
+                if not token:
+                    return result(STATUS_CAPTCHA_FAILED)
+
+                login = ArkhamLogin(
+                    session=session,
+                    password=row["password"],
+                    email=row["email"],
+                    turnstile_token=token,
+                    totp_secret=row.get("totp_secret"),
+                )
+                if not await login.login_arkham():
+                    return result(STATUS_LOGIN_FAILED)
+
+                code = await self._get_code(login, row)
+                if not code or not await login.verify_2FA(code):
+                    return result(STATUS_2FA_FAILED)
+
+                cookies_by_account[name] = session_cookies(session)
+                return result(STATUS_OK)
+            except Exception as e:
+                logger.error(f"Ошибка пакетного логина '{name}': {e}")
+                return result(STATUS_ERROR, str(e))
+            finally:
+                await session.close()
@@ -0,0 +1,168 @@
+import asyncio
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+from loguru import logger
+
+from db.records import AccountRecord
+from db.repository import AccountRepository
+from src.account.info import ArkhamInfo
+from utils.cookies import apply_cookies
+from utils.proxy import interleave_by_proxy
+from utils.session import GlobalSessionManager
+
+from data import config
+
+# Статусы обновления аккаунта
+STATUS_OK = "ok"
+STATUS_NO_SESSION = "no_session"
+STATUS_ERROR = "error"
+
+# Поля статистики, без которых строка не пишется в базу и историю
+REQUIRED_STATS = ("balance", "volume", "points")
+
+
+async def fetch_account_stats(info: ArkhamInfo) -> Dict:
+    """
+    Баланс, объём, очки и маржинальные бонусы аккаунта одним пакетом запросов.
+
+    ArkhamInfo.get_* не бросают исключений, а возвращают None или 0, поэтому
+    отозванная сервером сессия проверяется отдельным check_session()
+    параллельно с остальными запросами.
+
+    Returns:
+        dict: status, balance, volume, points, fee, bonus, error
+    """
+    alive, balance, points, volume, (bonus, fee) = await asyncio.gather(
+        info.check_session(),
+        info.get_balance(),
+        info.get_volume_or_points("points"),
+        info.get_volume_or_points("volume"),
+        info.get_fee_margin(),
+    )
+    stats = {
+        "status": STATUS_OK, "balance": balance, "volume": volume, "points": points,
+        "fee": fee, "bonus": bonus, "error": None,
+    }
+    if alive is False:
+        stats.update(status=STATUS_NO_SESSION, error="сессия отозвана сервером")
+    elif alive is None:
+        stats.update(status=STATUS_ERROR, error="сервер не ответил на проверку сессии")
+    else:
+        missing = [key for key in REQUIRED_STATS if stats[key] is None]
+        if missing:
+            stats.update(status=STATUS_ERROR, error=f"не получены: {', '.join(missing)}")
+    return stats
+
+
+class FleetRefresh:
+    """
+    Обновление баланса, объёма и очков всех аккаунтов сразу.
+
+    Каждый аккаунт опрашивается в своей сессии (свой cookie jar и прокси),
+    не больше concurrency аккаунтов одновременно и не больше per_proxy через
+    один прокси. Очередь чередует прокси по кругу, а слот прокси занимается
+    раньше общего - аккаунты одного перегруженного прокси не держат общие
+    слоты, пока ждут свой. Аккаунты с истёкшими куками пропускаются
+    (их перелогинивает BatchLogin), отозванная сервером сессия получает
+    STATUS_NO_SESSION, неполученная статистика - STATUS_ERROR.
+
+    on_result(account, result) вызывается по мере готовности - для
+    прогрессивной отрисовки. В базу (и историю снимков) одной транзакцией
+    в конце run() пишутся только строки STATUS_OK; не полученные бонусы
+    маржи (fee/bonus) берутся из базы, а не затираются нулями.
+
+    Args:
+        repository: репозиторий аккаунтов
+        concurrency: максимум одновременно опрашиваемых аккаунтов
+        per_proxy: максимум одновременных аккаунтов через один прокси
+        on_result: колбэк (account, result)
+    """
+    def __init__(
+        self,
+        repository: AccountRepository,
+        concurrency: int = config.FLEET_REFRESH_CONCURRENCY,
+        per_proxy: int = config.FLEET_REFRESH_PER_PROXY,
+        on_result: Optional[Callable[[str, Dict], None]] = None,
+    ):
+        self.repository = repository
+        self.concurrency = concurrency
+        self.per_proxy = per_proxy
+        self.on_result = on_result
+        self._session_manager = GlobalSessionManager()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._proxy_semaphores: Dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(self.per_proxy)
+        )
+
+    @staticmethod
+    def interleave(records: List[AccountRecord]) -> List[AccountRecord]:
+        """Порядок обхода: по одному аккаунту каждого прокси по кругу"""
+        return interleave_by_proxy(records, lambda record: record.proxy)
+
+    async def run(self, accounts: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """
+        Обновить accounts (по умолчанию - все аккаунты базы).
+
+        Returns:
+            dict: account -> {"status", "balance", "volume", "points", "seconds", "error"}
+        """
+        records = await self.repository.records()
+        if accounts is not None:
+            wanted = set(accounts)
+            records = [record for record in records if record.account in wanted]
+        if not records:
+            return {}
+
+        logger.info(
+            f"Обновление {len(records)} аккаунтов (параллельно {self.concurrency}, на прокси {self.per_proxy})"
+        )
+        started = time.perf_counter()
+        ordered = self.interleave(records)
+        results = await asyncio.gather(*(self._refresh_one(record) for record in ordered))
+        report = {record.account: result for record, result in zip(ordered, results)}
+
+        rows = [
+            {
+                "account": record.account,
+                **{key: item[key] for key in REQUIRED_STATS},
+                "fee": item["fee"] if item["fee"] is not None else record.margin_fee,
+                "bonus": item["bonus"] if item["bonus"] is not None else record.margin_bonus,
+            }
+            for record, item in zip(ordered, results) if item["status"] == STATUS_OK
+        ]
+        if rows:
+            await self.repository.update_account_data_many(rows)
+
+        logger.success(
+            f"Обновление завершено за {time.perf_counter() - started:.1f} с: успешно {len(rows)} из {len(records)}"
+        )
+        return report
+
+    async def _refresh_one(self, record: AccountRecord) -> Dict:
+        started = time.perf_counter()
+        result = {
+            "status": STATUS_OK, "balance": None, "volume": None, "points": None,
+            "fee": None, "bonus": None, "seconds": 0.0, "error": None,
+        }
+
+        if not record.session_valid():
+            result["status"] = STATUS_NO_SESSION
+        else:
+            async with self._proxy_semaphores[record.proxy or "no_proxy"], self._semaphore:
+                session = await self._session_manager.new_session(record.proxy)
+                try:
+                    apply_cookies(session, record.parsed_cookies())
+                    info = ArkhamInfo(session=session, api_key=record.api_key, api_secret=record.api_secret)
+                    result.update(await fetch_account_stats(info))
+                except Exception as e:
+                    logger.error(f"Ошибка обновления '{record.account}': {e}")
+                    result.update(status=STATUS_ERROR, error=str(e) or type(e).__name__)
+                finally:
+                    await session.close()
+
+        result["seconds"] = round(time.perf_counter() - started, 2)
+        if self.on_result:
+            self.on_result(record.account, result)
+        return result
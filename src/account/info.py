@@ -4,12 +4,17 @@ import hmac
 import hashlib
 import time
 
+from data import config
+
 class ArkhamInfo:
     def __init__(self, session: aiohttp.ClientSession,  api_key: str,  api_secret: str, subaccount_id: int = 0):
         self.session = session
         self.api_key = api_key
         self.api_secret = api_secret
         self.subaccount_id = subaccount_id
+        # Кэш /api/account/balances: {asset: {"balance", "free", "usdt"}} и время запроса
+        self._balances: dict | None = None
+        self._balances_at = 0.0
 
     def headers(self, action: str = None, signed: bool = False, path: str = "", query: str = "") -> dict:
         referer_map = {
@@ -44,7 +49,7 @@ class ArkhamInfo:
     async def get_balance(self):
         try:
             async with self.session.get(
-                "https://arkm.com/api/account/margin/all",
+                f"{config.BASE_URL}/api/account/margin/all",
                 headers=self.headers("balance")
             ) as response:
                 data = await response.json()
@@ -62,9 +67,94 @@ class ArkhamInfo:
             logger.error(f"Ошибка при получении баланса: {e}")
             return None
 
+    async def get_margin(self) -> dict | None:
+        """Маржинальная сводка: equity, available, pnl, initial_margin (None - не удалось получить)"""
+        try:
+            async with self.session.get(
+                f"{config.BASE_URL}/api/account/margin/all",
+                headers=self.headers("balance")
+            ) as response:
+                if response.status != 200:
+                    logger.error(f"Не удалось получить маржу: HTTP {response.status}")
+                    return None
+                data = await response.json()
+                margin = data[0] if isinstance(data, list) and data else data
+                return {
+                    "equity": float(margin.get("totalAssetValue", 0)),
+                    "available": float(margin.get("available", 0)),
+                    "pnl": float(margin.get("pnl", 0)),
+                    "initial_margin": float(margin.get("initialMargin", 0)),
+                }
+        except Exception as e:
+            logger.error(f"Ошибка при получении маржи: {e}")
+            return None
+
+    async def get_balances(self, max_age: float = config.BALANCES_CACHE_TTL, force: bool = False) -> dict | None:
+        """
+        Балансы всех активов одним запросом: {"USDT": {"balance", "free", "usdt"}, "BTC": {...}}.
+        Ответ кэшируется на max_age секунд; успешный ордер через ArkhamTrading
+        с этим info_client сбрасывает кэш. None - не удалось получить.
+        """
+        if not force and self._balances is not None and time.monotonic() - self._balances_at <= max_age:
+            return self._balances
+        query = f"subaccountId={self.subaccount_id}"
+        try:
+            async with self.session.get(
+                f"{config.BASE_URL}/api/account/balances?{query}",
+                headers=self.headers("balance")
+            ) as response:
+                if response.status != 200:
+                    logger.error(f"Не удалось получить балансы: HTTP {response.status}")
+                    return None
+                data = await response.json()
+        except Exception as e:
+            logger.error(f"Ошибка при получении балансов: {e}")
+            return None
+
+        self._balances = {
+            item["symbol"]: {
+                "balance": float(item.get("balance", 0)),
+                "free": float(item.get("free", item.get("balance", 0))),
+                "usdt": float(item.get("balanceUSDT", 0)),
+            }
+            for item in data
+        }
+        self._balances_at = time.monotonic()
+        return self._balances
+
+    def invalidate_balances(self):
+        """Сбросить кэш балансов (после ордера)"""
+        self._balances = None
+
+    async def get_spot_balance(self, coin: str, max_age: float = config.BALANCES_CACHE_TTL) -> float:
+        """Свободный спот-баланс монеты (0.0, если монеты нет или балансы недоступны)"""
+        balances = await self.get_balances(max_age=max_age)
+        if balances is None:
+            return 0.0
+        return balances.get(coin.upper(), {}).get("free", 0.0)
+
+    async def check_session(self) -> bool | None:
+        """
+        Дешёвая проверка, что куки сессии ещё принимаются сервером.
+        True - жива, False - 401/403, None - ответ не позволяет судить (сеть, 5xx)
+        """
+        try:
+            async with self.session.get(
+                f"{config.BASE_URL}/api/account/margin/all",
+                headers=self.headers("balance")
+            ) as response:
+                if response.status == 200:
+                    return True
+                if response.status in (401, 403):
+                    return False
+                return None
+        except Exception as e:
+            logger.warning(f"Проверка сессии не удалась: {e}")
+            return None
+
     async def get_volume_or_points(self, action: str):
         try:
-            url = f"https://arkm.com/api/affiliate-dashboard/{'volume' if action == 'volume' else 'points'}-season-2"
+            url = f"{config.BASE_URL}/api/affiliate-dashboard/{'volume' if action == 'volume' else 'points'}-season-2"
             async with self.session.get(url, headers=self.headers(action)) as response:
                 data = await response.json()
 
@@ -84,7 +174,7 @@ class ArkhamInfo:
     async def get_fee_margin(self):
         try:
             async with self.session.get(
-                "https://arkm.com/api/rewards/info",
+                f"{config.BASE_URL}/api/rewards/info",
                 headers=self.headers("rewards")
             ) as response:
                 data = await response.json()
@@ -100,18 +190,20 @@ class ArkhamInfo:
             logger.error(f"Ошибка при получении маржинальных бонусов: {e}")
             return None, None
 
-    async def get_positions(self):
-        """Фьючерсные позиции"""
+    async def get_positions(self, strict: bool = False):
+        """Фьючерсные позиции (strict - ошибка ответа бросает RuntimeError, а не выглядит как "нет позиций")"""
         path = "/api/account/positions"
         query = f"subaccountId={self.subaccount_id}"
 
         async with self.session.get(
-            f"https://arkm.com{path}?{query}",
+            f"{config.BASE_URL}{path}?{query}",
             headers=self.headers(signed=True, path=path, query=query)
         ) as response:
             if response.status != 200:
                 text = await response.text()
                 logger.error(f"Не удалось получить позиции: {text}")
+                if strict:
+                    raise RuntimeError(f"позиции недоступны: HTTP {response.status}")
                 return []
             return await response.json()
 
@@ -126,7 +218,7 @@ class ArkhamInfo:
                 return long_size - short_size
         return 0.0
     
-    async def get_all_positions(self):
+    async def get_all_positions(self, strict: bool = False):
         """
         Возвращает словарь с актуальными позициями:
         - base (кол-во монеты)
@@ -134,8 +226,12 @@ class ArkhamInfo:
         - pnl (прибыль/убыток)
         - entry (средняя цена входа)
         - mark (текущая цена)
+        - leverage (плечо)
+        - margin (начальная маржа позиции)
+
+        strict=True - неудачный запрос бросает RuntimeError вместо пустого словаря
         """
-        positions = await self.get_positions()
+        positions = await self.get_positions(strict)
         result = {}
 
         for pos in positions:
@@ -148,7 +244,8 @@ class ArkhamInfo:
                     "pnl": float(pos.get("pnl", 0)),
                     "entry": float(pos.get("averageEntryPrice", 0)),
                     "mark": float(pos.get("markPrice", 0)),
-                    "leverage": round(float(pos.get("value", 0)) / float(pos.get("initialMargin", 1)), 2)
+                    "leverage": round(float(pos.get("value", 0)) / float(pos.get("initialMargin", 1)), 2),
+                    "margin": float(pos.get("initialMargin", 0)),
                 }
         return result
 
@@ -1,30 +1,41 @@
 from loguru import logger
 import aiohttp
+import asyncio
 import json
 
 from data import config
+from utils.totp import fresh_totp
 
 class ArkhamLogin:
     def __init__(self,
                 session: aiohttp.ClientSession,
                 password: str,
                 email: str,
-                turnstile_token: str | None = None
+                turnstile_token: str | None = None,
+                totp_secret: str | None = None,
         ):
         self.session = session
         self.token = turnstile_token
         self.password = password
         self.email = email
+        self.totp_secret = totp_secret
 
     @staticmethod
-    async def input_2fa():
-        msg = " 🔑 Введите 2FA код: "
+    async def input_2fa(account: str | None = None):
+        msg = f" 🔑 Введите 2FA код ({account}): " if account else " 🔑 Введите 2FA код: "
         border = "=" * 33 
         print("\n" + border)
         print("|" + msg.ljust(len(border) - 2) + "|")
         print(border)
-        code = input("> ").strip()
-        return code
+        # input() в отдельном потоке - event loop продолжает обслуживать фоновые задачи
+        code = await asyncio.to_thread(input, "> ")
+        return code.strip()
+
+    async def get_2fa_code(self, account: str | None = None) -> str:
+        """Код 2FA: из TOTP-секрета аккаунта, если он задан, иначе ввод с клавиатуры"""
+        if self.totp_secret:
+            return await fresh_totp(self.totp_secret)
+        return await self.input_2fa(account)
         
     async def headers(self, action: str | None = None):
         if action == 'login':
@@ -58,7 +69,7 @@ class ArkhamLogin:
     async def login_arkham(self):
         async with self.session.get(config.PAGE_URL) as resp:
             logger.info(f"Загрузили страницу логина: {resp.status}")
-        async with self.session.post('https://arkm.com/api/auth/login', 
+        async with self.session.post(f'{config.BASE_URL}/api/auth/login', 
                           headers=await self.headers(action='login'), 
                           json=await self.json_data(action='login')) as resp:
             response_text = await resp.text()
@@ -87,7 +98,7 @@ class ArkhamLogin:
     async def verify_2FA(self, code_2fa: str) -> bool:
         while True:
             async with self.session.post(
-                'https://arkm.com/api/auth/login/challenge',
+                f'{config.BASE_URL}/api/auth/login/challenge',
                 headers=await self.headers(),
                 json=await self.json_data(code_2fa=code_2fa)
             ) as resp:
@@ -0,0 +1,208 @@
+import asyncio
+import random
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from db.repository import AccountRepository
+from src.account.batch_login import BatchLogin, STATUS_OK
+from src.account.info import ArkhamInfo
+from utils.cookies import apply_cookies
+from utils.proxy import interleave_by_proxy
+from utils.session import GlobalSessionManager
+
+from data import config
+
+
+class SessionRefresher:
+    """
+    Фоновое обновление сессий до истечения куков.
+
+    Раз в tick секунд:
+        - аккаунты, у которых до cookies_expires_at осталось меньше lead
+          (плюс случайный сдвиг до jitter, чтобы перелогины и капчи не шли
+          одной волной), перелогиниваются через BatchLogin;
+        - живые по времени сессии раз в probe_interval проверяются дешёвым
+          авторизованным запросом - отозванная сервером сессия
+          перелогинивается сразу, не дожидаясь created_at + TTL. Проверки
+          ограничены семафорами probe_concurrency и probe_per_proxy, как
+          логины в BatchLogin: слот прокси занимается раньше общего, очередь
+          чередует прокси по кругу.
+
+    Неудачный перелогин повторяется не раньше чем через retry_delay секунд
+    (удваивается с каждой неудачей подряд, максимум - COOKIES_TTL), чтобы
+    неверный пароль не жёг капчу каждый тик.
+
+    Перелогин без участия человека возможен только с TOTP-секретом, поэтому
+    аккаунты без totp_secret пропускаются. Торговля не ждёт логина: новые
+    куки передаются в on_refreshed(account, cookies), где их можно применить
+    к рабочей сессии.
+
+    Args:
+        repository: репозиторий аккаунтов
+        batch_login: исполнитель перелогина (по умолчанию BatchLogin(repository))
+        tick: период проверки расписания, с
+        lead: за сколько секунд до истечения куков перелогиниваться
+        jitter: максимальный случайный сдвиг перелогина и проверок, с
+        probe_interval: период проверки живости сессии, с (0 - не проверять)
+        probe_concurrency: максимум одновременных проверок живости
+        probe_per_proxy: максимум одновременных проверок через один прокси
+        retry_delay: пауза перед повтором неудачного перелогина, с
+        on_refreshed: async callback(account, cookies) после успешного перелогина
+    """
+    def __init__(
+        self,
+        repository: AccountRepository,
+        batch_login: Optional[BatchLogin] = None,
+        tick: float = config.SESSION_REFRESH_TICK,
+        lead: float = config.SESSION_REFRESH_LEAD,
+        jitter: float = config.SESSION_REFRESH_JITTER,
+        probe_interval: float = config.SESSION_PROBE_INTERVAL,
+        retry_delay: float = config.SESSION_REFRESH_RETRY,
+        probe_concurrency: int = config.SESSION_PROBE_CONCURRENCY,
+        probe_per_proxy: int = config.SESSION_PROBE_PER_PROXY,
+        on_refreshed: Optional[Callable[[str, dict], Awaitable[None]]] = None,
+    ):
+        self.repository = repository
+        self.batch_login = batch_login or BatchLogin(repository)
+        self.tick = tick
+        self.lead = lead
+        self.jitter = jitter
+        self.probe_interval = probe_interval
+        self.retry_delay = retry_delay
+        self.probe_per_proxy = probe_per_proxy
+        self.on_refreshed = on_refreshed
+
+        self._session_manager = GlobalSessionManager()
+        self._probe_semaphore = asyncio.Semaphore(probe_concurrency)
+        self._probe_proxy_semaphores: Dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(self.probe_per_proxy)
+        )
+        # Сдвиг фиксируется на конкретный срок куков, чтобы расписание не прыгало между тиками
+        self._jitter: Dict[str, tuple[float, float]] = {}
+        self._next_probe: Dict[str, float] = {}
+        self._retry_at: Dict[str, float] = {}
+        self._failures: Dict[str, int] = {}
+        self._in_progress: set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+        self.refreshed = 0
+        self.failed = 0
+        self.probes = 0
+        self.probe_failures = 0
+        self.last_report: Dict[str, Dict] = {}
+
+    def metrics(self) -> Dict:
+        return {
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "probes": self.probes,
+            "probe_failures": self.probe_failures,
+            "in_progress": len(self._in_progress),
+        }
+
+    # --- Жизненный цикл ---
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Фоновое обновление сессий запущено (за {self.lead:.0f} с до истечения)")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Ошибка фонового обновления сессий: {e}")
+            await asyncio.sleep(self.tick)
+
+    # --- Расписание ---
+    def refresh_at(self, account: str, expires_at: float) -> float:
+        """Момент перелогина: expires_at - lead - случайный сдвиг [0, jitter]"""
+        cached = self._jitter.get(account)
+        if cached is None or cached[0] != expires_at:
+            cached = self._jitter[account] = (expires_at, random.uniform(0, self.jitter))
+        return expires_at - self.lead - cached[1]
+
+    async def run_once(self) -> Dict[str, Dict]:
+        """Один проход: проверки живости, затем перелогин всех, кому пора"""
+        now = time.time()
+        rows = [
+            row for row in await self.repository.get_all()
+            if row.get("totp_secret")
+            and row["account"] not in self._in_progress
+            and self._retry_at.get(row["account"], 0) <= now
+        ]
+
+        due: List[str] = []
+        probe: List[Dict] = []
+        for row in rows:
+            expires_at = row.get("cookies_expires_at") or 0
+            if self.refresh_at(row["account"], expires_at) <= now:
+                due.append(row["account"])
+            elif self.probe_interval and self._next_probe.get(row["account"], 0) <= now:
+                probe.append(row)
+
+        if probe:
+            probe = interleave_by_proxy(probe, lambda row: row.get("proxy"))
+            alive = await asyncio.gather(*(self._probe(row) for row in probe))
+            due.extend(row["account"] for row, ok in zip(probe, alive) if ok is False)
+
+        if not due:
+            return {}
+        return await self._refresh(due)
+
+    async def _probe(self, row: Dict) -> Optional[bool]:
+        account = row["account"]
+        self._next_probe[account] = time.time() + self.probe_interval + random.uniform(0, self.jitter)
+        cookies = await self.repository.get_cookies(account)
+        if not cookies:
+            return False
+
+        async with self._probe_proxy_semaphores[row.get("proxy") or "no_proxy"], self._probe_semaphore:
+            session = await self._session_manager.new_session(row.get("proxy"))
+            try:
+                apply_cookies(session, cookies)
+                self.probes += 1
+                alive = await ArkhamInfo(session, row.get("api_key"), row.get("api_secret")).check_session()
+            finally:
+                await session.close()
+
+        if alive is False:
+            self.probe_failures += 1
+            logger.warning(f"Сессия '{account}' отозвана сервером до истечения куков")
+        return alive
+
+    async def _refresh(self, accounts: List[str]) -> Dict[str, Dict]:
+        self._in_progress.update(accounts)
+        try:
+            report = await self.batch_login.run(accounts)
+        finally:
+            self._in_progress.difference_update(accounts)
+
+        for account, item in report.items():
+            if item["status"] != STATUS_OK:
+                self.failed += 1
+                failures = self._failures[account] = self._failures.get(account, 0) + 1
+                delay = min(self.retry_delay * 2 ** (failures - 1), config.COOKIES_TTL)
+                self._retry_at[account] = time.time() + delay
+                logger.warning(f"Перелогин '{account}' не удался ({item['status']}), повтор через {delay:.0f} с")
+                continue
+            self.refreshed += 1
+            self._failures.pop(account, None)
+            self._retry_at.pop(account, None)
+            self._next_probe[account] = time.time() + self.probe_interval
+            if self.on_refreshed:
+                try:
+                    await self.on_refreshed(account, await self.repository.get_cookies(account))
+                except Exception as e:
+                    logger.error(f"Ошибка применения новых куков '{account}': {e}")
+        self.last_report = report
+        return report
@@ -0,0 +1,36 @@
+import os
+import secrets
+from typing import Optional
+
+# Только стандартная библиотека: модуль импортируется при каждом запуске cli.py
+
+
+def read_token(path: str) -> Optional[str]:
+    """Токен демона из файла (None - файла нет или он пуст)"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def ensure_token(path: str) -> str:
+    """
+    Токен из файла, а если его нет - новый случайный, записанный в файл с
+    правами 0600: cli.py читает его оттуда, другим пользователям он не виден.
+    """
+    token = read_token(path)
+    if token:
+        return token
+    token = secrets.token_urlsafe(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token)
+    return token
+
+
+def resolve_token(token: Optional[str], path: str, create: bool = False) -> Optional[str]:
+    """Явный токен (ARKHAM_DAEMON_TOKEN), иначе файл токена; create - сгенерировать, если файла нет"""
+    if token:
+        return token
+    return ensure_token(path) if create else read_token(path)
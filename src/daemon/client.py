@@ -0,0 +1,40 @@
+import asyncio
+import json
+from typing import Dict, Optional
+
+# Только стандартная библиотека: клиент импортируется при каждом запуске cli.py
+
+
+async def send_command(
+    command: str,
+    args: Optional[Dict] = None,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    token: Optional[str] = None,
+    timeout: float = 60.0,
+) -> Optional[Dict]:
+    """
+    Отправить команду запущенному демону (одна JSON-строка туда, одна обратно).
+
+    Returns:
+        dict: {"ok": bool, "result" | "error": ...}; None - демон не запущен
+    """
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), 1.0)
+    except (OSError, asyncio.TimeoutError):
+        return None
+
+    try:
+        request = {"command": command, "args": args or {}, "token": token}
+        writer.write(json.dumps(request, ensure_ascii=False).encode() + b"\n")
+        await writer.drain()
+        line = await asyncio.wait_for(reader.readline(), timeout)
+        if not line:
+            return {"ok": False, "error": "Демон закрыл соединение без ответа"}
+        return json.loads(line)
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
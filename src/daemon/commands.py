@@ -0,0 +1,266 @@
+import asyncio
+import inspect
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from db.history import AccountHistory
+from db.manager import AsyncDatabaseManager
+from db.repository import AccountRepository
+from db.tradeDB import TradeSQL
+from db.writer import AccountWriteBehind
+from src.account.fleet_refresh import STATUS_OK, fetch_account_stats
+from src.account.info import ArkhamInfo
+from src.trade.order_pipeline import OrderPipeline
+from src.trade.positions_store import PositionsPoller, PositionsStore
+from src.trade.risk_engine import PortfolioRisk
+from src.trade.trading_client import ArkhamTrading
+from utils.cookies import apply_cookies
+from utils.get_prices import ArkhamPrices
+from utils.session import GlobalSessionManager
+
+from data import config
+
+
+class CommandError(Exception):
+    """Ошибка выполнения команды, текст уходит пользователю CLI как есть"""
+
+
+class AccountContext:
+    """Тёплая сессия аккаунта с применёнными куками и клиентами поверх неё"""
+    def __init__(self, row: Dict, session: aiohttp.ClientSession, risk: Optional[PortfolioRisk] = None):
+        self.account = row["account"]
+        self.cookies_expires_at = row.get("cookies_expires_at") or 0
+        self.session = session
+        self.info = ArkhamInfo(session=session, api_key=row.get("api_key"), api_secret=row.get("api_secret"))
+        self.prices = ArkhamPrices(api_key=row.get("api_key"), api_secret=row.get("api_secret"), session=session)
+        self.pipeline = OrderPipeline(session, self.info, self.prices, account=self.account, risk=risk)
+
+
+class CommandRunner:
+    """
+    Неинтерактивные команды поверх базы аккаунтов - без rich/InquirerPy/pydantic.
+
+    Используется и разовым запуском cli.py, и демоном: в демоне сессии
+    аккаунтов (AccountContext) живут между командами, поэтому повторная
+    команда не платит за TCP/TLS-рукопожатие и разбор куков. Если куки
+    аккаунта обновились (фоновый перелогин), они применяются к той же сессии.
+
+    Ордера на открытие проходят риск-лимиты собственного PortfolioRisk:
+    перед первым ордером опрашиваются позиции всех аккаунтов с живыми
+    куками, в демоне (live_risk) опрос продолжается в фоне.
+
+    Args:
+        db_name: путь к базе
+        table_name: таблица аккаунтов
+        risk_limits: проверять риск-лимиты ордеров
+        live_risk: держать позиции флота для лимитов свежими фоновым опросом
+    """
+    COMMANDS = ("accounts", "stats", "positions", "open", "close", "close-all", "refresh")
+
+    def __init__(
+        self,
+        db_name: str = config.DB_NAME,
+        table_name: str = config.TABLE_NAME,
+        risk_limits: bool = config.RISK_LIMITS_COMMANDS,
+        live_risk: bool = False,
+    ):
+        self.db_name = db_name
+        self.table_name = table_name
+        self.risk = PortfolioRisk() if risk_limits else None
+        self.live_risk = live_risk
+        self._risk_poller: Optional[PositionsPoller] = None
+        self.db: Optional[AsyncDatabaseManager] = None
+        self.writer: Optional[AccountWriteBehind] = None
+        self.repository: Optional[AccountRepository] = None
+        self._session_manager = GlobalSessionManager()
+        self._contexts: Dict[str, AccountContext] = {}
+        self._handlers = {
+            "accounts": self.accounts,
+            "stats": self.stats,
+            "positions": self.positions,
+            "open": self.open_position,
+            "close": self.close_position,
+            "close-all": self.close_all,
+            "refresh": self.refresh,
+        }
+
+    # --- Жизненный цикл ---
+    async def start(self):
+        self.db = AsyncDatabaseManager(self.db_name)
+        trade_sql = TradeSQL(self.db)
+        history = AccountHistory(self.db, config.SNAPSHOTS_TABLE_NAME)
+        await trade_sql.create_table(self.table_name)
+        await history.create_table()
+
+        self.writer = AccountWriteBehind(trade_sql, self.table_name, history=history)
+        self.writer.start()
+        self.repository = AccountRepository(trade_sql, self.table_name, writer=self.writer)
+        await self.repository.load()
+
+    async def stop(self):
+        if self._risk_poller:
+            await self._risk_poller.stop()
+        for context in self._contexts.values():
+            if not context.session.closed:
+                await context.session.close()
+        self._contexts.clear()
+        if self.writer:
+            await self.writer.stop()
+        if self.db:
+            await self.db.close()
+
+    async def execute(self, command: str, args: Optional[Dict] = None) -> Dict | List:
+        handler = self._handlers.get(command)
+        if handler is None:
+            raise CommandError(f"Неизвестная команда '{command}' (доступны: {', '.join(self.COMMANDS)})")
+        try:
+            inspect.signature(handler).bind(**(args or {}))
+        except TypeError as e:
+            raise CommandError(f"Неверные аргументы команды '{command}': {e}")
+        return await handler(**(args or {}))
+
+    # --- Сессии ---
+    async def _context(self, account: str) -> AccountContext:
+        row = await self.repository.get_account(account)
+        if not row:
+            raise CommandError(f"Аккаунт '{account}' не найден")
+        if not await self.repository.session_valid(account):
+            raise CommandError(f"Куки аккаунта '{account}' истекли - перелогиньтесь через menu.py")
+
+        context = self._contexts.get(account)
+        if context is None or context.session.closed:
+            session = await self._session_manager.new_session(row.get("proxy"))
+            context = self._contexts[account] = AccountContext(row, session, self.risk)
+            apply_cookies(session, await self.repository.get_cookies(account))
+        elif context.cookies_expires_at != (row.get("cookies_expires_at") or 0):
+            apply_cookies(context.session, await self.repository.get_cookies(account))
+            context.cookies_expires_at = row.get("cookies_expires_at") or 0
+        return context
+
+    async def _risk_positions(self):
+        """Позиции флота в self.risk до ордера: первый вызов опрашивает все аккаунты с живыми куками"""
+        if self.risk is None:
+            return
+        poller = self._risk_poller
+        if poller is None:
+            for name in await self.repository.list_accounts():
+                try:
+                    await self._context(name)
+                except CommandError:
+                    continue
+            store = PositionsStore()
+            store.listeners.append(self.risk.update)
+            poller = self._risk_poller = PositionsPoller(store, {})
+        # Пересозданные сессии и аккаунты, залогиненные после первого опроса
+        added = False
+        for name, context in self._contexts.items():
+            if poller.clients.get(name) is not context.info:
+                poller.clients[name] = context.info
+                added = True
+        if added or not poller.polls:
+            await poller.poll_once()
+        if self.live_risk:
+            poller.start()
+
+    # --- Команды ---
+    async def accounts(self) -> List[Dict]:
+        now = time.time()
+        return [
+            {
+                "account": row["account"],
+                "balance": row.get("balance"),
+                "volume": row.get("volume"),
+                "points": row.get("points"),
+                "session_valid": (row.get("cookies_expires_at") or 0) > now,
+                "has_totp": bool(row.get("totp_secret")),
+            }
+            for row in await self.repository.get_all()
+        ]
+
+    async def stats(self, account: str) -> Dict:
+        """Последние сохранённые баланс/объём/очки аккаунта (без запроса к бирже)"""
+        row = await self.repository.get_account(account)
+        if not row:
+            raise CommandError(f"Аккаунт '{account}' не найден")
+        return {
+            "account": account,
+            **{key: row.get(key) for key in ("balance", "volume", "points", "margin_fee", "margin_bonus")},
+            "session_valid": (row.get("cookies_expires_at") or 0) > time.time(),
+        }
+
+    async def positions(self, account: str) -> Dict:
+        context = await self._context(account)
+        return await context.info.get_all_positions()
+
+    async def open_position(
+        self,
+        account: str,
+        coin: str,
+        side: str,
+        percent: float,
+        leverage: Optional[int] = None,
+    ) -> Dict:
+        if side not in ("long", "short"):
+            raise CommandError("side должен быть long или short")
+        context = await self._context(account)
+        await self._risk_positions()
+        report = await context.pipeline.execute(coin, side, percent, leverage)
+        if report["error"]:
+            raise CommandError(report["error"])
+        return {"account": account, **report}
+
+    async def close_position(self, account: str, coin: str) -> Dict:
+        context = await self._context(account)
+        coin = coin.upper()
+        position = (await context.info.get_all_positions()).get(coin)
+        if not position or not position["base"]:
+            raise CommandError(f"Нет открытой позиции {coin} у '{account}'")
+        size = abs(position["base"])
+        trader = ArkhamTrading(
+            session=context.session, coin=coin, size=size, info_client=context.info, account=account, risk=self.risk
+        )
+        if position["base"] > 0:
+            closed = await trader.futures_close_long_market(position_size=size)
+        else:
+            closed = await trader.futures_close_short_market(position_size=size)
+        return {"account": account, "coin": coin, "size": size, "closed": bool(closed)}
+
+    async def close_all(self, account: str) -> Dict:
+        context = await self._context(account)
+        # Монета и размер не используются - закрываются все позиции из info_client
+        trader = ArkhamTrading(
+            session=context.session, coin="ALL", size=0, info_client=context.info, account=account, risk=self.risk
+        )
+        results = await trader.futures_close_position_market()
+        return {"account": account, "closed": results or {}}
+
+    async def refresh(self, account: Optional[str] = None) -> Dict[str, Dict]:
+        """
+        Обновить баланс/объём/очки одного или всех аккаунтов с живыми куками.
+        Отозванная сессия или неполученная статистика не пишутся в базу.
+        """
+        accounts = [account] if account else await self.repository.list_accounts()
+        semaphore = asyncio.Semaphore(config.CLI_REFRESH_CONCURRENCY)
+
+        async def refresh_one(name: str) -> Dict:
+            async with semaphore:
+                try:
+                    context = await self._context(name)
+                except CommandError as e:
+                    return {"ok": False, "error": str(e)}
+                stats = await fetch_account_stats(context.info)
+                if stats["status"] != STATUS_OK:
+                    return {"ok": False, "error": stats["error"]}
+                row = await self.repository.get_account(name) or {}
+                fee = stats["fee"] if stats["fee"] is not None else row.get("margin_fee")
+                bonus = stats["bonus"] if stats["bonus"] is not None else row.get("margin_bonus")
+                await self.repository.update_account_data(
+                    name, stats["balance"], stats["volume"], stats["points"], fee, bonus
+                )
+                return {"ok": True, "balance": stats["balance"], "volume": stats["volume"], "points": stats["points"]}
+
+        results = await asyncio.gather(*(refresh_one(name) for name in accounts))
+        await self.writer.flush()
+        return dict(zip(accounts, results))
@@ -0,0 +1,162 @@
+import hmac
+import json
+import time
+from typing import Dict, Optional
+
+from aiohttp import web
+from loguru import logger
+
+from src.daemon.auth import resolve_token
+from src.daemon.commands import CommandError, CommandRunner
+
+from data import config
+
+# Ограничение на размер тела запроса - ордер занимает сотню байт
+MAX_BODY_BYTES = 64 * 1024
+
+
+def _dumps(data) -> str:
+    return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class ControlAPI:
+    """
+    HTTP API управления ботом для внешних систем (алерты, Telegram-бот).
+
+    Работает в процессе демона поверх того же CommandRunner, поэтому ордер
+    идёт по тёплой сессии аккаунта с уже прогретыми кэшами цены и плеча.
+    Слушает только localhost, и каждый запрос (кроме /health) должен нести
+    заголовок "Authorization: Bearer <token>". Без токена API не работает:
+    если ARKHAM_CONTROL_API_TOKEN/ARKHAM_DAEMON_TOKEN не заданы, берётся
+    (или генерируется) общий с демоном DAEMON_TOKEN_FILE. Запросы с
+    заголовком Origin (из браузера) отклоняются, POST принимается только с
+    Content-Type: application/json - веб-страница не может отправить ордер.
+
+        GET  /health
+        GET  /accounts
+        GET  /accounts/{account}/stats            ?refresh=1 - сначала обновить с биржи
+        GET  /accounts/{account}/positions
+        POST /accounts/{account}/orders           {"coin", "side", "percent", "leverage"?}
+        POST /accounts/{account}/positions/{coin}/close
+        POST /accounts/{account}/close-all
+
+    Ответ: {"ok": true, "result": ..., "ms": ...} или {"ok": false, "error": "..."};
+    ms и заголовок Server-Timing - время команды внутри процесса, разница с
+    временем ответа у клиента - накладные расходы HTTP (см. bench api.*).
+
+    Args:
+        runner: исполнитель команд с тёплыми сессиями
+        host: адрес (только localhost - торговые команды без TLS)
+        port: порт
+        token: общий секрет (None - из файла токена демона)
+    """
+    def __init__(
+        self,
+        runner: CommandRunner,
+        host: str = config.CONTROL_API_HOST,
+        port: int = config.CONTROL_API_PORT,
+        token: Optional[str] = config.CONTROL_API_TOKEN,
+    ):
+        self.runner = runner
+        self.host = host
+        self.port = port
+        self.token = resolve_token(token, config.DAEMON_TOKEN_FILE, create=True)
+        self.requests_served = 0
+        self._runner: Optional[web.AppRunner] = None
+
+        self.app = web.Application(middlewares=[self._auth], client_max_size=MAX_BODY_BYTES)
+        self.app.router.add_get("/health", self.health)
+        self.app.router.add_get("/accounts", self.accounts)
+        self.app.router.add_get("/accounts/{account}/stats", self.stats)
+        self.app.router.add_get("/accounts/{account}/positions", self.positions)
+        self.app.router.add_post("/accounts/{account}/orders", self.open_order)
+        self.app.router.add_post("/accounts/{account}/positions/{coin}/close", self.close_position)
+        self.app.router.add_post("/accounts/{account}/close-all", self.close_all)
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"HTTP API управления слушает http://{self.host}:{self.port}")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    # --- Авторизация и ответы ---
+    def _authorized(self, request: web.Request) -> bool:
+        header = request.headers.get("Authorization", "")
+        token = header[7:] if header.startswith("Bearer ") else ""
+        return hmac.compare_digest(token, self.token)
+
+    @web.middleware
+    async def _auth(self, request: web.Request, handler):
+        if "Origin" in request.headers:
+            logger.warning(f"HTTP API: запрос {request.method} {request.path} из браузера ({request.headers['Origin']}) отклонён")
+            return self._error("Запросы из браузера не принимаются", 403)
+        if request.method == "POST" and request.content_type != "application/json":
+            return self._error("Нужен Content-Type: application/json", 415)
+        if request.path != "/health" and not self._authorized(request):
+            logger.warning(f"HTTP API: запрос {request.method} {request.path} с неверным токеном отклонён")
+            return self._error("Неверный токен", 401)
+        return await handler(request)
+
+    @staticmethod
+    def _error(message: str, status: int = 400) -> web.Response:
+        return web.json_response({"ok": False, "error": message}, status=status, dumps=_dumps)
+
+    async def _execute(self, command: str, args: Optional[Dict] = None) -> web.Response:
+        started = time.perf_counter()
+        try:
+            result = await self.runner.execute(command, args)
+        except CommandError as e:
+            return self._error(str(e))
+        except Exception as e:
+            logger.error(f"HTTP API: ошибка команды '{command}': {e}")
+            return self._error(f"{type(e).__name__}: {e}", 500)
+        finally:
+            self.requests_served += 1
+        ms = round((time.perf_counter() - started) * 1000, 1)
+        return web.json_response(
+            {"ok": True, "result": result, "ms": ms},
+            headers={"Server-Timing": f"command;dur={ms}"},
+            dumps=_dumps,
+        )
+
+    # --- Эндпоинты ---
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({"ok": True, "result": {"requests_served": self.requests_served}})
+
+    async def accounts(self, request: web.Request) -> web.Response:
+        return await self._execute("accounts")
+
+    async def stats(self, request: web.Request) -> web.Response:
+        account = request.match_info["account"]
+        if request.query.get("refresh") in ("1", "true"):
+            response = await self._execute("refresh", {"account": account})
+            if response.status != 200:
+                return response
+        return await self._execute("stats", {"account": account})
+
+    async def positions(self, request: web.Request) -> web.Response:
+        return await self._execute("positions", {"account": request.match_info["account"]})
+
+    async def open_order(self, request: web.Request) -> web.Response:
+        try:
+            body = await request.json()
+        except ValueError as e:
+            return self._error(f"Неверный JSON: {e}")
+        if not isinstance(body, dict):
+            return self._error("Тело запроса должно быть JSON-объектом")
+        if "account" in body:
+            return self._error("Аккаунт задаётся только в пути запроса")
+        return await self._execute("open", {"account": request.match_info["account"], **body})
+
+    async def close_position(self, request: web.Request) -> web.Response:
+        return await self._execute(
+            "close", {"account": request.match_info["account"], "coin": request.match_info["coin"]}
+        )
+
+    async def close_all(self, request: web.Request) -> web.Response:
+        return await self._execute("close-all", {"account": request.match_info["account"]})
@@ -0,0 +1,143 @@
+import asyncio
+import hmac
+import json
+import time
+from typing import Optional, Set
+
+from loguru import logger
+
+from src.daemon.auth import resolve_token
+from src.daemon.commands import CommandError, CommandRunner
+
+from data import config
+
+# Ограничение на размер одной команды - защита от мусора в порту
+MAX_REQUEST_BYTES = 64 * 1024
+
+
+class CommandDaemon:
+    """
+    Долгоживущий процесс для cli.py: JSON-строки по TCP на localhost.
+
+    Запрос: {"command": "...", "args": {...}, "token": "..."}
+    Ответ:  {"ok": true, "result": ..., "ms": ...} или {"ok": false, "error": "..."}
+
+    Кроме команд CommandRunner понимает служебные ping и shutdown.
+    Без токена демон не работает: если ARKHAM_DAEMON_TOKEN не задан, токен
+    берётся из DAEMON_TOKEN_FILE или генерируется туда (0600) - cli.py
+    читает его из того же файла. Запрос без верного токена или не
+    разобранная строка (например, заголовки HTTP-запроса из браузера)
+    закрывают соединение после ответа об ошибке.
+
+    Args:
+        runner: исполнитель команд с тёплыми сессиями
+        host: адрес (только localhost - торговые команды без TLS)
+        port: порт
+        token: общий секрет (None - из файла токена)
+    """
+    def __init__(
+        self,
+        runner: CommandRunner,
+        host: str = config.DAEMON_HOST,
+        port: int = config.DAEMON_PORT,
+        token: Optional[str] = config.DAEMON_TOKEN,
+    ):
+        self.runner = runner
+        self.host = host
+        self.port = port
+        self.token = resolve_token(token, config.DAEMON_TOKEN_FILE, create=True)
+        self.commands_served = 0
+        self._clients: Set[asyncio.StreamWriter] = set()
+        self._handlers: Set[asyncio.Task] = set()
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._stopped = asyncio.Event()
+        self._stop_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(
+            self._handle, self.host, self.port, limit=MAX_REQUEST_BYTES
+        )
+        logger.info(f"Демон команд слушает {self.host}:{self.port}")
+
+    async def serve_forever(self):
+        await self._stopped.wait()
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            self._server = None
+            # Открытые соединения закрываются, обработчики дожидаются - без CancelledError при выходе
+            for writer in list(self._clients):
+                writer.close()
+            handlers = self._handlers - {asyncio.current_task()}
+            await asyncio.gather(*handlers, return_exceptions=True)
+        self._stopped.set()
+
+    def _authorized(self, request: dict) -> bool:
+        return hmac.compare_digest(str(request.get("token") or ""), self.token)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        self._clients.add(writer)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    await self._reply(writer, {"ok": False, "error": "Слишком длинный запрос"})
+                    return
+                if not line:
+                    return
+                request, error = self._parse(line)
+                if error:
+                    await self._reply(writer, {"ok": False, "error": error})
+                    return
+                response = await self._dispatch(request)
+                await self._reply(writer, response)
+                if response.get("shutdown"):
+                    self._stop_task = asyncio.create_task(self.stop())
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.discard(writer)
+            self._handlers.discard(task)
+            writer.close()
+
+    def _parse(self, line: bytes) -> tuple[Optional[dict], Optional[str]]:
+        """Запрос из строки или текст ошибки - после ошибки соединение закрывается"""
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("запрос не является JSON-объектом")
+        except ValueError as e:
+            return None, f"Неверный запрос: {e}"
+        if not self._authorized(request):
+            logger.warning("Демон: запрос с неверным токеном отклонён")
+            return None, "Неверный токен"
+        return request, None
+
+    async def _dispatch(self, request: dict) -> dict:
+        command = request.get("command")
+        if command == "ping":
+            return {"ok": True, "result": {"commands_served": self.commands_served}}
+        if command == "shutdown":
+            return {"ok": True, "result": "stopping", "shutdown": True}
+
+        started = time.perf_counter()
+        try:
+            result = await self.runner.execute(command, request.get("args"))
+        except CommandError as e:
+            return {"ok": False, "error": str(e)}
+        except Exception as e:
+            logger.error(f"Демон: ошибка команды '{command}': {e}")
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        finally:
+            self.commands_served += 1
+        return {"ok": True, "result": result, "ms": round((time.perf_counter() - started) * 1000, 1)}
+
+    @staticmethod
+    async def _reply(writer: asyncio.StreamWriter, response: dict):
+        writer.write(json.dumps(response, ensure_ascii=False, default=str).encode() + b"\n")
+        await writer.drain()
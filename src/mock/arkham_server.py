@@ -0,0 +1,622 @@
+"""
+Локальный mock-сервер Arkham Exchange для оффлайн нагрузочного тестирования.
+
+Реализует эндпоинты, которые вызывает проект (логин, 2FA, ордера, позиции,
+маржа, балансы, плечо, тикеры, rewards/affiliate-dashboard) и API 2captcha.
+Может работать внутри процесса:
+
+    async with MockArkhamServer(latency=0.02) as server:
+        server.add_account("acc@mock.local", "password", api_key="k", api_secret="s")
+        with server.patch_config():
+            ...  # все клиенты ходят на server.url
+
+или отдельно:
+
+    python -m src.mock.arkham_server --port 8080 --accounts 10
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import itertools
+import random
+import secrets
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from aiohttp import web
+from loguru import logger
+
+from data import config
+from utils.totp import verify_totp
+
+SESSION_COOKIE = "arkham_session"
+# Типы ордеров /api/orders/new; все, кроме market, требуют price
+ORDER_TYPES = ("market", "limitGtc", "limitIoc", "limitFok")
+PENDING_COOKIE = "arkham_pending"
+
+DEFAULT_PRICES = {
+    "BTC": 60000.0,
+    "ETH": 3000.0,
+    "SOL": 150.0,
+    "ARKM": 0.6,
+    "DOGE": 0.12,
+}
+
+
+class MockAccount:
+    """Состояние одного аккаунта на mock-бирже"""
+    def __init__(
+        self,
+        email: str,
+        password: str,
+        api_key: str | None = None,
+        api_secret: str | None = None,
+        balance: float = 10000.0,
+        totp_secret: str | None = None,
+    ):
+        self.email = email
+        self.password = password
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.totp_secret = totp_secret
+        self.balances: Dict[str, float] = {"USDT": float(balance)}
+        self.positions: Dict[str, dict] = {}
+        self.leverage: Dict[str, int] = {}
+        self.orders: Dict[int, dict] = {}
+        self.spot_volume = 0.0
+        self.perp_volume = 0.0
+        self.fee_credit = 50.0
+        self.margin_bonus = 100.0
+
+
+class MockArkhamServer:
+    """
+    Mock Arkham Exchange на aiohttp
+
+    Args:
+        host: адрес для прослушивания
+        port: порт (0 - выбрать свободный)
+        latency: базовая задержка ответа в секундах
+        jitter: случайная добавка к задержке в секундах
+        error_rate: доля запросов, на которые отвечаем 503
+        slippage_bps: проскальзывание market ордеров в б.п.
+        volatility: относительное случайное смещение цены при каждом запросе тикера
+        captcha_solve_time: время "решения" капчи в mock 2captcha
+        session_ttl: время жизни сессионной куки в секундах
+        verify_signatures: проверять подписи API-ключей
+    """
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        slippage_bps: float = 1.0,
+        volatility: float = 0.0,
+        captcha_solve_time: float = 0.5,
+        session_ttl: int = 3600,
+        verify_signatures: bool = True,
+        prices: Dict[str, float] | None = None,
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.path_latency: Dict[str, float] = {}
+        self.path_error_rate: Dict[str, float] = {}
+        self.slippage_bps = slippage_bps
+        self.volatility = volatility
+        self.captcha_solve_time = captcha_solve_time
+        self.session_ttl = session_ttl
+        self.verify_signatures = verify_signatures
+        self.prices: Dict[str, float] = dict(prices or DEFAULT_PRICES)
+
+        self.accounts: Dict[str, MockAccount] = {}
+        self._by_api_key: Dict[str, MockAccount] = {}
+        self._sessions: Dict[str, tuple[str, float]] = {}
+        self._pending: Dict[str, str] = {}
+        self._captcha_tasks: Dict[str, float] = {}
+        self._captcha_tokens: set[str] = set()
+        self._order_ids = itertools.count(1)
+        self.request_count = 0
+
+        self._runner: Optional[web.AppRunner] = None
+        self.app = self._create_app()
+
+    # --- Управление ---
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def add_account(self, email: str, password: str, **kwargs) -> MockAccount:
+        """Зарегистрировать аккаунт на mock-бирже"""
+        account = MockAccount(email, password, **kwargs)
+        self.accounts[email] = account
+        if account.api_key:
+            self._by_api_key[account.api_key] = account
+        return account
+
+    def set_price(self, coin: str, price: float):
+        """Установить цену монеты и сматчить лимитные ордера"""
+        self.prices[coin.upper()] = float(price)
+        self._match_limit_orders(coin.upper())
+
+    def issue_session(self, email: str) -> str:
+        """Выдать сессионную куку без логина (для нагрузочных тестов)"""
+        token = secrets.token_hex(16)
+        self._sessions[token] = (email, time.time() + self.session_ttl)
+        return token
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        logger.info(f"Mock Arkham запущен на {self.url}")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    @contextmanager
+    def patch_config(self):
+        """Временно направить все клиенты проекта на mock-сервер"""
+        names = ("BASE_URL", "PAGE_URL", "CREATE_URL", "RES_URL")
+        original = {name: getattr(config, name) for name in names}
+        config.BASE_URL = self.url
+        config.PAGE_URL = f"{self.url}/uk/login?redirectPath=%2Fuk"
+        config.CREATE_URL = f"{self.url}/in.php"
+        config.RES_URL = f"{self.url}/res.php"
+        try:
+            yield self
+        finally:
+            for name, value in original.items():
+                setattr(config, name, value)
+
+    # --- Инфраструктура ---
+    def _create_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._chaos_middleware])
+        app.router.add_get("/uk/login", self.login_page)
+        app.router.add_post("/api/auth/login", self.auth_login)
+        app.router.add_post("/api/auth/login/challenge", self.auth_challenge)
+        app.router.add_get("/api/account/margin/all", self.margin_all)
+        app.router.add_get("/api/account/positions", self.positions)
+        app.router.add_get("/api/account/balances", self.balances)
+        app.router.add_get("/api/account/leverage", self.get_leverage)
+        app.router.add_post("/api/account/leverage", self.set_leverage)
+        app.router.add_post("/api/orders/new", self.new_order)
+        app.router.add_get("/api/public/ticker", self.ticker)
+        app.router.add_get("/api/rewards/info", self.rewards_info)
+        app.router.add_get("/api/affiliate-dashboard/volume-season-2", self.affiliate_volume)
+        app.router.add_get("/api/affiliate-dashboard/points-season-2", self.affiliate_points)
+        app.router.add_post("/in.php", self.captcha_create)
+        app.router.add_get("/res.php", self.captcha_result)
+        return app
+
+    @web.middleware
+    async def _chaos_middleware(self, request: web.Request, handler):
+        self.request_count += 1
+        delay = self.path_latency.get(request.path, self.latency)
+        if delay or self.jitter:
+            await asyncio.sleep(delay + random.uniform(0, self.jitter))
+        error_rate = self.path_error_rate.get(request.path, self.error_rate)
+        if error_rate and random.random() < error_rate:
+            return web.json_response({"message": "injected error"}, status=503)
+        return await handler(request)
+
+    def _verify_signature(self, request: web.Request, body: str) -> Optional[MockAccount]:
+        """Проверка обеих схем подписи, используемых клиентами проекта"""
+        if "ARK-API-KEY" in request.headers:
+            account = self._by_api_key.get(request.headers["ARK-API-KEY"])
+            if not account or not account.api_secret:
+                return None
+            query = request.query_string
+            payload = f"{request.headers.get('ARK-API-TIMESTAMP', '')}{request.method}{request.path}{'?' + query if query else ''}"
+            expected = hmac.new(account.api_secret.encode("utf-8"), payload.encode("utf-8"), hashlib.sha256).hexdigest()
+            if hmac.compare_digest(expected, request.headers.get("ARK-API-SIGNATURE", "")):
+                return account
+            return None
+
+        if "Arkham-Api-Key" in request.headers:
+            account = self._by_api_key.get(request.headers["Arkham-Api-Key"])
+            if not account or not account.api_secret:
+                return None
+            path = request.path.removeprefix("/api")
+            message = f"{account.api_key}{request.headers.get('Arkham-Expires', '')}{request.method}{path}{body}"
+            try:
+                digest = hmac.new(base64.b64decode(account.api_secret), message.encode("utf-8"), hashlib.sha256).digest()
+            except ValueError:
+                return None
+            if hmac.compare_digest(base64.b64encode(digest).decode("utf-8"), request.headers.get("Arkham-Signature", "")):
+                return account
+        return None
+
+    async def _authenticate(self, request: web.Request) -> Optional[MockAccount]:
+        if self.verify_signatures and ("ARK-API-KEY" in request.headers or "Arkham-Api-Key" in request.headers):
+            body = await request.text() if request.can_read_body else ""
+            return self._verify_signature(request, body)
+
+        token = request.cookies.get(SESSION_COOKIE)
+        entry = self._sessions.get(token) if token else None
+        if not entry:
+            return None
+        email, expires_at = entry
+        if expires_at < time.time():
+            self._sessions.pop(token, None)
+            return None
+        return self.accounts.get(email)
+
+    @staticmethod
+    def _unauthorized() -> web.Response:
+        return web.json_response({"message": "unauthorized"}, status=401)
+
+    @staticmethod
+    def _split_symbol(symbol: str) -> tuple[str, bool]:
+        is_perp = symbol.endswith("_PERP")
+        return symbol.split("_")[0], is_perp
+
+    # --- Авторизация ---
+    async def login_page(self, request: web.Request) -> web.Response:
+        return web.Response(text="<html>mock arkham login</html>", content_type="text/html")
+
+    async def auth_login(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        token = data.get("turnstile")
+        if not token or token not in self._captcha_tokens:
+            return web.json_response({"message": "no turnstile"})
+        self._captcha_tokens.discard(token)
+
+        account = self.accounts.get(data.get("email"))
+        if not account or account.password != data.get("password"):
+            return web.json_response({"message": "Error: invalid credentials"})
+
+        pending = secrets.token_hex(16)
+        self._pending[pending] = account.email
+        response = web.json_response({"challenge": "2fa"})
+        response.set_cookie(PENDING_COOKIE, pending)
+        return response
+
+    def _check_2fa(self, account: MockAccount, code: str) -> bool:
+        if account.totp_secret:
+            return verify_totp(account.totp_secret, code)
+        return code.isdigit() and len(code) == 6
+
+    async def auth_challenge(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        email = self._pending.pop(request.cookies.get(PENDING_COOKIE, ""), None)
+        account = self.accounts.get(email) if email else None
+        if not account or not self._check_2fa(account, str(data.get("code") or "")):
+            return web.json_response({"message": "invalid code"}, status=400)
+
+        response = web.json_response({})
+        response.set_cookie(SESSION_COOKIE, self.issue_session(account.email))
+        response.del_cookie(PENDING_COOKIE)
+        return response
+
+    # --- Аккаунт ---
+    def _position_view(self, symbol: str, position: dict) -> dict:
+        coin, _ = self._split_symbol(symbol)
+        mark = self.prices.get(coin, 0.0)
+        base = position["base"]
+        value = base * mark
+        pnl = (mark - position["entry"]) * base
+        leverage = position.get("leverage") or config.DEFAULT_LEVERAGE
+        return {
+            "symbol": symbol,
+            "base": str(base),
+            "value": str(value),
+            "pnl": str(pnl),
+            "averageEntryPrice": str(position["entry"]),
+            "markPrice": str(mark),
+            "initialMargin": str(abs(value) / leverage if value else 1),
+            "openBuySize": str(max(base, 0)),
+            "openSellSize": str(max(-base, 0)),
+        }
+
+    def _margin_view(self, account: MockAccount) -> dict:
+        spot_value = sum(
+            amount * self.prices.get(asset, 0.0)
+            for asset, amount in account.balances.items() if asset != "USDT"
+        )
+        views = [self._position_view(s, p) for s, p in account.positions.items() if p["base"]]
+        pnl = sum(float(v["pnl"]) for v in views)
+        initial_margin = sum(float(v["initialMargin"]) for v in views)
+        total = account.balances.get("USDT", 0.0) + spot_value + pnl
+        return {
+            "subaccountId": 0,
+            "totalAssetValue": str(round(total, 6)),
+            "available": str(round(total - initial_margin, 6)),
+            "pnl": str(round(pnl, 6)),
+            "initialMargin": str(round(initial_margin, 6)),
+            "bonus": str(account.margin_bonus),
+        }
+
+    async def margin_all(self, request: web.Request) -> web.Response:
+        account = await self._authenticate(request)
+        if not account:
+            return self._unauthorized()
+        return web.json_response([self._margin_view(account)])
+
+    async def balances(self, request: web.Request) -> web.Response:
+        account = await self._authenticate(request)
+        if not account:
+            return self._unauthorized()
+        items = []
+        for asset, amount in account.balances.items():
+            price = 1.0 if asset == "USDT" else self.prices.get(asset, 0.0)
+            items.append({
+                "subaccountId": 0,
+                "symbol": asset,
+                "balance": str(amount),
+                "free": str(amount),
+                "priceUSDT": str(price),
+                "balanceUSDT": str(amount * price),
+                "freeUSDT": str(amount * price),
+            })
+        return web.json_response(items)
+
+    async def positions(self, request: web.Request) -> web.Response:
+        account = await self._authenticate(request)
+        if not account:
+            return self._unauthorized()
+        return web.json_response([
+            self._position_view(symbol, position)
+            for symbol, position in account.positions.items()
+        ])
+
+    async def get_leverage(self, request: web.Request) -> web.Response:
+        account = await self._authenticate(request)
+        if not account:
+            return self._unauthorized()
+        return web.json_response([
+            {"symbol": f"{coin}_USDT_PERP", "leverage": str(account.leverage.get(coin, config.DEFAULT_LEVERAGE))}
+            for coin in self.prices
+        ])
+
+    async def set_leverage(self, request: web.Request) -> web.Response:
+        account = await self._authenticate(request)
+        if not account:
+            return self._unauthorized()
+        data = await request.json()
+        coin, _ = self._split_symbol(data.get("symbol", ""))
+        if coin not in self.prices:
+            return web.json_response({"message": "unknown symbol"}, status=400)
+        account.leverage[coin] = int(data.get("leverage"))
+        return web.Response(status=204)
+
+    async def rewards_info(self, request: web.Request) -> web.Response:
+        account = await self._authenticate(request)
+        if not account:
+            return self._unauthorized()
+        return web.json_response({"marginBonus": str(account.margin_bonus), "feeCredit": str(account.fee_credit)})
+
+    async def affiliate_volume(self, request: web.Request) -> web.Response:
+        account = await self._authenticate(request)
+        if not account:
+            return self._unauthorized()
+        return web.json_response({"spotVolume": str(account.spot_volume), "perpVolume": str(account.perp_volume)})
+
+    async def affiliate_points(self, request: web.Request) -> web.Response:
+        account = await self._authenticate(request)
+        if not account:
+            return self._unauthorized()
+        points = account.spot_volume / 500 + account.perp_volume / 1000
+        return web.json_response({"points": str(round(points))})
+
+    # --- Торговля ---
+    def _fill(self, account: MockAccount, coin: str, is_perp: bool, side: str, size: float, price: float):
+        notional = size * price
+        signed = size if side == "buy" else -size
+
+        if is_perp:
+            symbol = f"{coin}_USDT_PERP"
+            position = account.positions.setdefault(symbol, {"base": 0.0, "entry": price})
+            old_base = position["base"]
+            new_base = old_base + signed
+            if old_base == 0 or (old_base > 0) == (signed > 0):
+                position["entry"] = (old_base * position["entry"] + signed * price) / new_base
+            else:
+                closed = min(abs(old_base), abs(signed))
+                realized = (price - position["entry"]) * closed * (1 if old_base > 0 else -1)
+                account.balances["USDT"] += realized
+                if abs(signed) > abs(old_base):
+                    position["entry"] = price
+            position["base"] = round(new_base, 10)
+            position["leverage"] = account.leverage.get(coin, config.DEFAULT_LEVERAGE)
+            account.balances["USDT"] -= notional * config.FUTURES_FEE
+            account.perp_volume += notional
+        else:
+            account.balances["USDT"] -= signed * price + notional * config.SPOT_FEE
+            account.balances[coin] = account.balances.get(coin, 0.0) + signed
+            account.spot_volume += notional
+
+    def _match_limit_orders(self, coin: str):
+        price = self.prices[coin]
+        for account in self.accounts.values():
+            for order_id, order in list(account.orders.items()):
+                if order["coin"] != coin:
+                    continue
+                crossed = price <= order["price"] if order["side"] == "buy" else price >= order["price"]
+                if crossed:
+                    self._fill(account, coin, order["is_perp"], order["side"], order["size"], order["price"])
+                    del account.orders[order_id]
+
+    async def new_order(self, request: web.Request) -> web.Response:
+        account = await self._authenticate(request)
+        if not account:
+            return self._unauthorized()
+
+        try:
+            data = await request.json()
+        except ValueError:
+            return web.json_response({"message": "invalid json"}, status=400)
+        if not isinstance(data, dict):
+            return web.json_response({"message": "invalid order"}, status=400)
+        missing = [field for field in ("symbol", "side", "type", "size") if data.get(field) in (None, "")]
+        if missing:
+            return web.json_response({"message": f"missing required fields: {', '.join(missing)}"}, status=400)
+
+        coin, is_perp = self._split_symbol(data["symbol"])
+        if coin not in self.prices:
+            return web.json_response({"message": f"unknown symbol {data['symbol']}"}, status=400)
+
+        side, order_type = data["side"], data["type"]
+        if order_type not in ORDER_TYPES:
+            return web.json_response({"message": f"invalid order type {order_type}"}, status=400)
+        try:
+            size = float(data["size"])
+        except (TypeError, ValueError):
+            return web.json_response({"message": "invalid size"}, status=400)
+        if side not in ("buy", "sell") or size <= 0:
+            return web.json_response({"message": "invalid order"}, status=400)
+
+        price = None
+        if order_type != "market":
+            if data.get("price") in (None, ""):
+                return web.json_response({"message": "price is required for limit orders"}, status=400)
+            try:
+                price = float(data["price"])
+            except (TypeError, ValueError):
+                price = 0.0
+            if price <= 0:
+                return web.json_response({"message": "invalid price"}, status=400)
+
+        if data.get("reduceOnly"):
+            position = account.positions.get(f"{coin}_USDT_PERP", {"base": 0.0})
+            reducible = position["base"] if side == "sell" else -position["base"]
+            if reducible <= 0:
+                return web.json_response({"message": "reduce only order would increase position"}, status=400)
+            size = min(size, reducible)
+
+        if not is_perp and side == "sell" and size > account.balances.get(coin, 0.0) + 1e-12:
+            return web.json_response({"message": "insufficient balance"}, status=400)
+
+        order_id = next(self._order_ids)
+        if order_type == "market":
+            slip = self.prices[coin] * self.slippage_bps / 10000
+            fill_price = self.prices[coin] + (slip if side == "buy" else -slip)
+            self._fill(account, coin, is_perp, side, size, fill_price)
+        else:
+            account.orders[order_id] = {
+                "coin": coin,
+                "is_perp": is_perp,
+                "side": side,
+                "size": size,
+                "price": price,
+            }
+            self._match_limit_orders(coin)
+
+        return web.json_response({
+            "orderId": order_id,
+            "clientOrderId": data.get("clientOrderId"),
+            "symbol": data.get("symbol"),
+            "side": side,
+            "size": str(size),
+        })
+
+    # --- Публичные данные ---
+    async def ticker(self, request: web.Request) -> web.Response:
+        symbol = request.query.get("symbol", "")
+        coin, is_perp = self._split_symbol(symbol)
+        if coin not in self.prices:
+            return web.json_response({"message": f"unknown symbol {symbol}"}, status=404)
+
+        if self.volatility:
+            self.set_price(coin, self.prices[coin] * (1 + random.gauss(0, self.volatility)))
+        price = self.prices[coin]
+
+        ticker = {
+            "symbol": symbol,
+            "productType": "perpetual" if is_perp else "spot",
+            "price": str(price),
+            "high24h": str(price * 1.02),
+            "low24h": str(price * 0.98),
+            "volume24h": "1000000",
+            "price24hAgo": str(price * 0.99),
+        }
+        if is_perp:
+            ticker.update({
+                "markPrice": str(price),
+                "indexPrice": str(price),
+                "fundingRate": "0.0001",
+                "nextFundingRate": "0.0001",
+                "nextFundingTime": int((time.time() + 3600) * 1_000_000),
+                "openInterest": "1000",
+                "openInterestUSD": str(price * 1000),
+            })
+        return web.json_response(ticker)
+
+    # --- 2captcha ---
+    async def captcha_create(self, request: web.Request) -> web.Response:
+        task_id = secrets.token_hex(8)
+        self._captcha_tasks[task_id] = time.time() + self.captcha_solve_time
+        return web.json_response({"status": 1, "request": task_id})
+
+    async def captcha_result(self, request: web.Request) -> web.Response:
+        task_id = request.query.get("id", "")
+        ready_at = self._captcha_tasks.get(task_id)
+        if ready_at is None:
+            return web.json_response({"status": 0, "request": "ERROR_WRONG_CAPTCHA_ID"})
+        if ready_at > time.time():
+            return web.json_response({"status": 0, "request": "CAPCHA_NOT_READY"})
+        del self._captcha_tasks[task_id]
+        token = f"mock-turnstile-{secrets.token_hex(16)}"
+        self._captcha_tokens.add(token)
+        return web.json_response({"status": 1, "request": token})
+
+
+async def _serve(args):
+    server = MockArkhamServer(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        volatility=args.volatility,
+        captcha_solve_time=args.captcha_solve_time,
+    )
+    for i in range(1, args.accounts + 1):
+        server.add_account(
+            f"acc{i}@mock.local",
+            "password",
+            api_key=f"mock-key-{i}",
+            api_secret=base64.b64encode(f"mock-secret-{i}".encode()).decode(),
+        )
+    async with server:
+        logger.info(f"Аккаунтов: {args.accounts} (accN@mock.local / password). Ctrl+C для остановки")
+        await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Arkham Exchange")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--volatility", type=float, default=0.0)
+    parser.add_argument("--captcha-solve-time", type=float, default=0.5)
+    parser.add_argument("--accounts", type=int, default=5)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
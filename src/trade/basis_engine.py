@@ -0,0 +1,281 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+from loguru import logger
+
+from src.account.info import ArkhamInfo
+from src.trade.hedge_executor import HedgeExecutor, STATUS_HEDGED, STATUS_REJECTED, split_size
+from utils.get_prices import ArkhamPrices
+
+from data import config
+
+# Направление базисной сделки
+CARRY = "carry"  # спот лонг + перп шорт: получает положительный фандинг
+REVERSE = "reverse"  # продажа имеющейся монеты на споте + перп лонг
+
+
+def basis_quote(spot: Dict, perp: Dict) -> Dict:
+    """Базис и фандинг по тикерам спота и перпа (ArkhamPrices.get_*_price)"""
+    basis = perp["price"] - spot["price"]
+    return {
+        "coin": perp["coin"],
+        "spot": spot["price"],
+        "perp": perp["price"],
+        "mark": perp["mark_price"],
+        "index": perp["index_price"],
+        "basis": basis,
+        "basis_bps": basis / spot["price"] * 10_000 if spot["price"] else 0.0,
+        "funding_rate": perp["funding_rate"],
+        "next_funding_rate": perp["next_funding_rate"],
+        "next_funding_time": perp["next_funding_time"],
+        "funding_apr": perp["funding_rate"] * config.FUNDING_PERIODS_PER_DAY * 365 * 100,
+    }
+
+
+class BasisEngine:
+    """
+    Базисная сделка спот/перп в одном аккаунте как одна операция.
+
+    enter() открывает спот и перп в противоположные стороны на одинаковый
+    размер: размер округляется вниз до BASIS_SIZE_STEP - самого крупного из
+    шагов двух инструментов (reduceOnly перпа), поэтому обе ноги
+    исполняются ровно на один размер. Ноги отправляются одновременно через
+    HedgeExecutor: неудавшаяся нога сверяется с балансом/позицией и
+    повторяется, иначе исполненная нога откатывается. exit() закрывает
+    обе ноги так же, размер - меньший из спот-баланса и позиции перпа.
+
+    Открытые через движок сделки отслеживаются в trades: базис входа,
+    размер и оценка фандинга (ставка x notional за прошедшие периоды,
+    накапливается при каждом track()).
+
+    Args:
+        info: ArkhamInfo аккаунта
+        account: имя аккаунта для логов и отчёта
+        step: общий шаг размера ног
+        retries: повторы неудавшейся ноги
+    """
+    def __init__(
+        self,
+        info: ArkhamInfo,
+        account: str = "account",
+        step: float = config.BASIS_SIZE_STEP,
+        retries: int = config.HEDGE_RETRIES,
+    ):
+        self.info = info
+        self.account = account
+        self.step = step
+        self.prices = ArkhamPrices(session=info.session)
+        self.executor = HedgeExecutor({account: info}, retries=retries)
+        self.trades: Dict[str, Dict] = {}
+
+    async def quote(self, coin: str) -> Dict:
+        coin = coin.upper()
+        spot, perp = await asyncio.gather(self.prices.get_spot_price(coin), self.prices.get_futures_price(coin))
+        return basis_quote(spot, perp)
+
+    def _report(self, coin: str, direction: Optional[str]) -> Dict:
+        return {
+            "status": STATUS_REJECTED, "coin": coin, "direction": direction, "size": 0.0, "quote": None,
+            "skew_ms": None, "legs": {}, "unwind": [], "basis_pnl": None, "seconds": 0.0, "error": None,
+        }
+
+    async def _run(self, report: Dict, spot_leg: Dict, perp_leg: Dict) -> Dict:
+        report["legs"] = {"spot": spot_leg, "perp": perp_leg}
+        result = await self.executor.execute([spot_leg, perp_leg], report["coin"])
+        report.update(
+            status=result["status"], skew_ms=result["skew_ms"], unwind=result["unwind"], error=result["error"]
+        )
+        return report
+
+    # --- Вход и выход ---
+    async def enter(self, coin: str, notional: float, direction: str = CARRY, leverage: Optional[int] = None) -> Dict:
+        """
+        Открыть базис на notional $ (по цене спота).
+
+        Returns:
+            dict: status, coin, direction, size, quote, skew_ms, legs {"spot", "perp"}, unwind, seconds, error
+        """
+        if direction not in (CARRY, REVERSE):
+            raise ValueError(f"direction должен быть '{CARRY}' или '{REVERSE}'")
+        started = time.perf_counter()
+        coin = coin.upper()
+        report = self._report(coin, direction)
+
+        quote, warm, balances = await asyncio.gather(
+            self.quote(coin),
+            self.executor.warm([self.account], coin, leverage),
+            self.info.get_balances(force=True),
+            return_exceptions=True,
+        )
+        size = 0.0
+        if isinstance(quote, Exception):
+            report["error"] = f"не удалось получить котировки {coin}: {quote}"
+        elif isinstance(warm, Exception):
+            report["error"] = f"не удалось подготовить аккаунт: {warm}"
+        elif isinstance(balances, Exception) or balances is None:
+            report["error"] = "не удалось получить балансы"
+        elif not quote["spot"] or not quote["perp"]:
+            report["error"] = f"нет цены {coin} на споте или перпе"
+        else:
+            warm = warm[self.account]
+            size = split_size(notional / quote["spot"], 1, self.step)[0]
+            report.update(quote=quote, size=size)
+        if report["error"]:
+            report["seconds"] = round(time.perf_counter() - started, 3)
+            return self._log("Вход", report)
+
+        if warm["error"]:
+            report["error"] = warm["error"]
+        elif size <= 0:
+            report["error"] = f"размер меньше шага {self.step}"
+        elif warm["available"] * warm["leverage"] < size * quote["perp"]:
+            report["error"] = f"не хватает маржи на перп {size * quote['perp']:.2f}$"
+        elif direction == CARRY and balances.get("USDT", {}).get("free", 0.0) < size * quote["spot"] * (1 + config.SPOT_FEE):
+            report["error"] = f"не хватает USDT на спот {size * quote['spot']:.2f}$"
+        elif direction == REVERSE and balances.get(coin, {}).get("free", 0.0) < size:
+            report["error"] = f"не хватает {coin} на споте для продажи {size}"
+        if report["error"]:
+            report["seconds"] = round(time.perf_counter() - started, 3)
+            return self._log("Вход", report)
+
+        spot_side, perp_side = ("long", "short") if direction == CARRY else ("short", "long")
+        coin_balance = balances.get(coin, {}).get("balance", 0.0)
+        await self._run(
+            report,
+            self.executor.new_leg(self.account, spot_side, size, coin_balance, spot=True),
+            self.executor.new_leg(self.account, perp_side, size, warm["base"]),
+        )
+        if report["status"] == STATUS_HEDGED:
+            self._track_entry(coin, direction, size, quote)
+        report["seconds"] = round(time.perf_counter() - started, 3)
+        return self._log("Вход", report)
+
+    async def exit(self, coin: str, size: Optional[float] = None) -> Dict:
+        """
+        Закрыть базис по coin (size - частично). Направление берётся из
+        trades, для сделки, открытой не через движок, - по знаку позиции перпа.
+
+        Returns:
+            dict: как у enter() + basis_pnl - результат изменения базиса для отслеживаемой сделки
+        """
+        started = time.perf_counter()
+        coin = coin.upper()
+        quote, positions, balances = await asyncio.gather(
+            self.quote(coin), self.info.get_all_positions(strict=True), self.info.get_balances(force=True),
+            return_exceptions=True,
+        )
+        trade = self.trades.get(coin)
+        if isinstance(positions, Exception):
+            report = self._report(coin, trade["direction"] if trade else None)
+            report["error"] = f"не удалось получить позиции: {positions}"
+            report["seconds"] = round(time.perf_counter() - started, 3)
+            return self._log("Выход", report)
+        position = positions.get(coin)
+        base = position["base"] if position else 0.0
+        direction = trade["direction"] if trade else (CARRY if base < 0 else REVERSE)
+        report = self._report(coin, direction)
+
+        if isinstance(quote, Exception):
+            report["error"] = f"не удалось получить котировки {coin}: {quote}"
+        elif isinstance(balances, Exception) or balances is None:
+            report["error"] = "не удалось получить балансы"
+        elif direction == CARRY and base >= 0 or direction == REVERSE and base <= 0:
+            report["error"] = f"нет позиции перпа {coin} для закрытия"
+        if report["error"]:
+            report["seconds"] = round(time.perf_counter() - started, 3)
+            return self._log("Выход", report)
+        report["quote"] = quote
+
+        coin_balance = balances.get(coin, {}).get("balance", 0.0)
+        available = abs(base)
+        if direction == CARRY:
+            available = min(available, balances.get(coin, {}).get("free", 0.0))
+        closing = split_size(min(available, size) if size else available, 1, self.step)[0]
+        report["size"] = closing
+        if closing <= 0:
+            report["error"] = f"размер меньше шага {self.step}"
+            report["seconds"] = round(time.perf_counter() - started, 3)
+            return self._log("Выход", report)
+
+        spot_side, perp_side = ("short", "long") if direction == CARRY else ("long", "short")
+        await self._run(
+            report,
+            self.executor.new_leg(self.account, spot_side, closing, coin_balance, spot=True),
+            self.executor.new_leg(self.account, perp_side, closing, base, reduce_only=True),
+        )
+        if report["status"] == STATUS_HEDGED:
+            report["basis_pnl"] = self._track_exit(coin, closing, quote)
+        report["seconds"] = round(time.perf_counter() - started, 3)
+        return self._log("Выход", report)
+
+    # --- Отслеживание ---
+    def _track_entry(self, coin: str, direction: str, size: float, quote: Dict):
+        trade = self.trades.get(coin)
+        if trade and trade["direction"] == direction:
+            self._accrue(trade, quote)
+            total = trade["size"] + size
+            trade["entry_basis"] = (trade["entry_basis"] * trade["size"] + quote["basis"] * size) / total
+            trade["size"] = total
+            return
+        self.trades[coin] = {
+            "direction": direction, "size": size, "entry_basis": quote["basis"],
+            "entry_basis_bps": quote["basis_bps"], "opened_at": time.time(),
+            "funding": 0.0, "funding_at": time.monotonic(),
+        }
+
+    def _basis_pnl(self, trade: Dict, size: float, basis: float) -> float:
+        # carry (спот лонг, перп шорт) зарабатывает на сужении базиса, reverse - на расширении
+        change = trade["entry_basis"] - basis
+        return size * (change if trade["direction"] == CARRY else -change)
+
+    def _track_exit(self, coin: str, size: float, quote: Dict) -> Optional[float]:
+        trade = self.trades.get(coin)
+        if not trade:
+            return None
+        self._accrue(trade, quote)
+        pnl = self._basis_pnl(trade, min(size, trade["size"]), quote["basis"])
+        trade["size"] = round(trade["size"] - size, 10)
+        if trade["size"] <= self.step / 2:
+            del self.trades[coin]
+        return pnl
+
+    @staticmethod
+    def _accrue(trade: Dict, quote: Dict):
+        """Оценка фандинга с прошлого замера: шорт перпа получает положительную ставку"""
+        now = time.monotonic()
+        periods = (now - trade["funding_at"]) / (86_400 / config.FUNDING_PERIODS_PER_DAY)
+        sign = 1 if trade["direction"] == CARRY else -1
+        trade["funding"] += sign * quote["funding_rate"] * trade["size"] * quote["mark"] * periods
+        trade["funding_at"] = now
+
+    async def track(self, coin: str) -> Optional[Dict]:
+        """
+        Текущее состояние отслеживаемой сделки (None - не отслеживается).
+
+        Returns:
+            dict: direction, size, entry_basis, basis, basis_bps, basis_pnl, funding, funding_apr, quote
+        """
+        coin = coin.upper()
+        if coin not in self.trades:
+            return None
+        quote = await self.quote(coin)
+        trade = self.trades.get(coin)
+        if trade is None:
+            return None
+        self._accrue(trade, quote)
+        return {
+            "direction": trade["direction"], "size": trade["size"], "entry_basis": trade["entry_basis"],
+            "basis": quote["basis"], "basis_bps": quote["basis_bps"],
+            "basis_pnl": self._basis_pnl(trade, trade["size"], quote["basis"]),
+            "funding": trade["funding"], "funding_apr": quote["funding_apr"], "quote": quote,
+        }
+
+    def _log(self, action: str, report: Dict) -> Dict:
+        log = logger.bind(account=self.account, symbol=report["coin"], skew_ms=report["skew_ms"], status=report["status"])
+        message = f"Базис {report['coin']} ({report['direction']}): {action.lower()} {report['size']:g} - {report['status']}"
+        if report["status"] == STATUS_HEDGED:
+            log.success(message)
+        else:
+            log.error(message + (f" ({report['error']})" if report["error"] else ""))
+        return report
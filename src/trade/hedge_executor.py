@@ -0,0 +1,354 @@
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from src.account.info import ArkhamInfo
+from src.trade.trading_client import ArkhamTrading
+from utils.get_prices import ArkhamPrices
+from utils.leverage import ArkhamLeverage
+
+from data import config
+
+# Итог хеджа
+STATUS_HEDGED = "hedged"
+STATUS_CLOSED = "closed"
+STATUS_UNWOUND = "unwound"
+STATUS_EXPOSED = "exposed"
+STATUS_REJECTED = "rejected"
+
+
+def split_size(total: float, count: int, step: float = config.HEDGE_SIZE_STEP) -> List[float]:
+    """Разбить total на count ног кратно step так, чтобы сумма ног была одинаковой у обеих сторон"""
+    units = int(total / step + 1e-9)
+    base, rest = divmod(units, count)
+    return [round((base + (1 if i < rest else 0)) * step, 8) for i in range(count)]
+
+
+class HedgeExecutor:
+    """
+    Дельта-нейтральный хедж между аккаунтами: лонг на одних, шорт на
+    других на одинаковый размер монеты.
+
+    Перед ордерами все аккаунты прогреваются параллельно: маржа, текущие
+    позиции (база для проверки исполнения) и плечо - эти же запросы
+    открывают соединения, так что ордера идут по тёплым keep-alive
+    соединениям без TLS-рукопожатия. Данные ордеров всех ног (включая
+    clientOrderId) собираются заранее, затем ноги отправляются одним
+    gather - в одной итерации event loop. skew_ms - разброс моментов
+    подтверждения ног биржей (bench flow.hedge_*).
+
+    Неудачная нога сначала сверяется с позицией (ответ мог потеряться при
+    исполненном ордере), затем повторяется до retries раз. Если нога так
+    и не исполнилась, исполненные ноги откатываются reduceOnly-ордерами
+    того же размера. Нога, исполнение которой не удалось проверить, не
+    повторяется (риск двойного ордера) - итог exposed, нужна ручная проверка.
+
+    Args:
+        clients: account -> ArkhamInfo с рабочей сессией аккаунта
+        retries: повторы неудавшейся ноги
+        retry_delay: пауза перед повтором, с
+        max_skew_ms: разброс подтверждений, выше которого пишется предупреждение
+    """
+    def __init__(
+        self,
+        clients: Dict[str, ArkhamInfo],
+        retries: int = config.HEDGE_RETRIES,
+        retry_delay: float = config.HEDGE_RETRY_DELAY,
+        max_skew_ms: float = config.HEDGE_MAX_SKEW_MS,
+    ):
+        self.clients = clients
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.max_skew_ms = max_skew_ms
+        self.step = config.HEDGE_SIZE_STEP
+
+    # --- Прогрев ---
+    async def _warm_one(self, name: str, coin: str, leverage: Optional[int]) -> Dict:
+        info = self.clients[name]
+        leverage_client = ArkhamLeverage(info.session)
+        margin, positions, leverages = await asyncio.gather(
+            info.get_margin(), info.get_all_positions(strict=True), leverage_client.get_leverages(), return_exceptions=True
+        )
+        if isinstance(margin, Exception) or margin is None:
+            return {"error": "не удалось получить маржу"}
+        if isinstance(positions, Exception):
+            return {"error": f"не удалось получить позиции: {positions}"}
+        current = None if isinstance(leverages, Exception) else leverages.get(f"{coin}_USDT_PERP")
+        target = int(leverage or current or config.DEFAULT_LEVERAGE)
+        if current is None or int(current) != target:
+            if not await leverage_client.set_leverage(coin, target, verify=False):
+                return {"error": f"не удалось установить плечо {target}x"}
+        position = positions.get(coin)
+        return {
+            "available": margin["available"], "leverage": target,
+            "base": position["base"] if position else 0.0, "error": None,
+        }
+
+    async def warm(self, accounts: List[str], coin: str, leverage: Optional[int] = None) -> Dict[str, Dict]:
+        """
+        Прогреть аккаунты перед хеджем.
+
+        Returns:
+            dict: account -> {"available", "leverage", "base", "error"}
+        """
+        results = await asyncio.gather(
+            *(self._warm_one(name, coin, leverage) for name in accounts), return_exceptions=True
+        )
+        return {
+            name: {"error": str(result) or type(result).__name__} if isinstance(result, Exception) else result
+            for name, result in zip(accounts, results)
+        }
+
+    # --- Ноги ---
+    @staticmethod
+    def new_leg(
+        account: str, side: str, size: float, baseline: float, reduce_only: bool = False, spot: bool = False,
+    ) -> Dict:
+        """
+        Нога хеджа: рыночный ордер side ("long" - покупка, "short" - продажа)
+        на size. baseline - позиция (для спота - баланс монеты) до ордера.
+        """
+        order_side = "buy" if side == "long" else "sell"
+        delta = size if order_side == "buy" else -size
+        return {
+            "account": account, "side": side, "order_side": order_side, "size": size, "spot": spot,
+            "reduce_only": reduce_only and not spot, "baseline": baseline, "expected": baseline + delta,
+            "filled": False, "verified": True, "attempts": 0, "ack_ms": None, "latency_ms": None,
+            "client_order_id": None, "error": None,
+        }
+
+    def _prepare(self, leg: Dict, coin: str) -> tuple:
+        info = self.clients[leg["account"]]
+        trader = ArkhamTrading(session=info.session, coin=coin, size=leg["size"], info_client=info, account=leg["account"])
+        if leg["spot"]:
+            return trader, trader.spot_market_order(leg["order_side"], size=leg["size"])
+        return trader, trader.futures_market_order(leg["order_side"], reduce_only=leg["reduce_only"], size=leg["size"])
+
+    async def _send_prepared(self, leg: Dict, trader: ArkhamTrading, order: Dict, coin: str, started: float):
+        leg["attempts"] += 1
+        action = (
+            f"Хедж: {'закрытие ' if leg['reduce_only'] else ''}{'спот ' if leg['spot'] else ''}"
+            f"{leg['order_side'].upper()} {coin} "
+            f"на {leg['size']:g} ({leg['account']})"
+        )
+        leg["filled"] = bool(await trader.send_order(order, action))
+        leg["ack_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        leg["latency_ms"] = round((trader.last_order_latency or 0) * 1000, 1)
+        leg["client_order_id"] = order["clientOrderId"]
+
+    async def _fire(self, legs: List[Dict], coin: str) -> Optional[float]:
+        """Отправить ноги одновременно; разброс подтверждений исполненных ног, мс"""
+        prepared = [(leg, *self._prepare(leg, coin)) for leg in legs]
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(self._send_prepared(leg, trader, order, coin, started) for leg, trader, order in prepared)
+        )
+        acks = [leg["ack_ms"] for leg in legs if leg["filled"]]
+        return round(max(acks) - min(acks), 2) if len(acks) > 1 else None
+
+    async def _confirmed(self, leg: Dict, coin: str) -> Optional[bool]:
+        """
+        Ордер ноги уже исполнен? Позиция (баланс монеты для спота) сдвинулась
+        от baseline в сторону ордера хотя бы на половину размера - запас на
+        комиссию в монете и округление. None - не удалось проверить.
+        """
+        info = self.clients[leg["account"]]
+        try:
+            if leg["spot"]:
+                balances = await info.get_balances(force=True)
+                if balances is None:
+                    raise RuntimeError("балансы недоступны")
+                base = balances.get(coin, {}).get("balance", 0.0)
+            else:
+                # strict: неудачный запрос - "не проверено", а не "позиции нет" (иначе нога уйдёт повторно)
+                position = (await info.get_all_positions(strict=True)).get(coin)
+                base = position["base"] if position else 0.0
+        except Exception as e:
+            logger.warning(f"Хедж: не удалось проверить исполнение '{leg['account']}': {e}")
+            return None
+        progress = (base - leg["baseline"]) * (1 if leg["order_side"] == "buy" else -1)
+        return progress >= leg["size"] / 2
+
+    async def _settle(self, leg: Dict, coin: str):
+        """Добить неудавшуюся ногу: сверка с позицией, затем повторы"""
+        while not leg["filled"]:
+            confirmed = await self._confirmed(leg, coin)
+            if confirmed is None:
+                leg.update(verified=False, error="исполнение не подтверждено")
+                return
+            if confirmed:
+                leg["filled"] = True
+                return
+            if leg["attempts"] > self.retries:
+                leg["error"] = f"не исполнен за {leg['attempts']} попыток"
+                return
+            await asyncio.sleep(self.retry_delay)
+            await self._send_prepared(leg, *self._prepare(leg, coin), coin, time.perf_counter())
+
+    async def _execute(self, legs: List[Dict], coin: str) -> Optional[float]:
+        skew = await self._fire(legs, coin)
+        await asyncio.gather(*(self._settle(leg, coin) for leg in legs if not leg["filled"]))
+        return skew
+
+    async def execute(self, legs: List[Dict], coin: str) -> Dict:
+        """
+        Исполнить ноги из new_leg как одну операцию: одновременная отправка,
+        добивание неудавшихся ног, при неудаче - откат исполненных.
+
+        Returns:
+            dict: status (hedged/unwound/exposed), skew_ms, unwind [ноги отката], error
+        """
+        result = {"status": STATUS_HEDGED, "skew_ms": await self._execute(legs, coin), "unwind": [], "error": None}
+        if all(leg["filled"] for leg in legs):
+            return result
+
+        failed = ", ".join(
+            f"{leg['account']}{' (спот)' if leg['spot'] else ''}" for leg in legs if not leg["filled"]
+        )
+        result["error"] = f"не исполнены ноги: {failed}"
+        unwind = [
+            self.new_leg(
+                leg["account"], "short" if leg["side"] == "long" else "long", leg["size"], leg["expected"],
+                reduce_only=True, spot=leg["spot"],
+            )
+            for leg in legs if leg["filled"]
+        ]
+        if unwind:
+            logger.warning(f"Хедж {coin}: {result['error']} - откат {len(unwind)} исполненных ног")
+            await self._execute(unwind, coin)
+        clean = all(leg["filled"] for leg in unwind) and all(leg["verified"] for leg in legs)
+        result.update(status=STATUS_UNWOUND if clean else STATUS_EXPOSED, unwind=unwind)
+        return result
+
+    # --- Открытие и закрытие ---
+    async def open(
+        self,
+        coin: str,
+        notional: float,
+        longs: List[str],
+        shorts: List[str],
+        leverage: Optional[int] = None,
+    ) -> Dict:
+        """
+        Открыть хедж на notional $ с каждой стороны: лонг делится поровну
+        между longs, шорт - между shorts, суммарный размер сторон одинаковый.
+
+        Returns:
+            dict: status, coin, price, notional, size, net_base, skew_ms, legs {account: нога},
+                  unwind {account: нога}, seconds, error
+        """
+        started = time.perf_counter()
+        coin = coin.upper()
+        report = {
+            "status": STATUS_REJECTED, "coin": coin, "price": None, "notional": notional, "size": 0.0,
+            "net_base": 0.0, "skew_ms": None, "legs": {}, "unwind": {}, "seconds": 0.0, "error": None,
+        }
+
+        def finish() -> Dict:
+            report["seconds"] = round(time.perf_counter() - started, 3)
+            return report
+
+        if not longs or not shorts:
+            report["error"] = "нужен хотя бы один аккаунт с каждой стороны"
+            return finish()
+        if set(longs) & set(shorts):
+            report["error"] = "аккаунт не может быть в обеих сторонах хеджа"
+            return finish()
+        missing = [name for name in (*longs, *shorts) if name not in self.clients]
+        if missing:
+            report["error"] = f"нет сессии: {', '.join(missing)}"
+            return finish()
+
+        accounts = [*longs, *shorts]
+        ticker, warm = await asyncio.gather(
+            ArkhamPrices(session=self.clients[longs[0]].session).get_futures_price(coin),
+            self.warm(accounts, coin, leverage),
+        )
+        price = float(ticker["price"])
+        size = split_size(notional / price, 1, self.step)[0]
+        report.update(price=price, size=size)
+        if size <= 0:
+            report["error"] = "размер хеджа получился нулевым"
+            return finish()
+
+        legs = []
+        for side, names in (("long", longs), ("short", shorts)):
+            for name, leg_size in zip(names, split_size(size, len(names), self.step)):
+                state = warm[name]
+                if state["error"]:
+                    report["error"] = f"{name}: {state['error']}"
+                    return finish()
+                if leg_size <= 0:
+                    report["error"] = f"{name}: нога меньше шага {self.step}"
+                    return finish()
+                if state["available"] * state["leverage"] < leg_size * price:
+                    report["error"] = f"{name}: не хватает маржи на {leg_size * price:.2f}$"
+                    return finish()
+                legs.append(self.new_leg(name, side, leg_size, state["base"]))
+        report["legs"] = {leg["account"]: leg for leg in legs}
+
+        result = await self.execute(legs, coin)
+        report.update(
+            status=result["status"], skew_ms=result["skew_ms"], error=result["error"],
+            unwind={leg["account"]: leg for leg in result["unwind"]},
+        )
+        report["net_base"] = self._net(legs, report["unwind"].values())
+        return self._log(finish())
+
+    async def close(self, coin: str, accounts: List[str]) -> Dict:
+        """
+        Закрыть позиции coin на accounts одновременно (reduceOnly на весь размер).
+
+        Returns:
+            dict: status, coin, skew_ms, legs {account: нога}, seconds, error
+        """
+        started = time.perf_counter()
+        coin = coin.upper()
+        report = {"status": STATUS_CLOSED, "coin": coin, "skew_ms": None, "legs": {}, "seconds": 0.0, "error": None}
+        names = [name for name in accounts if name in self.clients]
+        results = await asyncio.gather(
+            *(self.clients[name].get_all_positions(strict=True) for name in names), return_exceptions=True
+        )
+
+        legs, errors = [], []
+        for name, positions in zip(names, results):
+            if isinstance(positions, Exception):
+                errors.append(f"{name}: не удалось получить позиции")
+                continue
+            position = positions.get(coin)
+            if position and abs(position["base"]) > self.step / 2:
+                side = "short" if position["base"] > 0 else "long"
+                legs.append(self.new_leg(name, side, abs(position["base"]), position["base"], reduce_only=True))
+        report["legs"] = {leg["account"]: leg for leg in legs}
+
+        if legs:
+            report["skew_ms"] = await self._execute(legs, coin)
+        errors += [f"{leg['account']}: {leg['error']}" for leg in legs if not leg["filled"]]
+        if errors:
+            report.update(status=STATUS_EXPOSED, error="; ".join(errors))
+        report["seconds"] = round(time.perf_counter() - started, 3)
+        return self._log(report)
+
+    # --- Отчёт ---
+    @staticmethod
+    def _net(*groups) -> float:
+        net = 0.0
+        for group in groups:
+            for leg in group:
+                if leg["filled"]:
+                    net += leg["size"] if leg["order_side"] == "buy" else -leg["size"]
+        return round(net, 8)
+
+    def _log(self, report: Dict) -> Dict:
+        skew = report["skew_ms"]
+        log = logger.bind(symbol=report["coin"], skew_ms=skew, status=report["status"])
+        if skew is not None and skew > self.max_skew_ms:
+            log.warning(f"Хедж {report['coin']}: разброс подтверждений ног {skew:.1f} мс")
+        message = f"Хедж {report['coin']}: {report['status']}" + (f" ({report['error']})" if report["error"] else "")
+        if report["status"] in (STATUS_HEDGED, STATUS_CLOSED):
+            log.success(message)
+        else:
+            log.error(message)
+        return report
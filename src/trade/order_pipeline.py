@@ -0,0 +1,190 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+import aiohttp
+from loguru import logger
+
+from src.account.info import ArkhamInfo
+from src.trade.risk_engine import PortfolioRisk
+from src.trade.trading_client import ArkhamTrading
+from utils.get_prices import ArkhamPrices
+from utils.leverage import ArkhamLeverage
+from utils.size_calc import PositionSizer
+
+from data import config
+
+
+class _Prefetch:
+    """Параллельные запросы цены, плеча и маржи для одной монеты"""
+    def __init__(self, coin: str, tasks: Dict[str, asyncio.Task]):
+        self.coin = coin
+        self.tasks = tasks
+        self.started = time.perf_counter()
+        self.durations: Dict[str, float] = {}
+        self.done_at: Dict[str, float] = {}
+        for name, task in tasks.items():
+            task.add_done_callback(lambda _, name=name: self._finished(name))
+
+    def _finished(self, name: str):
+        self.done_at[name] = time.perf_counter()
+        self.durations[name] = self.done_at[name] - self.started
+
+    def cancel(self):
+        for task in self.tasks.values():
+            task.cancel()
+
+
+class OrderPipeline:
+    """
+    Быстрый путь открытия позиции по рынку.
+
+    prefetch(coin) сразу запускает параллельно цену, текущее плечо (список
+    плеч кэшируется на leverage_ttl секунд) и доступную маржу - пока
+    пользователь отвечает на вопросы о проценте и плече. execute() ждёт
+    только то, что ещё не пришло; цена и маржа старше max_age
+    перезапрашиваются. Плечо ставится, только если отличается от текущего.
+
+    Отчёт execute() содержит задержки этапов в мс: prefetch_* - время
+    запроса с момента prefetch, wait - сколько ордер ждал префетча,
+    set_leverage, order и total - от вызова execute до ответа биржи.
+
+    Args:
+        session: авторизованная сессия аккаунта
+        info: ArkhamInfo аккаунта
+        prices: ArkhamPrices аккаунта
+        max_age: максимальный возраст цены и маржи к моменту ордера, с
+        leverage_ttl: время жизни кэша плеч, с
+        account: имя аккаунта для логов ордеров
+        risk: риск-движок ордеров (None - активный, см. risk_engine.activate)
+    """
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        info: ArkhamInfo,
+        prices: ArkhamPrices,
+        max_age: float = config.ORDER_PREFETCH_MAX_AGE,
+        leverage_ttl: float = config.LEVERAGE_CACHE_TTL,
+        account: Optional[str] = None,
+        risk: Optional[PortfolioRisk] = None,
+    ):
+        self.session = session
+        self.info = info
+        self.prices = prices
+        self.max_age = max_age
+        self.leverage_ttl = leverage_ttl
+        self.account = account
+        self.risk = risk
+        self.leverage_client = ArkhamLeverage(session)
+        self._leverages: Dict[str, int] = {}
+        self._leverages_at = 0.0
+        self._prefetch: Optional[_Prefetch] = None
+
+    # --- Плечо ---
+    async def _leverage(self, coin: str) -> Optional[int]:
+        if time.monotonic() - self._leverages_at > self.leverage_ttl:
+            self._leverages = await self.leverage_client.get_leverages()
+            self._leverages_at = time.monotonic()
+        return self._leverages.get(f"{coin}_USDT_PERP")
+
+    # --- Префетч ---
+    def prefetch(self, coin: str) -> _Prefetch:
+        """Запустить запросы по монете, не дожидаясь их (повторный вызов для той же монеты - no-op)"""
+        coin = coin.upper()
+        if self._prefetch and self._prefetch.coin == coin:
+            return self._prefetch
+        if self._prefetch:
+            self._prefetch.cancel()
+        self._prefetch = _Prefetch(coin, {
+            "price": asyncio.create_task(self.prices.get_futures_price(coin)),
+            "leverage": asyncio.create_task(self._leverage(coin)),
+            "margin": asyncio.create_task(self.info.get_margin()),
+        })
+        return self._prefetch
+
+    def _stale(self, prefetch: _Prefetch, name: str) -> bool:
+        done_at = prefetch.done_at.get(name)
+        return done_at is not None and time.perf_counter() - done_at > self.max_age
+
+    # --- Ордер ---
+    async def execute(self, coin: str, side: str, percent: float, leverage: Optional[int] = None) -> Dict:
+        """
+        Открыть позицию side ("long"/"short") на percent% доступной маржи.
+        Если нужное плечо установить не удалось, ордер не отправляется - error в отчёте.
+
+        Returns:
+            dict: ok, coin, side, size, price, leverage, available, client_order_id, error, stages {этап: мс}
+        """
+        started = time.perf_counter()
+        coin = coin.upper()
+        stages: Dict[str, float] = {}
+        report = {
+            "ok": False, "coin": coin, "side": side, "size": None, "price": None,
+            "leverage": None, "available": None, "client_order_id": None, "error": None, "stages": stages,
+        }
+
+        def mark(name: str, since: float) -> float:
+            now = time.perf_counter()
+            stages[name] = round((now - since) * 1000, 1)
+            return now
+
+        prefetch = self.prefetch(coin)
+        self._prefetch = None
+        for name in ("price", "margin"):
+            if self._stale(prefetch, name):
+                # Пользователь отвечал дольше max_age - цена и маржа запрашиваются заново
+                prefetch.tasks[name] = asyncio.create_task(
+                    self.prices.get_futures_price(coin) if name == "price" else self.info.get_margin()
+                )
+                prefetch.tasks[name].add_done_callback(lambda _, name=name: prefetch._finished(name))
+                prefetch.started = started
+
+        results = await asyncio.gather(*prefetch.tasks.values(), return_exceptions=True)
+        ticker, current_leverage, margin = results
+        now = mark("wait", started)
+        for name, seconds in prefetch.durations.items():
+            stages[f"prefetch_{name}"] = round(seconds * 1000, 1)
+
+        if isinstance(ticker, Exception) or not ticker.get("price"):
+            report["error"] = f"Не удалось получить цену {coin}: {ticker}"
+            return report
+        if isinstance(margin, Exception) or margin is None:
+            report["error"] = "Не удалось получить доступную маржу"
+            return report
+        if isinstance(current_leverage, Exception):
+            logger.warning(f"Не удалось получить плечо {coin}: {current_leverage}")
+            current_leverage = None
+
+        price = float(ticker["price"])
+        target = int(leverage or current_leverage or config.DEFAULT_LEVERAGE)
+        if current_leverage is None or int(current_leverage) != target:
+            ok = await self.leverage_client.set_leverage(coin, target, verify=False)
+            now = mark("set_leverage", now)
+            if not ok:
+                # Размер под другое плечо - не та позиция, которую просили; ордер не отправляется
+                report.update(price=price, leverage=target, available=margin["available"])
+                report["error"] = f"Не удалось установить плечо {target}x для {coin}"
+                return report
+            self._leverages[f"{coin}_USDT_PERP"] = target
+
+        try:
+            size = PositionSizer(margin["available"], target, price, float(percent)).calculate_size()
+        except ValueError as e:
+            report["error"] = str(e)
+            return report
+        report.update(price=price, leverage=target, available=margin["available"], size=size)
+        if size <= 0:
+            report["error"] = "Размер позиции получился нулевым"
+            return report
+
+        trader = ArkhamTrading(
+            session=self.session, coin=coin, size=size, info_client=self.info, account=self.account, risk=self.risk
+        )
+        if side == "long":
+            report["ok"] = bool(await trader.futures_long_market())
+        else:
+            report["ok"] = bool(await trader.futures_short_market())
+        report["client_order_id"] = trader.last_client_order_id
+        mark("order", now)
+        mark("total", started)
+        return report
@@ -0,0 +1,154 @@
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional
+
+from loguru import logger
+
+from src.account.info import ArkhamInfo
+
+from data import config
+
+
+class AccountPositions:
+    """Последнее известное состояние позиций и маржи одного аккаунта"""
+    def __init__(self, account: str):
+        self.account = account
+        self.positions: Dict[str, Dict] = {}
+        self.margin: Optional[Dict] = None
+        self.updated_at = 0.0
+        self.error: Optional[str] = None
+        # Монеты, закрытие которых отправлено, но ещё не подтверждено опросом
+        self.closing: set[str] = set()
+
+    def age(self, now: Optional[float] = None) -> float:
+        if not self.updated_at:
+            return float("inf")
+        return (now or time.monotonic()) - self.updated_at
+
+
+class PositionsStore:
+    """
+    In-memory состояние позиций по аккаунтам.
+
+    Пишет только PositionsPoller, читают все (дашборд, меню) без сетевых
+    запросов. version растёт с каждым изменением - по нему можно понять,
+    что перерисовывать нечего. listeners(account, positions, margin)
+    вызываются на каждое успешное обновление аккаунта (например,
+    PortfolioRisk.update).
+    """
+    def __init__(self):
+        self._states: Dict[str, AccountPositions] = {}
+        self.version = 0
+        self.listeners: List[Callable[[str, Dict[str, Dict], Optional[Dict]], None]] = []
+
+    def _state(self, account: str) -> AccountPositions:
+        state = self._states.get(account)
+        if state is None:
+            state = self._states[account] = AccountPositions(account)
+        return state
+
+    def update(self, account: str, positions: Dict[str, Dict], margin: Optional[Dict]):
+        state = self._state(account)
+        state.positions = positions
+        if margin is not None:
+            state.margin = margin
+        state.updated_at = time.monotonic()
+        state.error = None
+        state.closing.intersection_update(positions)
+        self.version += 1
+        for listener in self.listeners:
+            listener(account, positions, margin)
+
+    def fail(self, account: str, error: str):
+        """Опрос не удался: данные остаются прежними, но помечаются ошибкой и стареют"""
+        self._state(account).error = error
+        self.version += 1
+
+    def mark_closing(self, account: str, coin: str, closing: bool = True):
+        state = self._state(account)
+        if closing:
+            state.closing.add(coin)
+        else:
+            state.closing.discard(coin)
+        self.version += 1
+
+    def get(self, account: str) -> Optional[AccountPositions]:
+        return self._states.get(account)
+
+    def accounts(self) -> List[AccountPositions]:
+        return list(self._states.values())
+
+
+class PositionsPoller:
+    """
+    Единственный фоновый опрос позиций и маржи для всех аккаунтов стора.
+
+    Раз в interval секунд запрашивает get_all_positions и get_margin всех
+    аккаунтов параллельно (не больше concurrency аккаунтов одновременно).
+    poke() запускает внеочередной опрос - например, сразу после закрытия
+    позиции, чтобы не ждать следующего тика.
+
+    Args:
+        store: стор, в который пишутся результаты
+        clients: account -> ArkhamInfo с рабочей сессией аккаунта
+        interval: период опроса, с
+        concurrency: максимум одновременно опрашиваемых аккаунтов
+    """
+    def __init__(
+        self,
+        store: PositionsStore,
+        clients: Dict[str, ArkhamInfo],
+        interval: float = config.POSITIONS_POLL_INTERVAL,
+        concurrency: int = config.CLI_REFRESH_CONCURRENCY,
+    ):
+        self.store = store
+        self.clients = clients
+        self.interval = interval
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.polls = 0
+        self.last_poll_seconds = 0.0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def poke(self):
+        self._wake.set()
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                await self.poll_once()
+            except Exception as e:
+                logger.error(f"Ошибка опроса позиций: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def poll_once(self):
+        started = time.perf_counter()
+        await asyncio.gather(*(self._poll_account(account, info) for account, info in self.clients.items()))
+        self.polls += 1
+        self.last_poll_seconds = time.perf_counter() - started
+
+    async def _poll_account(self, account: str, info: ArkhamInfo):
+        async with self._semaphore:
+            try:
+                positions, margin = await asyncio.gather(info.get_all_positions(strict=True), info.get_margin())
+            except Exception as e:
+                self.store.fail(account, str(e) or type(e).__name__)
+                return
+        if margin is None:
+            self.store.fail(account, "нет данных маржи")
+            return
+        self.store.update(account, positions, margin)
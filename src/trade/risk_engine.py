@@ -0,0 +1,370 @@
+import math
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+from loguru import logger
+
+from data import config
+
+# Агрегаты монеты: [нетто базы, нетто $, брутто $, лонг $, шорт $, строк]
+NET_BASE, NET_VALUE, GROSS, LONG, SHORT, ROWS = range(6)
+# Агрегаты аккаунта: [equity, нетто $, брутто $]
+EQUITY, ACC_NET, ACC_GROSS = range(3)
+
+
+class PortfolioRisk:
+    """
+    Сводная экспозиция и риск по всем аккаунтам.
+
+    Позиции хранятся столбцами: account и symbol - списки, base, value,
+    entry, mark, leverage - array('d'). Строки аккаунта - набор слотов;
+    update() одного аккаунта вычитает из агрегатов его старые строки,
+    пишет новые в освободившиеся слоты и прибавляет их - O(позиций
+    аккаунта), а не пересчёт всего флота (bench hot.risk_*). Поверх
+    агрегатов монет и аккаунтов считаются экспозиция, расстояние до
+    ликвидации и стресс-PnL.
+
+    Поддерживающая маржа оценивается как maintenance_rate от брутто
+    аккаунта (cross-маржа); расстояние до ликвидации аккаунта - движение
+    всех его позиций против него, съедающее equity до поддерживающей маржи.
+
+    check_order() - проверка лимитов до отправки ордера; ArkhamTrading
+    вызывает её для фьючерсных ордеров на открытие, если движок активен
+    (activate()) или передан явно. Лимит 0/None отключает проверку.
+    С reserve=ключ пропущенный ордер резервирует свою экспозицию в той же
+    синхронной проверке: параллельные ордера видят друг друга, пока ждут
+    ответа биржи. После ответа резерв снимается (release) или становится
+    исполнением (fill).
+
+    Args:
+        max_net_notional: максимум |нетто $| по одной монете во флоте
+        max_gross_notional: максимум брутто $ по флоту
+        max_account_leverage: максимум брутто $ / equity аккаунта
+        min_liq_distance_pct: минимальное расстояние аккаунта до ликвидации, %
+        maintenance_rate: поддерживающая маржа, доля брутто
+    """
+    def __init__(
+        self,
+        max_net_notional: Optional[float] = config.RISK_MAX_NET_NOTIONAL,
+        max_gross_notional: Optional[float] = config.RISK_MAX_GROSS_NOTIONAL,
+        max_account_leverage: Optional[float] = config.RISK_MAX_ACCOUNT_LEVERAGE,
+        min_liq_distance_pct: Optional[float] = config.RISK_MIN_LIQ_DISTANCE_PCT,
+        maintenance_rate: float = config.RISK_MAINTENANCE_RATE,
+    ):
+        self.max_net_notional = max_net_notional
+        self.max_gross_notional = max_gross_notional
+        self.max_account_leverage = max_account_leverage
+        self.min_liq_distance_pct = min_liq_distance_pct
+        self.maintenance_rate = maintenance_rate
+
+        self.account: List[Optional[str]] = []
+        self.symbol: List[Optional[str]] = []
+        self.base = array("d")
+        self.value = array("d")
+        self.entry = array("d")
+        self.mark = array("d")
+        self.leverage = array("d")
+
+        self._slots: Dict[str, List[int]] = {}
+        self._free: List[int] = []
+        self._coins: Dict[str, List[float]] = {}
+        self._accounts: Dict[str, List[float]] = {}
+        self.marks: Dict[str, float] = {}
+        self.version = 0
+
+        # Резервы отправляемых ордеров: ключ -> (account, coin, base, $, прирост брутто)
+        self._reserved: Dict[str, tuple] = {}
+        self._reserved_coin: Dict[str, float] = {}
+        self._reserved_held: Dict[tuple, float] = {}
+        self._reserved_account: Dict[str, float] = {}
+        self._reserved_gross = 0.0
+
+    # --- Обновление ---
+    def _release(self, account: str):
+        coins = self._coins
+        for slot in self._slots.pop(account, ()):
+            coin, value = self.symbol[slot], self.value[slot]
+            aggregate = coins[coin]
+            aggregate[ROWS] -= 1
+            if not aggregate[ROWS]:
+                # Последняя строка монеты - без накопленной ошибки вычитаний
+                del coins[coin]
+            else:
+                aggregate[NET_BASE] -= self.base[slot]
+                aggregate[NET_VALUE] -= value
+                aggregate[GROSS] -= abs(value)
+                aggregate[LONG if value > 0 else SHORT] -= abs(value)
+            self.account[slot] = self.symbol[slot] = None
+            self.base[slot] = self.value[slot] = 0.0
+            self._free.append(slot)
+
+    def update(self, account: str, positions: Dict[str, Dict], margin: Optional[Dict] = None):
+        """
+        Заменить позиции аккаунта (формат ArkhamInfo.get_all_positions).
+        Подходит как слушатель PositionsStore. margin - get_margin() (equity);
+        None - оставить прежнюю equity.
+        """
+        equity = margin["equity"] if margin else (self._accounts.get(account) or [0.0])[EQUITY]
+        self._release(account)
+        slots = self._slots[account] = []
+        net = gross = 0.0
+        for coin, position in positions.items():
+            base = float(position["base"])
+            if not base:
+                continue
+            mark = float(position.get("mark") or 0.0)
+            value = base * mark if mark else float(position.get("value") or 0.0)
+            if mark:
+                self.marks[coin] = mark
+            row = (account, coin, base, value, float(position.get("entry") or 0.0), mark,
+                   float(position.get("leverage") or 0.0))
+            if self._free:
+                slot = self._free.pop()
+                (self.account[slot], self.symbol[slot], self.base[slot], self.value[slot],
+                 self.entry[slot], self.mark[slot], self.leverage[slot]) = row
+            else:
+                slot = len(self.account)
+                for column, item in zip(self._columns_all(), row):
+                    column.append(item)
+            slots.append(slot)
+
+            aggregate = self._coins.get(coin)
+            if aggregate is None:
+                aggregate = self._coins[coin] = [0.0, 0.0, 0.0, 0.0, 0.0, 0]
+            aggregate[NET_BASE] += base
+            aggregate[NET_VALUE] += value
+            aggregate[GROSS] += abs(value)
+            aggregate[LONG if value > 0 else SHORT] += abs(value)
+            aggregate[ROWS] += 1
+            net += value
+            gross += abs(value)
+        self._accounts[account] = [equity, net, gross]
+        self.version += 1
+
+    def remove(self, account: str):
+        self._release(account)
+        self._accounts.pop(account, None)
+        self.version += 1
+
+    def positions(self, account: str) -> Dict[str, Dict]:
+        """Позиции аккаунта из столбцов (формат update)"""
+        return {
+            self.symbol[slot]: {
+                "base": self.base[slot], "value": self.value[slot], "entry": self.entry[slot],
+                "mark": self.mark[slot], "leverage": self.leverage[slot],
+            }
+            for slot in self._slots.get(account, ())
+        }
+
+    def apply_fill(self, account: str, coin: str, base_delta: float, price: float):
+        """Учесть исполненный ордер до следующего опроса позиций"""
+        positions = self.positions(account)
+        position = positions.setdefault(coin, {"base": 0.0, "entry": price, "leverage": 0.0})
+        position["base"] = round(position["base"] + base_delta, 10)
+        position["mark"] = price
+        self.update(account, positions)
+
+    def _columns_all(self) -> tuple:
+        return self.account, self.symbol, self.base, self.value, self.entry, self.mark, self.leverage
+
+    def columns(self) -> Dict[str, Sequence]:
+        """Копия столбцов без свободных слотов"""
+        used = [slot for slot, account in enumerate(self.account) if account is not None]
+        names = ("account", "symbol", "base", "value", "entry", "mark", "leverage")
+        result = {}
+        for name, column in zip(names, self._columns_all()):
+            picked = [column[slot] for slot in used]
+            result[name] = array("d", picked) if isinstance(column, array) else picked
+        return result
+
+    # --- Экспозиция ---
+    def exposure(self) -> Dict:
+        """
+        Нетто/брутто по монетам и итог по флоту.
+
+        Returns:
+            dict: coins [{"coin", "net_base", "net_value", "gross_value", "long_value", "short_value", "rows"}],
+                  net_value, gross_value
+        """
+        coins = [
+            {
+                "coin": coin, "net_base": item[NET_BASE], "net_value": item[NET_VALUE], "gross_value": item[GROSS],
+                "long_value": item[LONG], "short_value": item[SHORT], "rows": int(item[ROWS]),
+            }
+            for coin, item in self._coins.items()
+        ]
+        coins.sort(key=lambda item: -abs(item["net_value"]))
+        return {
+            "coins": coins,
+            "net_value": sum(item[NET_VALUE] for item in self._coins.values()),
+            "gross_value": sum(item[GROSS] for item in self._coins.values()),
+        }
+
+    def _liq_move_pct(self, equity: float, gross: float) -> float:
+        if not gross:
+            return math.inf
+        return (equity - gross * self.maintenance_rate) / gross * 100
+
+    def account_risk(self) -> List[Dict]:
+        """
+        Риск по аккаунтам, ближайшие к ликвидации - первыми.
+
+        Returns:
+            list: {"account", "equity", "net_value", "gross_value", "leverage", "maintenance", "liq_move_pct"}
+        """
+        rows = [
+            {
+                "account": name, "equity": item[EQUITY], "net_value": item[ACC_NET], "gross_value": item[ACC_GROSS],
+                "leverage": item[ACC_GROSS] / item[EQUITY] if item[EQUITY] > 0 else math.inf,
+                "maintenance": item[ACC_GROSS] * self.maintenance_rate,
+                "liq_move_pct": self._liq_move_pct(item[EQUITY], item[ACC_GROSS]),
+            }
+            for name, item in self._accounts.items()
+        ]
+        rows.sort(key=lambda row: row["liq_move_pct"])
+        return rows
+
+    def liquidation_distances(self) -> array:
+        """
+        Расстояние до ликвидации по строкам, % цены: движение одной монеты
+        против позиции, съедающее запас аккаунта (equity - поддерживающая маржа).
+        """
+        headroom = {
+            name: item[EQUITY] - item[ACC_GROSS] * self.maintenance_rate for name, item in self._accounts.items()
+        }
+        return array("d", (
+            headroom[account] / abs(value) * 100 if account is not None and value else math.inf
+            for account, value in zip(self.account, self.value)
+        ))
+
+    def stress(self, shocks: Optional[Sequence[float]] = None) -> Dict:
+        """
+        Стресс-PnL при одновременном движении всех монет на shock (доля цены).
+
+        Returns:
+            dict: shocks, pnl [по шокам], by_coin {coin: [по шокам]},
+                  liquidated [число аккаунтов ниже поддерживающей маржи], worst {"account", "pnl"} по шокам
+        """
+        shocks = list(config.RISK_STRESS_SHOCKS if shocks is None else shocks)
+        names = list(self._accounts)
+        equity = array("d", (item[EQUITY] for item in self._accounts.values()))
+        net = array("d", (item[ACC_NET] for item in self._accounts.values()))
+        maintenance = array("d", (item[ACC_GROSS] * self.maintenance_rate for item in self._accounts.values()))
+        headroom = array("d", (e - m for e, m in zip(equity, maintenance)))
+        total_net = sum(net)
+
+        liquidated, worst = [], []
+        for shock in shocks:
+            pnl = [value * shock for value in net]
+            liquidated.append(sum(1 for loss, room in zip(pnl, headroom) if loss < -room))
+            index = min(range(len(pnl)), key=pnl.__getitem__) if pnl else None
+            worst.append({"account": names[index], "pnl": pnl[index]} if index is not None else None)
+        return {
+            "shocks": shocks,
+            "pnl": [total_net * shock for shock in shocks],
+            "by_coin": {coin: [item[NET_VALUE] * shock for shock in shocks] for coin, item in self._coins.items()},
+            "liquidated": liquidated,
+            "worst": worst,
+        }
+
+    # --- Лимиты ---
+    def _account_value(self, account: str, coin: str) -> float:
+        for slot in self._slots.get(account, ()):
+            if self.symbol[slot] == coin:
+                return self.value[slot]
+        return 0.0
+
+    def check_order(
+        self,
+        account: Optional[str],
+        coin: str,
+        side: str,
+        size: float,
+        price: float,
+        reserve: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Проверка фьючерсного ордера на открытие до отправки (с учётом
+        резервов ордеров, ещё ждущих ответа). Ордер, который уменьшает
+        нарушенный показатель, пропускается.
+
+        Args:
+            reserve: ключ резерва (clientOrderId) - пропущенный ордер резервирует экспозицию
+
+        Returns:
+            None - можно отправлять, иначе причина отказа
+        """
+        base_delta = size if side == "buy" else -size
+        delta = base_delta * price
+        coin_net = (self._coins[coin][NET_VALUE] if coin in self._coins else 0.0) + self._reserved_coin.get(coin, 0.0)
+        if self.max_net_notional and abs(coin_net + delta) > max(self.max_net_notional, abs(coin_net)):
+            return f"нетто {coin} {coin_net + delta:+.0f}$ превысит лимит {self.max_net_notional:.0f}$"
+
+        held = self._account_value(account, coin) + self._reserved_held.get((account, coin), 0.0) if account else 0.0
+        gross_delta = abs(held + delta) - abs(held)
+        reason = self._check_gross(account, gross_delta) if gross_delta > 0 else None
+        if reason is None and reserve is not None:
+            self._reserve(reserve, account, coin, base_delta, delta, gross_delta)
+        return reason
+
+    def _check_gross(self, account: Optional[str], gross_delta: float) -> Optional[str]:
+        gross = sum(item[GROSS] for item in self._coins.values()) + self._reserved_gross + gross_delta
+        if self.max_gross_notional and gross > self.max_gross_notional:
+            return f"брутто флота {gross:.0f}$ превысит лимит {self.max_gross_notional:.0f}$"
+
+        state = self._accounts.get(account) if account else None
+        if state is None or state[EQUITY] <= 0:
+            return None
+        account_gross = state[ACC_GROSS] + self._reserved_account.get(account, 0.0) + gross_delta
+        leverage = account_gross / state[EQUITY]
+        if self.max_account_leverage and leverage > self.max_account_leverage:
+            return f"плечо аккаунта {leverage:.1f}x превысит лимит {self.max_account_leverage:g}x"
+        distance = self._liq_move_pct(state[EQUITY], account_gross)
+        if self.min_liq_distance_pct and distance < self.min_liq_distance_pct:
+            return f"до ликвидации останется {distance:.1f}% (минимум {self.min_liq_distance_pct:g}%)"
+        return None
+
+    # --- Резервы ---
+    def _reserve(self, key: str, account: Optional[str], coin: str, base_delta: float, delta: float, gross_delta: float):
+        self._reserved[key] = (account, coin, base_delta, delta, max(gross_delta, 0.0))
+        self._sum_reserved()
+
+    def _sum_reserved(self):
+        # Ордеров в полёте единицы - суммы пересчитываются целиком, без накопленной ошибки вычитаний
+        self._reserved_coin, self._reserved_held, self._reserved_account = {}, {}, {}
+        self._reserved_gross = 0.0
+        for account, coin, _, delta, gross_delta in self._reserved.values():
+            self._reserved_coin[coin] = self._reserved_coin.get(coin, 0.0) + delta
+            self._reserved_held[(account, coin)] = self._reserved_held.get((account, coin), 0.0) + delta
+            self._reserved_account[account] = self._reserved_account.get(account, 0.0) + gross_delta
+            self._reserved_gross += gross_delta
+
+    def release(self, key: str) -> Optional[tuple]:
+        """Снять резерв ордера (отказ биржи, ошибка или лимитный ордер, который только выставлен)"""
+        reserved = self._reserved.pop(key, None)
+        if reserved is not None:
+            self._sum_reserved()
+        return reserved
+
+    def fill(self, key: str, price: Optional[float] = None):
+        """Резерв исполненного рыночного ордера -> позиция (apply_fill) до следующего опроса"""
+        reserved = self.release(key)
+        if reserved is None:
+            return
+        account, coin, base_delta, delta, _ = reserved
+        if account:
+            self.apply_fill(account, coin, base_delta, price or abs(delta / base_delta))
+
+
+_active: Optional[PortfolioRisk] = None
+
+
+def activate(engine: Optional[PortfolioRisk]):
+    """Включить проверку лимитов для всех новых ArkhamTrading (None - выключить)"""
+    global _active
+    _active = engine
+    logger.info("Риск-лимиты ордеров включены" if engine else "Риск-лимиты ордеров выключены")
+
+
+def active_risk() -> Optional[PortfolioRisk]:
+    return _active
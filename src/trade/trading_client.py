@@ -1,6 +1,14 @@
+import math
+import time
+import uuid
+
 import aiohttp
 from loguru import logger
 from src.account.info import ArkhamInfo
+from src.trade.risk_engine import PortfolioRisk, active_risk
+from utils.get_prices import ArkhamPrices
+
+from data import config
 
 class ArkhamTrading:
     """
@@ -12,6 +20,8 @@ class ArkhamTrading:
         size: размер ордера
         price: цена (только для limit ордеров)
         info_client: экземпляр ArkhamInfo для получения данных о позициях
+        account: имя аккаунта для структурированных логов ордеров
+        risk: риск-движок для проверки лимитов (по умолчанию - активный, см. risk_engine.activate)
     """
     def __init__(
         self,
@@ -20,16 +30,25 @@ class ArkhamTrading:
         size: str | int | float,
         price: str | int | float = None,
         info_client: ArkhamInfo | None = None, 
+        account: str | None = None,
+        risk: PortfolioRisk | None = None,
     ):
         self.session = session
         self.coin = coin.upper()
         self.size = str(size)
         self.price = str(price) if price else None
         self.info_client = info_client
+        self.account = account
+        # Время последнего запроса /api/orders/new (с) и его clientOrderId
+        self.last_order_latency: float | None = None
+        self.last_client_order_id: str | None = None
+        self.risk = risk if risk is not None else active_risk()
+        # Причина последнего отказа риск-лимитом
+        self.last_risk_rejection: str | None = None
         
     def round_size(self, size: float, step: float = 0.00001) -> str:
-        """Округляем size до ближайшего шага"""
-        return f"{(size // step) * step:.5f}"
+        """Округляем size вниз до шага (эпсилон - чтобы 0.0003 // 0.00001 не дало 29 шагов)"""
+        return f"{math.floor(size / step + 1e-9) * step:.5f}"
 
     def adjust_reduce_size(self, size: float) -> float:
         """Корректируем размер позиции для reduceOnly"""
@@ -58,10 +77,12 @@ class ArkhamTrading:
         is_futures: bool = False,
         reduce_only: bool = False,
         use_custom_size: bool = False,
-        custom_size: float = None
+        custom_size: float = None,
+        coin: str = None
     ):
-        """Создание данных для ордера"""
-        symbol = f"{self.coin}_USDT_PERP" if is_futures else f"{self.coin}_USDT"
+        """Создание данных для ордера (coin - монета ордера, по умолчанию self.coin)"""
+        coin = coin or self.coin
+        symbol = f"{coin}_USDT_PERP" if is_futures else f"{coin}_USDT"
         order_type_api = "market" if order_type == "market" else "limitGtc"
 
         if use_custom_size and custom_size is not None:
@@ -87,27 +108,102 @@ class ArkhamTrading:
             "reduceOnly": reduce_only if is_futures else False,
         }
 
+    async def _risk_price(self, order_data: dict, coin: str) -> float | None:
+        """Цена для проверки лимитов: лимитная цена, последняя известная движку или тикер"""
+        if order_data["type"] == "limitGtc":
+            return float(order_data["price"])
+        price = self.risk.marks.get(coin)
+        if price:
+            return price
+        try:
+            return (await ArkhamPrices(session=self.session).get_futures_price(coin))["price"]
+        except Exception as e:
+            logger.warning(f"Нет цены {coin} для проверки риск-лимитов: {e}")
+            return None
+
+    def _settle_risk(self, order_data: dict, reserved: str | None, price: float | None):
+        """
+        Учесть принятый биржей ордер: рыночный становится позицией, резерв
+        лимитного (только выставлен, не исполнен) снимается.
+        """
+        if self.risk is None:
+            return
+        filled = order_data["type"] == "market"
+        if reserved is not None:
+            if filled:
+                self.risk.fill(reserved, price)
+            else:
+                self.risk.release(reserved)
+        elif filled and price and self.account and "_PERP" in order_data["symbol"]:
+            size = float(order_data["size"])
+            coin = order_data["symbol"].split("_")[0]
+            self.risk.apply_fill(self.account, coin, size if order_data["side"] == "buy" else -size, price)
+
     async def _send_order_request(self, order_data: dict, action_description: str):
         """Отправка запроса на создание ордера"""
+        if not order_data.get("clientOrderId"):
+            order_data["clientOrderId"] = uuid.uuid4().hex
+        self.last_client_order_id = order_data["clientOrderId"]
+        log = logger.bind(
+            account=self.account, symbol=order_data["symbol"], client_order_id=order_data["clientOrderId"],
+            side=order_data["side"], size=order_data["size"],
+        )
+        is_futures = "_PERP" in order_data["symbol"]
+        risk_price = None
+        reserved = None
+        if self.risk is not None and is_futures:
+            # Монета из символа: futures_close_position_market закрывает чужие для self.coin монеты
+            coin = order_data["symbol"].split("_")[0]
+            if order_data["reduceOnly"]:
+                # Закрытие лимиты не проверяют - цена нужна только чтобы учесть исполнение
+                risk_price = self.risk.marks.get(coin)
+            else:
+                # Цена запрашивается до проверки: между проверкой с резервом и
+                # отправкой нет await, параллельные ордера видят резерв друг друга
+                risk_price = await self._risk_price(order_data, coin)
+                reason = (
+                    "нет цены для проверки лимитов" if risk_price is None else
+                    self.risk.check_order(
+                        self.account, coin, order_data["side"], float(order_data["size"]), risk_price,
+                        reserve=order_data["clientOrderId"],
+                    )
+                )
+                self.last_risk_rejection = reason
+                if reason:
+                    log.error(f"Ордер отклонён риск-лимитом: {reason}")
+                    return False
+                reserved = order_data["clientOrderId"]
+
+        started = time.perf_counter()
         try:
-            headers = self._get_headers(is_futures="_PERP" in order_data["symbol"])
+            headers = self._get_headers(is_futures=is_futures)
             async with self.session.post(
-                "https://arkm.com/api/orders/new",
+                f"{config.BASE_URL}/api/orders/new",
                 headers=headers,
                 json=order_data,
             ) as response:
+                self.last_order_latency = time.perf_counter() - started
+                log = log.bind(latency_ms=round(self.last_order_latency * 1000, 1), status=response.status)
                 if response.status == 200:
+                    if self.info_client:
+                        self.info_client.invalidate_balances()
+                    self._settle_risk(order_data, reserved, risk_price)
                     extra = f" @ {order_data.get('price')}" if order_data["type"] == "limitGtc" else ""
-                    logger.success(f"{action_description}{extra}")
+                    log.success(f"{action_description}{extra}")
                     return True
                 else:
                     text = await response.text()
-                    logger.error(f"Ошибка {response.status}: {text}")
+                    log.error(f"Ошибка {response.status}: {text}")
                     return False
                     
         except Exception as e:
-            logger.error(f"Ошибка при отправке ордера: {e}")
+            self.last_order_latency = time.perf_counter() - started
+            log.bind(latency_ms=round(self.last_order_latency * 1000, 1)).error(f"Ошибка при отправке ордера: {e}")
             return False
+        finally:
+            # Отказ, ошибка или отмена: резерв, не ставший исполнением, снимается
+            if reserved is not None:
+                self.risk.release(reserved)
 
     # === SPOT ТОРГОВЛЯ С АВТОМАТИЧЕСКИМ ОПРЕДЕЛЕНИЕМ БАЛАНСА ===
     
@@ -140,7 +236,7 @@ class ArkhamTrading:
         Если sell_size не указан и есть info_client - автоматически определит баланс монеты
         """
         if sell_size is None and self.info_client:
-            spot_balance = await self.info_client.get_spot_balance(self.coin) # метода нет
+            spot_balance = await self.info_client.get_spot_balance(self.coin)
             if spot_balance <= 0:
                 logger.warning(f"Недостаточный баланс {self.coin} на споте для продажи: {spot_balance}")
                 return False
@@ -248,6 +344,7 @@ class ArkhamTrading:
     async def futures_close_position_market(self):
         """
         Закрывает ВСЕ открытые фьючерсные позиции по рынку (reduceOnly).
+        Каждая позиция закрывается ордером по своему символу, а не по self.coin.
         """
         if not self.info_client:
             raise ValueError("Для автоматического закрытия нужен info_client")
@@ -279,7 +376,8 @@ class ArkhamTrading:
                 is_futures=True,
                 reduce_only=True,
                 use_custom_size=True,
-                custom_size=position_size
+                custom_size=position_size,
+                coin=coin
             )
 
             action = f"Futures АВТОЗАКРЫТИЕ {direction} {coin} на {position_size} успешно выполнено!"
@@ -399,3 +497,40 @@ class ArkhamTrading:
         
         return await self._send_order_request(order_data, action)
 
+
+    # === ПОДГОТОВЛЕННЫЕ ОРДЕРА ===
+
+    def futures_market_order(self, side: str, reduce_only: bool = False, size: float | None = None) -> dict:
+        """
+        Данные рыночного фьючерсного ордера без отправки (отправка - send_order).
+        clientOrderId назначается сразу, чтобы отправка не делала лишней работы.
+        """
+        if side not in ("buy", "sell"):
+            raise ValueError("side должен быть 'buy' или 'sell'")
+        order_data = self._create_order_data(
+            side=side,
+            order_type="market",
+            is_futures=True,
+            reduce_only=reduce_only,
+            use_custom_size=size is not None,
+            custom_size=size,
+        )
+        order_data["clientOrderId"] = uuid.uuid4().hex
+        return order_data
+
+    def spot_market_order(self, side: str, size: float | None = None) -> dict:
+        """Данные рыночного спот-ордера без отправки (отправка - send_order)"""
+        if side not in ("buy", "sell"):
+            raise ValueError("side должен быть 'buy' или 'sell'")
+        order_data = self._create_order_data(
+            side=side,
+            order_type="market",
+            use_custom_size=size is not None,
+            custom_size=size,
+        )
+        order_data["clientOrderId"] = uuid.uuid4().hex
+        return order_data
+
+    async def send_order(self, order_data: dict, action_description: str) -> bool:
+        """Отправить ордер из futures_market_order"""
+        return await self._send_order_request(order_data, action_description)
@@ -0,0 +1,313 @@
+import asyncio
+import math
+import random
+import time
+from typing import Callable, Dict, List, Optional
+
+from loguru import logger
+
+from src.account.info import ArkhamInfo
+from src.trade.trading_client import ArkhamTrading
+from utils.get_prices import ArkhamPrices
+from utils.leverage import ArkhamLeverage
+from utils.points import FUTURES
+
+from data import config
+
+# Итог фарма по аккаунту
+STATUS_DONE = "done"
+STATUS_LOSS_CAP = "loss_cap"
+STATUS_MAX_TRIPS = "max_trips"
+STATUS_STOPPED = "stopped"
+STATUS_ERROR = "error"
+
+
+def estimate_slippage(notional: float, ticker: Dict, impact: float = config.FARM_IMPACT_COEF) -> float:
+    """
+    Оценка проскальзывания одной рыночной сделки (доля от notional).
+    Квадратный корень от доли суточного оборота: чем ликвиднее символ,
+    тем дешевле тот же объём.
+    """
+    daily = ticker["volume24h"] * ticker["price"]
+    if daily <= 0:
+        return float("inf")
+    return impact * math.sqrt(notional / daily)
+
+
+def plan_round_trips(
+    account: str,
+    volume: float,
+    target: float,
+    available: float,
+    tickers: Dict[str, Dict],
+    leverage: int = config.FARM_LEVERAGE,
+    margin_pct: float = config.FARM_MARGIN_PCT,
+    max_notional: float = config.FARM_MAX_NOTIONAL,
+    max_slippage_bps: float = config.FARM_MAX_SLIPPAGE_BPS,
+    spacing: float = config.FARM_SPACING,
+) -> Dict:
+    """
+    План круговых сделок (открыть + закрыть по рынку) до объёма target.
+
+    Комиссия за единицу объёма одинакова у всех фьючерсов, поэтому
+    символ выбирается по проскальзыванию. notional сделки - наибольший,
+    при котором проскальзывание не превышает max_slippage_bps и который
+    укладывается в риск-лимиты (margin_pct доступной маржи x плечо,
+    max_notional): меньше сделок при той же цене единицы объёма.
+
+    Returns:
+        dict: account, coin, notional, trips, spacing, remaining, fee, slippage,
+              cost, cost_per_100k, duration, error
+    """
+    plan = {
+        "account": account, "coin": None, "notional": 0.0, "trips": 0, "spacing": spacing,
+        "remaining": max(0.0, target - volume), "fee": 0.0, "slippage": 0.0, "cost": 0.0,
+        "cost_per_100k": 0.0, "duration": 0.0, "error": None,
+    }
+    if not plan["remaining"]:
+        return plan
+
+    cap = min(max_notional, available * margin_pct / 100 * leverage)
+    if cap <= 0:
+        plan["error"] = "нет доступной маржи"
+        return plan
+
+    best = None
+    for coin, ticker in tickers.items():
+        daily = ticker["volume24h"] * ticker["price"]
+        # Наибольший notional с проскальзыванием <= лимита: impact * sqrt(n / daily) <= limit
+        by_slippage = daily * (max_slippage_bps / 10_000 / config.FARM_IMPACT_COEF) ** 2
+        notional = min(cap, by_slippage)
+        rate = config.FUTURES_FEE + estimate_slippage(notional, ticker)
+        if best is None or (rate, -notional) < (best[0], -best[2]):
+            best = (rate, coin, notional)
+
+    if best is None or best[2] <= 0:
+        plan["error"] = "нет подходящего символа"
+        return plan
+
+    rate, coin, notional = best
+    trips = math.ceil(plan["remaining"] / (2 * notional))
+    volume_planned = trips * 2 * notional
+    fee = volume_planned * config.FUTURES_FEE
+    slippage = volume_planned * estimate_slippage(notional, tickers[coin])
+    plan.update(
+        coin=coin, notional=notional, trips=trips, fee=fee, slippage=slippage, cost=fee + slippage,
+        cost_per_100k=(fee + slippage) / volume_planned * 100_000,
+        duration=trips * (spacing + config.FARM_HOLD_SECONDS),
+    )
+    return plan
+
+
+class VolumeFarmer:
+    """
+    Фарм объёма круговыми сделками до целевого объёма по каждому аккаунту.
+
+    plan() снимает текущий объём (affiliate-dashboard), маржу и тикеры
+    FARM_SYMBOLS и строит план plan_round_trips на аккаунт; монеты, по
+    которым у аккаунта уже есть позиция, в план не попадают. run()
+    исполняет планы параллельно (не больше concurrency аккаунтов), внутри
+    аккаунта сделки идут по очереди: открытие по рынку, удержание
+    FARM_HOLD_SECONDS, закрытие reduceOnly, пауза spacing со случайным
+    разбросом. Направление чередуется, чтобы не копить риск в одну сторону.
+
+    Объём считается локально по исполненным сделкам; реальный объём с
+    affiliate-dashboard запрашивается не чаще volume_poll секунд и когда
+    локальная оценка дошла до цели - остановка только по реальному объёму.
+    Риск-лимиты: потеря equity больше max_loss_pct от стартовой, не закрытая
+    позиция и лимит сделок (план + FARM_EXTRA_TRIPS) останавливают аккаунт.
+    Закрывается только размер, открытый сделкой (разница с позицией до
+    открытия), а не вся позиция по монете; неудачный запрос позиций или
+    появившаяся чужая позиция по монете тоже останавливают аккаунт.
+
+    Args:
+        clients: account -> ArkhamInfo с рабочей сессией аккаунта
+        targets: account -> целевой объём (спот + фьючерсы, как в affiliate-dashboard)
+        concurrency: максимум одновременно фармящих аккаунтов
+        volume_poll: период опроса реального объёма, с
+        max_loss_pct: допустимая потеря equity, %
+        hold: удержание позиции перед закрытием, с
+        jitter: случайная добавка к паузе между сделками, с
+        on_progress: колбэк (account, state) после каждой сделки и в конце
+    """
+    def __init__(
+        self,
+        clients: Dict[str, ArkhamInfo],
+        targets: Dict[str, float],
+        concurrency: int = config.FARM_CONCURRENCY,
+        volume_poll: float = config.FARM_VOLUME_POLL,
+        max_loss_pct: float = config.FARM_MAX_LOSS_PCT,
+        hold: float = config.FARM_HOLD_SECONDS,
+        jitter: float = config.FARM_SPACING_JITTER,
+        on_progress: Optional[Callable[[str, Dict], None]] = None,
+    ):
+        self.clients = clients
+        self.targets = targets
+        self.volume_poll = volume_poll
+        self.max_loss_pct = max_loss_pct
+        self.hold = hold
+        self.jitter = jitter
+        self.on_progress = on_progress
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._stop = asyncio.Event()
+
+    def stop(self):
+        """Остановить фарм после текущих сделок (открытые позиции закрываются)"""
+        self._stop.set()
+
+    # --- План ---
+    async def _tickers(self, session) -> Dict[str, Dict]:
+        prices = ArkhamPrices(session=session)
+        results = await asyncio.gather(
+            *(prices.get_futures_price(coin) for coin in config.FARM_SYMBOLS), return_exceptions=True
+        )
+        tickers = {}
+        for coin, ticker in zip(config.FARM_SYMBOLS, results):
+            if isinstance(ticker, Exception):
+                logger.warning(f"Фарм: тикер {coin} недоступен: {ticker}")
+            else:
+                tickers[coin] = ticker
+        return tickers
+
+    async def plan(self, **kwargs) -> Dict[str, Dict]:
+        """План на каждый аккаунт из targets (kwargs - параметры plan_round_trips)"""
+        accounts = [name for name in self.targets if name in self.clients]
+        if not accounts:
+            return {}
+        tickers = await self._tickers(self.clients[accounts[0]].session)
+
+        async def plan_one(name: str) -> Dict:
+            info = self.clients[name]
+            volume, margin, positions = await asyncio.gather(
+                info.get_volume_or_points("volume"), info.get_margin(), info.get_all_positions(strict=True),
+                return_exceptions=True,
+            )
+            if volume is None or margin is None or isinstance(volume, Exception) or isinstance(margin, Exception):
+                return {"account": name, "error": "не удалось получить объём или маржу", "trips": 0}
+            if isinstance(positions, Exception):
+                return {"account": name, "error": f"не удалось получить позиции: {positions}", "trips": 0}
+            # Монеты с открытой позицией (ручной или другой стратегии) фарм не трогает
+            free = {coin: ticker for coin, ticker in tickers.items() if coin not in positions}
+            plan = plan_round_trips(name, volume, self.targets[name], margin["available"], free, **kwargs)
+            plan.update(volume=volume, target=self.targets[name], equity=margin["equity"])
+            return plan
+
+        plans = await asyncio.gather(*(plan_one(name) for name in accounts))
+        return dict(zip(accounts, plans))
+
+    # --- Исполнение ---
+    async def run(self, plans: Dict[str, Dict]) -> Dict[str, Dict]:
+        """
+        Исполнить планы.
+
+        Returns:
+            dict: account -> {"status", "trips", "volume_start", "volume", "estimated", "equity_change", "seconds", "error"}
+        """
+        runnable = {name: plan for name, plan in plans.items() if plan.get("trips") and not plan.get("error")}
+        results = await asyncio.gather(*(self._farm(name, plan) for name, plan in runnable.items()))
+        return dict(zip(runnable, results))
+
+    async def _real_volume(self, info: ArkhamInfo, fallback: float) -> float:
+        volume = await info.get_volume_or_points("volume")
+        return fallback if volume is None else volume
+
+    async def _farm(self, name: str, plan: Dict) -> Dict:
+        async with self._semaphore:
+            info = self.clients[name]
+            started = time.perf_counter()
+            state = {
+                "status": STATUS_DONE, "trips": 0, "volume_start": plan["volume"], "volume": plan["volume"],
+                "estimated": plan["volume"], "equity_change": 0.0, "seconds": 0.0, "error": None,
+            }
+            try:
+                await self._farm_trips(name, info, plan, state)
+            except Exception as e:
+                logger.error(f"Фарм '{name}': {e}")
+                state.update(status=STATUS_ERROR, error=str(e) or type(e).__name__)
+            state["seconds"] = round(time.perf_counter() - started, 1)
+            logger.bind(account=name).info(
+                f"Фарм '{name}' завершён ({state['status']}): {state['trips']} сделок, "
+                f"объём {state['volume_start']:.0f} -> {state['volume']:.0f} из {plan['target']:.0f}"
+            )
+            if self.on_progress:
+                self.on_progress(name, state)
+            return state
+
+    async def _farm_trips(self, name: str, info: ArkhamInfo, plan: Dict, state: Dict):
+        coin, notional, target = plan["coin"], plan["notional"], plan["target"]
+        session = info.session
+        prices = ArkhamPrices(session=session)
+        leverage = ArkhamLeverage(session)
+        if (await leverage.get_leverages()).get(f"{coin}_USDT_PERP") != config.FARM_LEVERAGE:
+            await leverage.set_leverage(coin, config.FARM_LEVERAGE, verify=False)
+
+        last_poll = time.monotonic()
+        max_trips = plan["trips"] + config.FARM_EXTRA_TRIPS
+        side = "long"
+        while not self._stop.is_set():
+            if state["estimated"] >= target or time.monotonic() - last_poll >= self.volume_poll:
+                state["volume"] = await self._real_volume(info, state["volume"])
+                state["estimated"] = max(state["estimated"], state["volume"])
+                last_poll = time.monotonic()
+                if state["volume"] >= target:
+                    return
+                if state["estimated"] >= target:
+                    # Биржа ещё не учла объём (или учла меньше) - верим реальному значению
+                    state["estimated"] = state["volume"]
+            if state["trips"] >= max_trips:
+                state["status"] = STATUS_MAX_TRIPS
+                return
+
+            margin = await info.get_margin()
+            if margin is None:
+                raise RuntimeError("не удалось получить маржу")
+            state["equity_change"] = margin["equity"] - plan["equity"]
+            if -state["equity_change"] > plan["equity"] * self.max_loss_pct / 100:
+                state["status"] = STATUS_LOSS_CAP
+                return
+
+            # Базовая позиция до открытия: strict - ошибка запроса не выглядит как "позиции нет"
+            baseline = (await info.get_all_positions(strict=True)).get(coin, {}).get("base", 0.0)
+            if baseline:
+                raise RuntimeError(f"по {coin} открыта чужая позиция {baseline:g} - фарм остановлен")
+
+            price = (await prices.get_futures_price(coin))["price"]
+            size = math.floor(notional / price / config.FARM_SIZE_STEP + 1e-9) * config.FARM_SIZE_STEP
+            if size <= 0:
+                raise RuntimeError(f"размер сделки {coin} меньше шага {config.FARM_SIZE_STEP}")
+            trader = ArkhamTrading(session=session, coin=coin, size=size, info_client=info, account=name)
+            opened = await (trader.futures_long_market() if side == "long" else trader.futures_short_market())
+            if not opened:
+                raise RuntimeError(f"ордер {side} {coin} не исполнен")
+
+            await asyncio.sleep(self.hold)
+            base = (await info.get_all_positions(strict=True)).get(coin, {}).get("base", 0.0)
+            # Закрывается только то, что открыла эта сделка, и не больше её размера
+            filled = base - baseline if side == "long" else baseline - base
+            closing = min(filled, size)
+            if closing > 0:
+                if side == "long":
+                    closed = await trader.futures_close_long_market(position_size=closing)
+                else:
+                    closed = await trader.futures_close_short_market(position_size=closing)
+                if not closed:
+                    raise RuntimeError(f"позиция {coin} не закрыта - нужна ручная проверка")
+
+            state["trips"] += 1
+            state["estimated"] += 2 * notional
+            side = "short" if side == "long" else "long"
+            if self.on_progress:
+                self.on_progress(name, state)
+
+            pause = plan["spacing"] + random.uniform(0, self.jitter)
+            try:
+                await asyncio.wait_for(self._stop.wait(), pause)
+            except asyncio.TimeoutError:
+                pass
+
+        state["status"] = STATUS_STOPPED
+
+
+def next_tier_targets(rows: List[Dict]) -> Dict[str, float]:
+    """Цель по умолчанию - следующий тир фьючерсной таблицы для каждого аккаунта"""
+    return {row["account"]: FUTURES.next_threshold(float(row.get("volume") or 0)) for row in rows}
@@ -0,0 +1,242 @@
+import asyncio
+import os
+import select
+import sys
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from rich.console import Console, Group
+from rich.live import Live
+from rich.table import Table
+from rich.text import Text
+
+from src.trade.positions_store import AccountPositions, PositionsPoller, PositionsStore
+
+from data import config
+
+CloseCallback = Callable[[str, str, Dict], Awaitable[bool]]
+
+
+class PositionsDashboard:
+    """
+    Живая таблица позиций (rich.Live) поверх PositionsStore.
+
+    Перерисовка идёт с постоянной частотой fps только из памяти - сеть
+    опрашивает PositionsPoller. У каждой строки индикатор свежести:
+    зелёный - данные моложе stale_after, жёлтый - старше, красный - последний
+    опрос аккаунта упал. Закрытие позиции запускается отдельной задачей,
+    перерисовка в это время не останавливается.
+
+    Управление (ввод + Enter): номер позиции - закрыть её, r - обновить
+    сейчас, q - выход. Номер закрепляется за парой (аккаунт, монета) при
+    первом появлении и не переиспользуется, поэтому открытие или закрытие
+    других позиций между отрисовкой и Enter не меняет, что будет закрыто.
+
+    Args:
+        store: стор позиций
+        poller: фоновый опрос, который наполняет стор
+        on_close: async (account, coin, position) -> bool
+        fps: частота перерисовки
+        stale_after: возраст данных, после которого строка считается устаревшей, с
+    """
+    def __init__(
+        self,
+        store: PositionsStore,
+        poller: PositionsPoller,
+        on_close: CloseCallback,
+        fps: float = config.DASHBOARD_FPS,
+        stale_after: float = config.POSITIONS_STALE_AFTER,
+        console: Optional[Console] = None,
+    ):
+        self.store = store
+        self.poller = poller
+        self.on_close = on_close
+        self.fps = fps
+        self.stale_after = stale_after
+        self.console = console or Console()
+        self._numbers: Dict[Tuple[str, str], int] = {}
+        self._by_number: Dict[int, Tuple[str, str]] = {}
+        self._messages: Deque[str] = deque(maxlen=4)
+        self._tasks: set[asyncio.Task] = set()
+
+    # --- Отрисовка ---
+    def _freshness(self, state: AccountPositions, now: float) -> Text:
+        age = state.age(now)
+        if state.error:
+            return Text(f"● ошибка, {age:.0f} с" if age != float("inf") else "● ошибка", style="red")
+        if age == float("inf"):
+            return Text("● загрузка", style="dim")
+        return Text(f"● {age:.1f} с", style="green" if age <= self.stale_after else "yellow")
+
+    @staticmethod
+    def _signed(value: float, digits: int = 2) -> Text:
+        style = "green" if value > 0 else "red" if value < 0 else ""
+        return Text(f"{value:+.{digits}f}", style=style)
+
+    def render(self) -> Group:
+        now = time.monotonic()
+        states = sorted(self.store.accounts(), key=lambda state: state.account)
+        multi = len(states) > 1
+
+        positions = Table(title="📋 Позиции", expand=True)
+        positions.add_column("#", justify="right", style="dim")
+        if multi:
+            positions.add_column("Аккаунт", style="cyan")
+        positions.add_column("Монета", style="cyan")
+        positions.add_column("Направление")
+        positions.add_column("Размер", justify="right")
+        positions.add_column("Entry", justify="right")
+        positions.add_column("Mark", justify="right")
+        positions.add_column("PnL", justify="right")
+        positions.add_column("Плечо", justify="right")
+        positions.add_column("Маржа", justify="right")
+        positions.add_column("Данные", justify="right")
+
+        for state in states:
+            freshness = self._freshness(state, now)
+            for coin, position in sorted(state.positions.items()):
+                number = self._number(state.account, coin)
+                base = position["base"]
+                direction = Text("LONG", style="green") if base > 0 else Text("SHORT", style="red")
+                if coin in state.closing:
+                    direction = Text("закрытие…", style="yellow")
+                cells = [str(number)]
+                if multi:
+                    cells.append(state.account)
+                positions.add_row(
+                    *cells, coin, direction, f"{abs(base):g}",
+                    f"{position['entry']:.4f}", f"{position['mark']:.4f}", self._signed(position["pnl"]),
+                    f"{abs(position.get('leverage', 0)):g}x", f"{position.get('margin', 0):.2f}", freshness,
+                )
+
+        summary = Table(title="💰 Маржа", expand=True)
+        summary.add_column("Аккаунт", style="cyan")
+        summary.add_column("Equity", justify="right")
+        summary.add_column("Доступно", justify="right")
+        summary.add_column("PnL", justify="right")
+        summary.add_column("Маржа в позициях", justify="right")
+        summary.add_column("Позиций", justify="right")
+        summary.add_column("Данные", justify="right")
+        for state in states:
+            margin = state.margin or {}
+            summary.add_row(
+                state.account,
+                f"{margin.get('equity', 0):.2f}", f"{margin.get('available', 0):.2f}",
+                self._signed(margin.get("pnl", 0)), f"{margin.get('initial_margin', 0):.2f}",
+                str(len(state.positions)), self._freshness(state, now),
+            )
+
+        footer = Text.assemble(
+            ("номер + Enter", "bold"), " - закрыть позицию, ",
+            ("r", "bold"), " - обновить, ",
+            ("q", "bold"), " - выход",
+            f"   опрос каждые {self.poller.interval:g} с, последний {self.poller.last_poll_seconds * 1000:.0f} мс",
+            style="dim",
+        )
+        messages = [Text(message) for message in self._messages]
+        return Group(positions, summary, *messages, footer)
+
+    def _number(self, account: str, coin: str) -> int:
+        key = (account, coin)
+        number = self._numbers.get(key)
+        if number is None:
+            number = self._numbers[key] = len(self._numbers) + 1
+            self._by_number[number] = key
+        return number
+
+    # --- Действия ---
+    async def _close(self, account: str, coin: str, position: Dict):
+        self.store.mark_closing(account, coin)
+        self._messages.append(f"⏳ Закрываем {coin} ({account})...")
+        ok = False
+        try:
+            ok = await self.on_close(account, coin, position)
+        except Exception as e:
+            self._messages.append(f"❌ Ошибка закрытия {coin} ({account}): {e}")
+        if ok:
+            self._messages.append(f"✅ {coin} ({account}) закрыта")
+        else:
+            self.store.mark_closing(account, coin, closing=False)
+            self._messages.append(f"❌ Не удалось закрыть {coin} ({account})")
+        self.poller.poke()
+
+    def _handle(self, command: str) -> bool:
+        """Обработать ввод; False - выйти из дашборда"""
+        command = command.strip().lower()
+        if command in ("q", "й", "exit"):
+            return False
+        if command in ("r", "к", ""):
+            self.poller.poke()
+            return True
+        if command.isdigit() and int(command) in self._by_number:
+            account, coin = self._by_number[int(command)]
+            state = self.store.get(account)
+            position = state.positions.get(coin) if state else None
+            if position is None:
+                self._messages.append(f"⚠️ Позиции #{command} ({coin}, {account}) уже нет")
+                return True
+            if coin in state.closing:
+                self._messages.append(f"⚠️ {coin} ({account}) уже закрывается")
+                return True
+            task = asyncio.create_task(self._close(account, coin, dict(position)))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            return True
+        self._messages.append(f"⚠️ Неизвестная команда: {command}")
+        return True
+
+    @staticmethod
+    def _stdin_ready(timeout: float) -> bool:
+        if os.name == "nt":
+            import msvcrt
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                if msvcrt.kbhit():
+                    return True
+                time.sleep(0.02)
+            return False
+        ready, _, _ = select.select([sys.stdin], [], [], timeout)
+        return bool(ready)
+
+    def _read_command(self, cancelled: threading.Event) -> Optional[str]:
+        """
+        Строка ввода; None - выход из дашборда. Поток ждёт готовности stdin
+        короткими интервалами, а не висит в input(): после выхода он не
+        съедает следующую строку и не держит asyncio.run до Enter.
+        """
+        while not cancelled.is_set():
+            if self._stdin_ready(0.1):
+                line = sys.stdin.readline()
+                if not line:
+                    raise EOFError
+                return line
+        return None
+
+    async def run(self, stop_event: Optional[asyncio.Event] = None):
+        """Показывать дашборд до q (или stop_event); закрытия, начатые до выхода, дожидаются"""
+        self.poller.start()
+        self.poller.poke()
+        cancelled = threading.Event()
+        prompt = asyncio.create_task(asyncio.to_thread(self._read_command, cancelled))
+        frame = 1 / self.fps
+        try:
+            with Live(self.render(), console=self.console, auto_refresh=False, transient=True) as live:
+                while not (stop_event and stop_event.is_set()):
+                    if prompt.done():
+                        try:
+                            command = prompt.result()
+                        except EOFError:
+                            break
+                        if command is None or not self._handle(command):
+                            break
+                        prompt = asyncio.create_task(asyncio.to_thread(self._read_command, cancelled))
+                    live.update(self.render(), refresh=True)
+                    await asyncio.sleep(frame)
+        finally:
+            cancelled.set()
+            await asyncio.gather(prompt, return_exceptions=True)
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+            await self.poller.stop()
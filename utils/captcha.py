@@ -1,3 +1,8 @@
+from collections import deque
+from statistics import median
+from typing import Deque, Dict, Optional, Set, Tuple
+import time
+
 from loguru import logger
 import aiohttp
 import asyncio
@@ -5,10 +10,26 @@ import asyncio
 from data import config
 
 class TwoCaptcha:
+    """
+    Решение Turnstile через 2captcha.
+
+    Опрос res.php адаптивный: первый запрос делается через медианное время
+    прошлых решений (минус один интервал), дальше - каждые
+    CAPTCHA_POLL_INTERVAL секунд до CAPTCHA_TIMEOUT.
+    """
+    # Время решения общее для всех экземпляров - это свойство сервиса, а не аккаунта
+    solve_times: Deque[float] = deque(maxlen=50)
+
     def __init__(self, session: aiohttp.ClientSession, api_key: str | None = None):
-        self.api_key = api_key 
+        self.api_key = api_key
         self.session = session
 
+    @classmethod
+    def expected_solve_time(cls) -> float:
+        if not cls.solve_times:
+            return config.CAPTCHA_INITIAL_WAIT
+        return median(cls.solve_times)
+
     async def captcha_data(self, action: str | None = None, task_id: str | None = None):
         if action == "CREATE":
             return {
@@ -29,38 +50,217 @@ class TwoCaptcha:
     async def create_task(self):
         data = await self.captcha_data(action="CREATE")
         async with self.session.post(config.CREATE_URL, data=data) as resp:
-            answer = await resp.json()
+            answer = await resp.json(content_type=None)
             logger.info(f"Ответ при создании задачи: {answer}")
             if answer.get("status") == 1:
-                return answer["request"]  
+                return answer["request"]
             return None
 
-    async def check_complete_task(self, task_id: str):
+    async def check_complete_task(self, task_id: str, created_at: float | None = None):
+        created_at = created_at or time.monotonic()
+        deadline = created_at + config.CAPTCHA_TIMEOUT
         params = await self.captcha_data(task_id=task_id)
-        for attempt in range(config.NUMBER_ATTEMPTS_REQUESTS):
+
+        first_wait = max(0.0, self.expected_solve_time() - config.CAPTCHA_POLL_INTERVAL)
+        await asyncio.sleep(max(0.0, created_at + first_wait - time.monotonic()))
+
+        attempt = 0
+        while time.monotonic() < deadline:
+            attempt += 1
             async with self.session.get(config.RES_URL, params=params) as resp:
-                answer = await resp.json()
-                if answer.get("status") == 1:
-                    logger.success("Капча решена!")
-                    return answer["request"]  #
-                if answer.get("request") == "CAPCHA_NOT_READY":
-                    logger.info(f"Попытка {attempt+1}: капча ещё не готова, ждём...")
-                    await asyncio.sleep(5)
-                    continue
-                logger.warning(f"Ошибка при решении капчи: {answer}")
-                return None
-        logger.error("Превышено количество попыток проверки капчи")
+                answer = await resp.json(content_type=None)
+            if answer.get("status") == 1:
+                elapsed = time.monotonic() - created_at
+                self.solve_times.append(elapsed)
+                logger.success(f"Капча решена за {elapsed:.1f} с (попыток: {attempt})")
+                return answer["request"]
+            if answer.get("request") == "CAPCHA_NOT_READY":
+                logger.debug(f"Попытка {attempt}: капча ещё не готова, ждём...")
+                await asyncio.sleep(config.CAPTCHA_POLL_INTERVAL)
+                continue
+            logger.warning(f"Ошибка при решении капчи: {answer}")
+            return None
+        logger.error(f"Капча не решена за {config.CAPTCHA_TIMEOUT} с")
         return None
 
     async def solve_turnstile(self):
+        created_at = time.monotonic()
         task_id = await self.create_task()
         if not task_id:
             logger.error("Не удалось создать задачу")
             return None
         logger.info(f"Задача создана: {task_id}, ждём решения...")
-        token = await self.check_complete_task(task_id)
+        token = await self.check_complete_task(task_id, created_at)
         return token
-    
 
 
+class CaptchaPool:
+    """
+    Пул заранее решённых Turnstile-токенов для одного ключа 2captcha.
+
+    Фоновая задача держит size свежих токенов (решённые + в работе), плюс
+    по одному решению на каждого ожидающего get(). Токен живёт token_ttl
+    секунд с момента решения; get() отдаёт самый старый из живых, чтобы
+    токены не протухали в очереди. Неудачные решения откладывают следующие
+    с экспоненциальной паузой, а get() сдаётся после CAPTCHA_MAX_FAILURES
+    неудач подряд - неверный ключ не жжёт баланс и не держит логины.
+    """
+    def __init__(
+        self,
+        api_key: str | None,
+        size: int = config.CAPTCHA_POOL_SIZE,
+        token_ttl: float = config.CAPTCHA_TOKEN_TTL,
+    ):
+        self.api_key = api_key
+        self.size = size
+        self.token_ttl = token_ttl
+
+        self._tokens: Deque[Tuple[float, str]] = deque()
+        self._in_flight = 0
+        self._waiters = 0
+        self._retry_at = 0.0
+        self._failures = 0
+        self._available = asyncio.Condition()
+        self._tasks: Set[asyncio.Task] = set()
+        self._maintainer: Optional[asyncio.Task] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        self.solved = 0
+        self.failed = 0
+        self.expired = 0
+        self.served_warm = 0
+        self.served_cold = 0
+
+    @property
+    def ready(self) -> int:
+        return len(self._tokens)
+
+    def metrics(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "in_flight": self._in_flight,
+            "solved": self.solved,
+            "failed": self.failed,
+            "expired": self.expired,
+            "served_warm": self.served_warm,
+            "served_cold": self.served_cold,
+            "expected_solve_time": round(TwoCaptcha.expected_solve_time(), 2),
+        }
+
+    def start(self):
+        if self._maintainer is None or self._maintainer.done():
+            self._maintainer = asyncio.create_task(self._maintain())
+
+    async def stop(self):
+        tasks = [*self._tasks, *([self._maintainer] if self._maintainer else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._maintainer = None
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+    async def get(self, timeout: float = config.CAPTCHA_TIMEOUT) -> Optional[str]:
+        """Взять токен из пула; если пул пуст - дождаться ближайшего решения"""
+        if not self.api_key:
+            logger.error("Пул капчи: не задан ключ 2captcha")
+            return None
+        deadline = time.monotonic() + timeout
+        failed_before = self.failed
+        warm = True
+        async with self._available:
+            self._waiters += 1
+            try:
+                while True:
+                    self._drop_expired()
+                    if self._tokens:
+                        _, token = self._tokens.popleft()
+                        if warm:
+                            self.served_warm += 1
+                        else:
+                            self.served_cold += 1
+                        return token
+                    warm = False
+                    if self.failed - failed_before >= config.CAPTCHA_MAX_FAILURES:
+                        logger.error(f"Пул капчи: {config.CAPTCHA_MAX_FAILURES} неудачных решений подряд")
+                        return None
+                    self._refill()
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        logger.error("Пул капчи: нет токена за отведённое время")
+                        return None
+                    try:
+                        await asyncio.wait_for(self._available.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self._waiters -= 1
+                self._refill()
+
+    def _drop_expired(self):
+        now = time.monotonic()
+        while self._tokens and self._tokens[0][0] <= now:
+            self._tokens.popleft()
+            self.expired += 1
+
+    def _refill(self):
+        if not self.api_key or time.monotonic() < self._retry_at:
+            return
+        missing = self.size + self._waiters - len(self._tokens) - self._in_flight
+        for _ in range(max(0, missing)):
+            self._in_flight += 1
+            task = asyncio.create_task(self._solve_one())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _solve_one(self):
+        token = None
+        try:
+            if self._session is None or self._session.closed:
+                self._session = aiohttp.ClientSession()
+            token = await TwoCaptcha(self._session, self.api_key).solve_turnstile()
+        except Exception as e:
+            logger.error(f"Пул капчи: ошибка решения: {e}")
+        finally:
+            self._in_flight -= 1
+
+        async with self._available:
+            if token:
+                self.solved += 1
+                self._failures = 0
+                self._tokens.append((time.monotonic() + self.token_ttl, token))
+            else:
+                self.failed += 1
+                self._failures += 1
+                backoff = min(config.CAPTCHA_POLL_INTERVAL * 2 ** self._failures, config.CAPTCHA_TIMEOUT)
+                self._retry_at = time.monotonic() + backoff
+            self._available.notify_all()
+
+    async def _maintain(self):
+        """Выбрасывать протухшие токены и добирать пул до size"""
+        while True:
+            async with self._available:
+                self._drop_expired()
+                self._refill()
+                if self._waiters:
+                    self._available.notify_all()
+            await asyncio.sleep(config.CAPTCHA_POLL_INTERVAL)
+
+
+_pools: Dict[str | None, CaptchaPool] = {}
+
+
+def get_captcha_pool(api_key: str | None) -> CaptchaPool:
+    """Общий пул на ключ 2captcha, запускается при первом обращении"""
+    pool = _pools.get(api_key)
+    if pool is None:
+        pool = _pools[api_key] = CaptchaPool(api_key)
+    pool.start()
+    return pool
+
 
+async def close_captcha_pools():
+    for pool in _pools.values():
+        await pool.stop()
+    _pools.clear()
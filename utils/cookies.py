@@ -4,43 +4,51 @@ from yarl import URL
 
 import aiohttp
 
+from data import config
+
+def cookies_expires_at(cookies: dict | str | None) -> int:
+    """
+    Момент истечения куков по единой политике: created_at + config.COOKIES_TTL.
+    0 - куков нет или не известно, когда они получены.
+    """
+    if isinstance(cookies, str):
+        try:
+            cookies = json.loads(cookies)
+        except (json.JSONDecodeError, TypeError):
+            return 0
+    if not isinstance(cookies, dict):
+        return 0
+    try:
+        return int(cookies["created_at"]) + config.COOKIES_TTL
+    except (KeyError, TypeError, ValueError):
+        return 0
+
+
 async def check_cookies_from_db(db_manager, table_name: str, account: str) -> bool:
+    """Проверка по колонке cookies_expires_at, без чтения и разбора JSON"""
     try:
         row = await db_manager.fetchone(
-            f"SELECT cookies FROM {table_name} WHERE account = :account",
+            f"SELECT cookies_expires_at FROM {table_name} WHERE account = :account",
             {"account": account}
         )
-        
-        if not row or not row.get("cookies"):
-            return False
-        
-        cookies_data = json.loads(row["cookies"])
-        created_at = cookies_data.get("created_at")
-
-        if not created_at:
-            return False  
-        
-        age = int(time.time()) - int(created_at)
-        return age < 3600
+        return bool(row) and row["cookies_expires_at"] > time.time()
     except Exception as e:
         print("ERR in check_cookies_from_db:", type(e), e)
         return False
 
 async def check_cookies_from_account(account) -> bool:
-    try:
-        cookies_data = account.cookies
-        created_at = cookies_data.get("created_at")
+    return cookies_expires_at(account.cookies) > time.time()
 
-        if not created_at:
-            return False  
-        
-        age = int(time.time()) - int(created_at)
-        return age < 1800
-    except Exception as e:
-        print("ERR in check_cookies_from_db:", type(e), e)
+def apply_cookies(session, cookies_data: dict | None, url: str | None = None) -> bool:
+    """Добавить уже разобранные куки в aiohttp.ClientSession"""
+    if not cookies_data:
         return False
+    cookies = {k: v for k, v in cookies_data.items() if k not in ("created_at", "time")}
+    session.cookie_jar.update_cookies(cookies, response_url=URL(url or config.BASE_URL))
+    return True
 
-async def apply_cookies_from_db(session, db_manager, table_name: str, account: str, url: str = "https://arkm.com") -> bool:
+
+async def apply_cookies_from_db(session, db_manager, table_name: str, account: str, url: str | None = None) -> bool:
     """Загрузить куки из БД и добавить их в aiohttp.ClientSession"""
     try:
         row = await db_manager.fetchone(
@@ -51,24 +59,25 @@ async def apply_cookies_from_db(session, db_manager, table_name: str, account: s
         if not row or not row.get("cookies"):
             return False
             
-        cookies_data = json.loads(row["cookies"])
-        cookies = {k: v for k, v in cookies_data.items() if k not in ("created_at", "time")}
-        
-        session.cookie_jar.update_cookies(cookies, response_url=URL(url))
-        return True
+        return apply_cookies(session, json.loads(row["cookies"]), url)
         
     except Exception as e:
         print(f"Ошибка загрузки cookies из БД: {e}")
         return False
 
 
-async def save_cookies_to_account(session: aiohttp.ClientSession , account_client, url: str = "https://arkm.com"):
+def session_cookies(session: aiohttp.ClientSession, url: str | None = None) -> dict:
+    """Куки сессии для Arkham в виде dict с отметкой created_at"""
+    cookies = session.cookie_jar.filter_cookies(URL(url or config.BASE_URL))
+    dict_cookies = {key: cookie.value for key, cookie in cookies.items()}
+    dict_cookies["created_at"] = int(time.time())
+    return dict_cookies
+
+
+async def save_cookies_to_account(session: aiohttp.ClientSession , account_client, url: str | None = None):
     """Сохранить куки текущей сессии в БД"""
     try:
-        cookies = session.cookie_jar.filter_cookies(URL(url))
-        dict_cookies = {key: cookie.value for key, cookie in cookies.items()}
-        dict_cookies["created_at"] = int(time.time())   
-        account_client.cookies = dict_cookies
+        account_client.cookies = session_cookies(session, url)
         return account_client
     except Exception as e:
         print(f"Ошибка сохранения cookies в БД: {e}")
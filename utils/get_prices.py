@@ -6,6 +6,8 @@ import base64
 from typing import Dict, Optional
 import json
 
+from data import config
+
 
 class ArkhamPrices:
     """
@@ -18,7 +20,7 @@ class ArkhamPrices:
         dict: Словарь с данными о цене на споте или фьючерсах
     """
     def __init__(self, api_key: str = None, api_secret: str = None, session: Optional[aiohttp.ClientSession] = None):
-        self.base_url = "https://arkm.com/api"
+        self.base_url = f"{config.BASE_URL}/api"
         self.api_key = api_key
         self.api_secret = api_secret
         self.session = session
@@ -75,59 +77,65 @@ class ArkhamPrices:
                 error_text = await response.text()
                 raise Exception(f"HTTP {response.status}: {error_text}")
     
+    @staticmethod
+    def parse_spot_ticker(coin: str, ticker: Dict) -> Dict:
+        """Разбор ответа /public/ticker для спот пары"""
+        if ticker.get("productType") != "spot":
+            raise Exception(f"Символ {coin}_USDT не является спот парой")
+        price = float(ticker["price"])
+        price_24h_ago = float(ticker["price24hAgo"])
+        return {
+            "coin": coin,
+            "symbol": ticker["symbol"],
+            "price": price,
+            "high24h": float(ticker["high24h"]),
+            "low24h": float(ticker["low24h"]),
+            "volume24h": float(ticker["volume24h"]),
+            "price_change_24h": price - price_24h_ago,
+            "price_change_pct": ((price - price_24h_ago) / price_24h_ago) * 100,
+            "product_type": "spot",
+            "timestamp": int(time.time() * 1000000)
+        }
+
+    @staticmethod
+    def parse_futures_ticker(coin: str, ticker: Dict) -> Dict:
+        """Разбор ответа /public/ticker для фьючерсной пары"""
+        if ticker.get("productType") != "perpetual":
+            raise Exception(f"Символ {coin}_USDT_PERP не является фьючерсной парой")
+        price = float(ticker["price"])
+        price_24h_ago = float(ticker["price24hAgo"])
+        return {
+            "coin": coin,
+            "symbol": ticker["symbol"],
+            "price": price,
+            "mark_price": float(ticker["markPrice"]),
+            "index_price": float(ticker["indexPrice"]),
+            "high24h": float(ticker["high24h"]),
+            "low24h": float(ticker["low24h"]),
+            "volume24h": float(ticker["volume24h"]),
+            "price_change_24h": price - price_24h_ago,
+            "price_change_pct": ((price - price_24h_ago) / price_24h_ago) * 100,
+            "funding_rate": float(ticker["fundingRate"]),
+            "next_funding_rate": float(ticker["nextFundingRate"]),
+            "next_funding_time": ticker["nextFundingTime"],
+            "open_interest": float(ticker["openInterest"]),
+            "open_interest_usd": float(ticker["openInterestUSD"]),
+            "product_type": "perpetual",
+            "timestamp": int(time.time() * 1000000)
+        }
+
     async def get_spot_price(self, coin: str) -> Dict:
         """Получить цену спота для монеты"""
         try:
-            spot_symbol = f"{coin}_USDT"
-            ticker = await self._request("GET", "/public/ticker", params={"symbol": spot_symbol})
-            
-            if ticker.get("productType") == "spot":
-                return {
-                    "coin": coin,
-                    "symbol": ticker["symbol"],
-                    "price": float(ticker["price"]),
-                    "high24h": float(ticker["high24h"]),
-                    "low24h": float(ticker["low24h"]),
-                    "volume24h": float(ticker["volume24h"]),
-                    "price_change_24h": float(ticker["price"]) - float(ticker["price24hAgo"]),
-                    "price_change_pct": ((float(ticker["price"]) - float(ticker["price24hAgo"])) / float(ticker["price24hAgo"])) * 100,
-                    "product_type": "spot",
-                    "timestamp": int(time.time() * 1000000)
-                }
-            else:
-                raise Exception(f"Символ {spot_symbol} не является спот парой")
+            ticker = await self._request("GET", "/public/ticker", params={"symbol": f"{coin}_USDT"})
+            return self.parse_spot_ticker(coin, ticker)
         except Exception as e:
             raise Exception(f"Ошибка получения спот цены для {coin}: {e}")
     
     async def get_futures_price(self, coin: str) -> Dict:
         """Получить цену фьючерсов для монеты"""
         try:
-            futures_symbol = f"{coin}_USDT_PERP"
-            ticker = await self._request("GET", "/public/ticker", params={"symbol": futures_symbol})
-            
-            if ticker.get("productType") == "perpetual":
-                return {
-                    "coin": coin,
-                    "symbol": ticker["symbol"],
-                    "price": float(ticker["price"]),
-                    "mark_price": float(ticker["markPrice"]),
-                    "index_price": float(ticker["indexPrice"]),
-                    "high24h": float(ticker["high24h"]),
-                    "low24h": float(ticker["low24h"]),
-                    "volume24h": float(ticker["volume24h"]),
-                    "price_change_24h": float(ticker["price"]) - float(ticker["price24hAgo"]),
-                    "price_change_pct": ((float(ticker["price"]) - float(ticker["price24hAgo"])) / float(ticker["price24hAgo"])) * 100,
-                    "funding_rate": float(ticker["fundingRate"]),
-                    "next_funding_rate": float(ticker["nextFundingRate"]),
-                    "next_funding_time": ticker["nextFundingTime"],
-                    "open_interest": float(ticker["openInterest"]),
-                    "open_interest_usd": float(ticker["openInterestUSD"]),
-                    "product_type": "perpetual",
-                    "timestamp": int(time.time() * 1000000)
-                }
-            else:
-                raise Exception(f"Символ {futures_symbol} не является фьючерсной парой")
+            ticker = await self._request("GET", "/public/ticker", params={"symbol": f"{coin}_USDT_PERP"})
+            return self.parse_futures_ticker(coin, ticker)
         except Exception as e:
             raise Exception(f"Ошибка получения фьючерсной цены для {coin}: {e}")
-
-
@@ -1,5 +1,7 @@
 import aiohttp
 
+from data import config
+
 class ArkhamLeverage:
     def __init__(self, session: aiohttp.ClientSession):
         self.session = session
@@ -31,14 +33,15 @@ class ArkhamLeverage:
                 'subaccountId': '0',
             }
 
-    async def set_leverage(self, symbol: str, leverage: str):
-        """Установить кредитное плечо для заданного символа"""
+    async def set_leverage(self, symbol: str, leverage: str, verify: bool = True) -> bool:
+        """Установить кредитное плечо для заданного символа (verify - перечитать список плеч)"""
         async with self.session.post(
-            'https://arkm.com/api/account/leverage',
+            f'{config.BASE_URL}/api/account/leverage',
             headers=await self.headers(action='set'),
             json=await self.create_json_data(action='set', symbol=symbol, leverage=leverage)
         ) as response:
-            if response.status == 204:
+            ok = response.status == 204
+            if ok:
                 print(f"✅ Плечо {leverage}x установлено для {symbol}")
             else:
                 try:
@@ -48,12 +51,24 @@ class ArkhamLeverage:
                     text = await response.text()
                     print(f"⚠️ Не удалось распарсить JSON, ответ сервера:\n{text}")
 
+        if verify:
             await self.check_leverage(symbol, leverage=leverage)
+        return ok
+
+    async def get_leverages(self) -> dict:
+        """Плечи всех символов одним запросом: {"BTC_USDT_PERP": 10, ...}"""
+        async with self.session.get(
+            f'{config.BASE_URL}/api/account/leverage',
+            params=await self.create_json_data(),
+            headers=await self.headers()
+        ) as response:
+            data = await response.json()
+            return {item["symbol"]: int(item["leverage"]) for item in data}
 
     async def check_leverage(self, symbol: str, leverage: int |  None = None):
         """Проверить текущее кредитное плечо для заданного символа"""
         async with self.session.get(
-            'https://arkm.com/api/account/leverage',
+            f'{config.BASE_URL}/api/account/leverage',
             params=await self.create_json_data(),
             headers=await self.headers()
         ) as response:
@@ -69,7 +84,7 @@ class ArkhamLeverage:
     async def leverage_seen(self, symbol: str):
         """Проверить текущее кредитное плечо для заданного символа"""
         async with self.session.get(
-            'https://arkm.com/api/account/leverage',
+            f'{config.BASE_URL}/api/account/leverage',
             params=await self.create_json_data(),
             headers=await self.headers()
         ) as response:
@@ -0,0 +1,100 @@
+import sys
+import time
+from typing import Optional, TextIO
+
+from loguru import logger
+
+from data import config
+
+TERMINAL_FORMAT = (
+    "<green>{time:HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | "
+    "<cyan>{name}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+)
+ERROR_LEVEL = logger.level("ERROR").no
+
+
+class TerminalRateLimit:
+    """
+    Token bucket для терминального sink loguru.
+
+    Пропускает не больше rate сообщений в секунду (всплеск до burst),
+    ERROR и выше проходят всегда. Отброшенные сообщения считаются,
+    следующая выведенная строка показывает, сколько пропущено. Фильтр
+    работает до постановки в очередь enqueue-sink, поэтому лишние
+    сообщения не форматируются и не ждут в очереди.
+
+    Args:
+        rate: сообщений в секунду
+        burst: размер всплеска
+    """
+    def __init__(self, rate: float = config.LOG_TERMINAL_RATE, burst: int = config.LOG_TERMINAL_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.suppressed = 0
+        self._report = 0
+
+    def __call__(self, record) -> bool:
+        if record["level"].no < ERROR_LEVEL:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                self.suppressed += 1
+                return False
+            self.tokens -= 1
+        self._report, self.suppressed = self.suppressed, 0
+        return True
+
+    def format(self, record) -> str:
+        note = f" <dim>(пропущено {self._report})</dim>" if self._report else ""
+        return TERMINAL_FORMAT + note + "\n{exception}"
+
+
+def setup_logging(
+    level: str = config.LOG_LEVEL,
+    json_path: Optional[str] = config.LOG_JSON_PATH,
+    terminal: Optional[TextIO] = sys.stderr,
+    rate_limit: bool = True,
+):
+    """
+    Неблокирующие sink'и loguru.
+
+    Оба sink'а с enqueue=True: вызов logger.* в коде только кладёт запись
+    в очередь, запись в терминал/файл, ротация и сжатие файла идут в
+    отдельном потоке, а не в event loop. JSON-файл (serialize) содержит
+    поля из logger.bind(...) - account, symbol, client_order_id, latency_ms
+    у ордеров. Перед выходом нужно дождаться очереди: await flush_logging().
+
+    Args:
+        level: уровень терминального вывода
+        json_path: путь JSON-лога (None - без файла)
+        terminal: поток терминального вывода (None - без терминала)
+        rate_limit: ограничивать частоту терминального вывода
+    """
+    logger.remove()
+    if terminal is not None:
+        limiter = TerminalRateLimit() if rate_limit else None
+        logger.add(
+            terminal,
+            level=level,
+            enqueue=True,
+            filter=limiter,
+            format=limiter.format if limiter else TERMINAL_FORMAT + "\n{exception}",
+        )
+    if json_path:
+        logger.add(
+            json_path,
+            level=config.LOG_JSON_LEVEL,
+            enqueue=True,
+            serialize=True,
+            rotation=config.LOG_ROTATION,
+            retention=config.LOG_RETENTION,
+            compression="gz",
+        )
+
+
+async def flush_logging():
+    """Дождаться, пока очередь enqueue-sink'ов запишется"""
+    await logger.complete()
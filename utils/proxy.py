@@ -0,0 +1,38 @@
+from collections import defaultdict
+from itertools import chain, zip_longest
+from typing import Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def normalize_proxy(raw: str) -> Optional[str]:
+    """
+    Привести прокси к виду scheme://user:pass@ip:port.
+    Принимает 'http://user:pass ip:port', 'user:pass ip:port' и готовые URL.
+    """
+    raw = (raw or '').strip()
+    if not raw:
+        return None
+
+    if '@' in raw:
+        return raw
+
+    parts = raw.split()
+    if len(parts) == 2 and parts[0].startswith('http'):
+        return f"{parts[0]}@{parts[1]}"
+
+    if len(parts) == 2:
+        return f"http://{parts[0]}@{parts[1]}"
+
+    return raw
+
+
+def interleave_by_proxy(items: List[T], proxy_of: Callable[[T], Optional[str]]) -> List[T]:
+    """
+    Порядок обхода: по одному элементу каждого прокси по кругу.
+    Задачи одного прокси не встают в очередь общего семафора подряд.
+    """
+    groups: Dict[str, List[T]] = defaultdict(list)
+    for item in items:
+        groups[proxy_of(item) or "no_proxy"].append(item)
+    return [item for item in chain.from_iterable(zip_longest(*groups.values())) if item is not None]
@@ -1,9 +1,6 @@
 import aiohttp
 import asyncio
 from typing import Optional, Dict
-from rich.console import Console
-
-console = Console()
 
 class GlobalSessionManager:
     _instance = None
@@ -27,8 +24,20 @@ class GlobalSessionManager:
         
         return await self._create_session(session_key, proxy)
 
+    async def new_session(self, proxy: Optional[str] = None) -> aiohttp.ClientSession:
+        """
+        Отдельная сессия со своим cookie jar, не регистрируется в менеджере.
+        Нужна для параллельных логинов через один прокси - закрывает вызывающий.
+        """
+        return self._build_session(proxy)
+
     async def _create_session(self, session_key: str, proxy: Optional[str]) -> aiohttp.ClientSession:
         """Создать новую сессию"""
+        session = self._build_session(proxy)
+        self._sessions[session_key] = session
+        return session
+
+    def _build_session(self, proxy: Optional[str]) -> aiohttp.ClientSession:
         connector = aiohttp.TCPConnector(
             ssl=False,
             limit=20,
@@ -51,12 +60,15 @@ class GlobalSessionManager:
                     kwargs["proxy"] = proxy
                 return await original_request(method, url, **kwargs)
             session._request = proxy_request
-        
-        self._sessions[session_key] = session
+
         return session
 
     async def close_all(self):
         """Закрыть все сессии"""
+        # rich нужен только интерактивному меню - CLI не платит за его импорт
+        from rich.console import Console
+        console = Console()
+
         console.print("[yellow]🔄 Закрытие всех сессий...[/yellow]")
         
         for session in list(self._sessions.values()):
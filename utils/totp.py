@@ -0,0 +1,65 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import hmac
+import struct
+import time
+
+from loguru import logger
+
+from data import config
+
+PERIOD = 30
+DIGITS = 6
+
+
+def normalize_secret(secret: str) -> str:
+    """Base32-секрет из Google Authenticator: без пробелов, в верхнем регистре, с паддингом"""
+    secret = secret.replace(" ", "").replace("-", "").upper()
+    return secret + "=" * (-len(secret) % 8)
+
+
+def valid_secret(secret: str | None) -> bool:
+    """Секрет разбирается как base32 - проверять при вводе/импорте, а не после капчи и логина"""
+    if not secret or not secret.strip():
+        return False
+    try:
+        return len(base64.b32decode(normalize_secret(secret))) > 0
+    except (binascii.Error, ValueError):
+        return False
+
+
+def totp(secret: str, for_time: float | None = None, period: int = PERIOD, digits: int = DIGITS) -> str:
+    """Код RFC 6238 (HMAC-SHA1) для момента for_time"""
+    key = base64.b32decode(normalize_secret(secret))
+    counter = int((for_time if for_time is not None else time.time()) // period)
+    digest = hmac.new(key, struct.pack(">Q", counter), hashlib.sha1).digest()
+    offset = digest[-1] & 0x0F
+    value = struct.unpack(">I", digest[offset:offset + 4])[0] & 0x7FFFFFFF
+    return str(value % 10 ** digits).zfill(digits)
+
+
+def verify_totp(secret: str, code: str, window: int = 1, period: int = PERIOD) -> bool:
+    """Проверить код с допуском window соседних периодов (рассинхрон часов)"""
+    now = time.time()
+    return any(
+        hmac.compare_digest(totp(secret, now + step * period, period), code)
+        for step in range(-window, window + 1)
+    )
+
+
+def seconds_left(period: int = PERIOD) -> float:
+    return period - time.time() % period
+
+
+async def fresh_totp(secret: str, min_remaining: float = config.TOTP_MIN_REMAINING) -> str:
+    """
+    Код, которому осталось жить не меньше min_remaining секунд.
+    В конце окна ждём начала следующего, чтобы код не истёк по дороге на сервер.
+    """
+    left = seconds_left()
+    if left < min_remaining:
+        logger.debug(f"TOTP: до смены кода {left:.1f} с, ждём следующее окно")
+        await asyncio.sleep(left + 0.05)
+    return totp(secret)